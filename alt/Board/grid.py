@@ -183,9 +183,10 @@ class Grid:
                 next_cell.value = -1
         return False
 
-    def randomize(self):
+    def randomize(self, rng: random.Random = None):
+        rng = rng if rng is not None else random.Random()
         while self.values(self.cells).count(-1) > self.size * self.size - 21:
-            r, c, n = random.randint(0, 8), random.randint(0, 8), random.randint(1, 9)
+            r, c, n = rng.randint(0, 8), rng.randint(0, 8), rng.randint(1, 9)
             if self.is_valid(r * self.size + c, n):
                 self.set(r * self.size + c, n)
 
@@ -1,14 +1,13 @@
 from __future__ import annotations
 
 import copy
-import math
 import random
 import time
-from typing import List
+from typing import Iterable, List, Set
 
-from PySide6.QtCore import QRect, Qt, QObject, Signal, QThread
-from PySide6.QtGui import QPaintEvent, QPainter, QPen, QColor, QMouseEvent, QFont, \
-    QKeyEvent, QResizeEvent
+from PySide6.QtCore import QRect, Qt, QObject, Signal, QThread, QTimer
+from PySide6.QtGui import QPaintEvent, QPainter, QPen, QColor, QMouseEvent, \
+    QKeyEvent, QResizeEvent, QRegion
 from PySide6.QtWidgets import QWidget, QSizePolicy
 
 from constraints.border_components import XVSum, Quadruple, BorderComponent, Difference, Ratio, \
@@ -18,10 +17,18 @@ from constraints.line_components import Arrow, LineComponent, PalindromeLine, Ge
     BetweenLine, LockoutLine, Thermometer
 from constraints.outside_components import Sandwich, XSumsClue, LittleKiller, OutsideComponent
 from constraints.region_components import RegionComponent, Cage
-from sudoku_.sudoku import Sudoku
-from sudoku_.edge import tile_to_poly
+from render import BoardLayers, digit_atlas, draw_background, draw_colors, draw_digits
+from sudoku_.analysis import analyse, propagate
+from sudoku_.candidates import CandidateWorker
+from sudoku_.jobs import Job, Progress, generate
+from sudoku_.observer import SearchObserver
+from sudoku_.puzzle import Puzzle
+from sudoku_.snapshot import MASK_DIGITS
+from sudoku_.trace import Replay, Trace
+from sudoku_.sudoku import CellGeometry, Sudoku
+from sudoku_.edge import Outline
+from sudoku_.hit_index import border_at
 from utils import BoundList, Constants
-import sudoku_.board as b
 
 NORTH = 0
 EAST = 1
@@ -45,22 +52,55 @@ COLORS = [
 ]
 
 
+def blend(start: QColor, end: QColor, amount: float) -> QColor:
+    """
+
+    :param amount: 0.0 returns start, 1.0 returns end
+    """
+    amount = min(max(amount, 0.0), 1.0)
+    return QColor(
+        round(start.red() + (end.red() - start.red()) * amount),
+        round(start.green() + (end.green() - start.green()) * amount),
+        round(start.blue() + (end.blue() - start.blue()) * amount)
+    )
+
+
 class Solver(QObject):
-    progressChanged = Signal()
+    """
+    Runs the search for a step by step solve at full speed on a copy of the puzzle. The board
+    does not wait for it, it samples the observer on its frame timer.
+    """
     finished = Signal()
 
     def __init__(self, sudoku):
         super().__init__()
 
         self.sudoku = sudoku
+        # Steps per second of a replay
         self.speed = 1000
+        self.job = None
+        self.search = None
+        self.observer = None
+
+    def prepare(self, record: bool = False):
+        """Copies the current puzzle into a new search, has to be called in the GUI thread"""
+        self.search = Puzzle.from_json(self.sudoku.to_json()).solver()
+        self.search.job = self.job
+
+        self.observer = SearchObserver(self.search.values, record=record)
+        self.search.observer = self.observer
 
     def solve(self):
-        self.sudoku.solve_in_thread(self, random_pick=True)
+        self.job.run(lambda job: self.search.solve())
+        self.observer.finish(self.search.solution)
         self.finished.emit()
 
 
 class Generator(QObject):
+    """
+    Generates a puzzle off the GUI thread. The puzzle is only kept in job.result, the board
+    writes it into the sudoku once finished is handled on the GUI thread.
+    """
     progressChanged = Signal()
     finished = Signal()
 
@@ -68,19 +108,32 @@ class Generator(QObject):
         super().__init__()
 
         self.sudoku = sudoku
+        self.job = None
+        self.progress = None
+        # Seed of the last generation, a puzzle can be recreated with jobs.generate
+        self.seed = None
 
-    def generate(self):
-        sudo = b.Sudoku(9)
-        sudo.generate_random_board()
-        sudo.genereate_board_with_unique_solution(random.randint(17, 56))
-        for i in range(81):
-            self.sudoku.cells[i].value = sudo.cells[i].value if sudo.cells[
-                                                                    i].value != -1 else Constants.EMPTY
+    def report(self, progress: Progress):
+        self.progress = progress
+        self.progressChanged.emit()
 
+    def generate(self):
+        self.seed = random.getrandbits(32)
+        rng = random.Random(self.seed)
+        self.job.run(generate, rng.randint(17, 56), rng=rng)
         self.finished.emit()
 
 
 class SudokuBoard(QWidget):
+    # Seconds a solve or generation may take before it is stopped
+    TIME_LIMIT = 60
+    # Solutions without a given at which the heatmap shows it as fully load-bearing
+    HEATMAP_LIMIT = 10
+    # Frames per second while a solve is shown
+    FRAME_RATE = 60
+
+    # Emitted by the candidate worker, queued to the GUI thread
+    candidatesReady = Signal()
 
     def __init__(self, parent: QWidget, sudoku: Sudoku):
         super().__init__(parent)
@@ -90,8 +143,15 @@ class SudokuBoard(QWidget):
         self.mode_switch = parent.mode_switch
 
         self.unsolved = True
+        # Whether the grid was full and free of conflicts at the last edit
+        self.solved = False
 
         self.selected = set()
+        # Selection as it was last handed to update, see update_selection
+        self.painted_selection = frozenset()
+        # Cells highlighted as seen from the selection when they were last handed to update
+        self.painted_highlight = set()
+        self.selection_outline = Outline()
 
         self.steps_done = []
 
@@ -100,6 +160,8 @@ class SudokuBoard(QWidget):
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
         self.cell_size = 40
+        # Cached pixmaps of everything that only changes with the layout
+        self.layers = BoardLayers()
 
         self.current_component = None
         self.selected_component = None
@@ -115,25 +177,43 @@ class SudokuBoard(QWidget):
         self.v_pressed = False
 
         self.cell_component_selected = False
+        # Colors of all cells while the heatmap is shown, None otherwise
+        self.saved_colors = None
+        # Digits the shown heatmap was computed for
+        self.heatmap_digits = None
+
         self.solver = Solver(self.sudoku)
         self.thread_ = QThread(self.solver)
+        self.solver.moveToThread(self.thread_)
+        self.thread_.started.connect(self.solver.solve)
+        self.solver.finished.connect(self.tidy_up_thread)
+
+        # Samples the running search (or advances its replay) while the board shows a solve
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setInterval(1000 // self.FRAME_RATE)
+        self.frame_timer.timeout.connect(self.show_search)
+        self.shown_version = 0
+        self.replay = None
 
         self.generator = Generator(self.sudoku)
         self.thread_gen = QThread(self.generator)
 
-    def onProgressChanged(self):
-        self.update()
+        # Candidates and conflicts are computed off the GUI thread, only the newest request counts
+        self.candidate_worker = CandidateWorker(notify=self.candidatesReady.emit)
+        self.candidatesReady.connect(self.show_candidates)
+        self.candidate_version = 0
 
     def resizeEvent(self, event: QResizeEvent) -> None:
         self.setFixedWidth(self.height())
         self.cell_size = self.height() // (self.sudoku.size + 2)
+        self.sudoku.geometry = CellGeometry(self.cell_size, self.sudoku.size)
         self.update()
 
     def set_speed(self):
         self.solver.speed = self.window_.speed_slider.value()
 
     def set_value(self, value: int):
-        self.steps_done.append(copy.deepcopy(self.sudoku.cells))
+        self.steps_done.append(self.sudoku.snapshot())
         mode = self.mode_switch.currentIndex()
         for index in self.selected:
             cell = self.sudoku.cells[index]
@@ -142,44 +222,176 @@ class SudokuBoard(QWidget):
                 continue
             else:
                 cell.set_values(mode, value, COLORS)
-        self.update()
+        self.update_cells(self.selected)
 
     def solve_board(self):
-        self.sudoku.brute_force_time = 60
         if self.window_.step_by_step_solve.isChecked():
-            self.solver.progressChanged.connect(self.onProgressChanged)
-            self.solver.moveToThread(self.thread_)
-            self.thread_.started.connect(self.solver.solve)
-            self.solver.finished.connect(self.tidy_up_thread)
+            if self.thread_.isRunning():
+                return
+
+            record = self.window_.replay_box.isChecked()
+            self.solver.job = Job(time_limit=self.TIME_LIMIT)
+            self.solver.prepare(record)
+
+            self.shown_version = 0
+            self.replay = Replay(self.solver.observer.trace) if record else None
+
             self.thread_.start()
+            self.frame_timer.start()
             self.unsolved = False
         else:
-            self.sudoku.solve(random_pick=True)
-            self.sudoku.start_process()
+            self.sudoku.solve(random_pick=True, job=Job(time_limit=self.TIME_LIMIT))
         self.update()
 
     def generate_sudoku(self):
+        self.cancel_jobs()
+        self.generator.job = Job(time_limit=self.TIME_LIMIT, progress=self.generator.report)
 
         self.generator.moveToThread(self.thread_gen)
         self.thread_gen.started.connect(self.generator.generate)
         self.generator.finished.connect(self.tidy_gen)
-        self.generator.progressChanged.connect(self.onProgressChanged)
+        self.generator.progressChanged.connect(self.on_generator_progress)
         self.thread_gen.start()
         self.update()
 
     def tidy_gen(self):
         self.thread_gen.quit()
         self.thread_gen.wait()
+        self.window_.show_progress(
+            self.generator.job.snapshot(), f"{self.generator.job.status}, seed {self.generator.seed}"
+        )
+
+        # A stopped job still leaves a unique puzzle, just with more clues
+        if self.generator.job.result is not None:
+            with self.sudoku.bulk_values():
+                for cell, value in zip(self.sudoku.cells, self.generator.job.result):
+                    cell.value = value
+            self.update_cells(range(81))
         self.update()
 
+    def on_generator_progress(self):
+        self.window_.show_progress(self.generator.progress)
+
+    def cancel_jobs(self):
+        """Stops a running solve or generation at its next check"""
+        for job in (self.solver.job, self.generator.job):
+            if job is not None:
+                job.cancel()
+
     def tidy_up_thread(self):
         self.thread_.quit()
         self.thread_.wait()
+        self.window_.show_progress(self.solver.job.snapshot(), self.solver.job.status)
+
+    def show_search(self):
+        """
+        Shows the newest published state of the search or, for a replay, advances it by the
+        steps of one frame. Stops the timer once the search and its replay are done.
+        """
+        observer = self.solver.observer
+
+        if self.replay is not None:
+            if observer.finished:
+                self.replay.end = observer.solved_at
+            self.replay.advance(max(1, self.solver.speed // self.FRAME_RATE))
+            self.show_values(self.replay.values)
+
+            if observer.finished and self.replay.at_end:
+                self.frame_timer.stop()
+                self.show_values(observer.state.latest()[1])
+            return
+
+        version, values = observer.state.latest()
+        if version != self.shown_version:
+            self.shown_version = version
+            self.show_values(values)
+
+        if observer.finished:
+            self.frame_timer.stop()
+
+    def show_values(self, values: bytes):
+        """Writes the digits of a search state into the cells that are not givens"""
+        changed = []
+        for cell, value, given in zip(self.sudoku.cells, values, self.sudoku.initial_state):
+            if given.value == Constants.EMPTY and cell.value != value:
+                cell.value = value
+                changed.append(cell.index)
+
+        if changed:
+            self.update_cells(changed)
+
+    def show_heatmap(self, show: bool):
+        """
+        Paints the clue analysis over the cell colors. Givens go from green (redundant) to red
+        (many solutions without them), empty cells get darker the more candidates survive.
+        The colors of the cells are restored once the heatmap is hidden.
+        """
+        cells = self.sudoku.cells
+
+        if not show:
+            if self.saved_colors is not None:
+                for cell, colors in zip(cells, self.saved_colors):
+                    cell.colors = colors
+                self.saved_colors = None
+            self.update()
+            return
+
+        if self.saved_colors is None:
+            self.saved_colors = [cell.colors for cell in cells]
+
+        self.heatmap_digits = [cell.value for cell in cells]
+        solver = Puzzle.from_json(self.sudoku.to_json()).solver()
+        analysis = analyse(self.heatmap_digits, self.HEATMAP_LIMIT, solver=solver)
+
+        for cell in cells:
+            if cell.index in analysis.solutions:
+                color = blend(COLORS[2], COLORS[1], analysis.importance(cell.index))
+            else:
+                color = blend(QColor("#FFFFFF"), COLORS[0], analysis.candidates[cell.index] / 9)
+            cell.colors = BoundList([color], max_length=4, sort_=True)
+
+        self.update()
+
+    def hide_stale_heatmap(self, indices: Iterable[int]):
+        """Hides the heatmap once one of the digits it was computed for has changed"""
+        if self.saved_colors is None:
+            return
+
+        if any(self.sudoku.cells[i].value != self.heatmap_digits[i] for i in indices):
+            self.window_.heatmap_box.setChecked(False)
+            self.show_heatmap(False)
 
     def next_step(self):
+        """
+        Shows the next digit of the trace together with the eliminations that lead to it, every
+        step can be undone. Once the trace is used up or the grid was changed, the singles of
+        the current grid are traced.
+        """
+        if self.frame_timer.isActive():
+            return
 
-        self.sudoku.calculate_valid_numbers()
+        cells = self.sudoku.cells
+        if self.replay is None or self.replay.at_end or \
+                bytes(cell.value for cell in cells) != self.replay.values:
+            solver = Puzzle.from_json(self.sudoku.to_json()).solver()
+            trace = Trace(solver.values)
+            propagate(solver, trace)
+            self.replay = Replay(trace)
+
+        event = self.replay.next_value()
+        if event is None:
+            self.window_.show_progress("No single left")
+            return
+
+        self.steps_done.append(self.sudoku.snapshot())
+        for cell, value, mask in zip(cells, self.replay.values, self.replay.masks):
+            cell.value = value
+            if value == Constants.EMPTY:
+                cell.valid_numbers[:] = MASK_DIGITS[mask]
 
+        self.hide_stale_heatmap(range(81))
+        kind, index, number, reason = event
+        self.window_.show_progress(f"r{index // 9 + 1}c{index % 9 + 1} {kind} {number}", reason)
         self.update()
         self.setFocus()
 
@@ -190,6 +402,103 @@ class SudokuBoard(QWidget):
         self.selected.clear()
         self.update()
 
+    def cell_region(self, indices: Iterable[int]) -> QRegion:
+        """
+
+        :return: The rects of the cells, grown a little for antialiased edges
+        """
+        region = QRegion()
+        for index in indices:
+            region += self.sudoku.cells[index].rect(self.cell_size).adjusted(-2, -2, 2, 2)
+        return region
+
+    def highlighted(self, selected: Set[int]) -> Set[int]:
+        """
+
+        :return: The cells highlighted for the selection, i.e. those seen by a single selected cell
+        """
+        if len(selected) != 1 or not self.window_.highlight_cells_box.isChecked():
+            return set()
+
+        cell = self.sudoku.cells[next(iter(selected))]
+        return {c.index for c in cell.sees} if cell.value != 0 else set()
+
+    def update_cells(self, indices: Iterable[int]):
+        """Repaints the cells after their digits, pencil marks or colors have changed"""
+        indices = set(indices)
+        self.hide_stale_heatmap(indices)
+
+        indices |= self.sudoku.conflict_index.take_changed()
+        if indices & self.selected:
+            # The digit of a single selected cell decides whether its peers are highlighted, so
+            # an edit of it can add the highlight as well as take it away
+            indices |= self.update_highlight()
+
+        if self.sudoku.conflict_index.solved != self.solved:
+            self.solved = self.sudoku.conflict_index.solved
+            self.window_.show_progress("Solved" if self.solved else None)
+
+        if indices:
+            self.update(self.cell_region(indices))
+        self.update_selection()
+        self.request_candidates()
+
+    def request_candidates(self):
+        """Hands the board to the candidate worker, typing never waits for the result"""
+        if self.window_.candidates_box.isChecked():
+            self.candidate_version = self.candidate_worker.request(self.sudoku.to_json())
+
+    def show_candidates(self):
+        """Writes the newest candidates into the empty cells, unless a newer request is pending"""
+        _, result = self.candidate_worker.results.latest()
+        if result is None or result.version != self.candidate_version:
+            return
+        if not self.window_.candidates_box.isChecked():
+            return
+
+        changed = set()
+        for cell, mask in zip(self.sudoku.cells, result.masks):
+            if cell.value == Constants.EMPTY and cell.valid_numbers != MASK_DIGITS[mask]:
+                cell.valid_numbers[:] = MASK_DIGITS[mask]
+                changed.add(cell.index)
+
+        if changed:
+            self.update(self.cell_region(changed))
+
+    def update_selection(self):
+        """
+        Repaints what changed since the last call: the cells that joined or left the selection,
+        their orthogonal neighbours (whose outline edges change with them) and the highlighted
+        cells of the old and new selection.
+        """
+        old, new = self.painted_selection, frozenset(self.selected)
+        if old == new:
+            return
+
+        changed = old ^ new
+        dirty = set(changed)
+        for index in changed:
+            dirty.update(cell.index for cell in self.sudoku.cells[index].orthogonal_neighbours)
+
+        dirty |= self.update_highlight()
+
+        self.painted_selection = new
+        self.update(self.cell_region(dirty))
+
+    def update_highlight(self) -> Set[int]:
+        """
+
+        :return: The cells whose highlight changed since the last call
+        """
+        old, self.painted_highlight = self.painted_highlight, self.highlighted(self.selected)
+        return old ^ self.painted_highlight
+
+    def dirty_cells(self, region: QRegion) -> List[int]:
+        return [
+            i for i, cell in enumerate(self.sudoku.cells)
+            if region.intersects(cell.rect(self.cell_size))
+        ]
+
     def paintEvent(self, event: QPaintEvent) -> None:
         painter = QPainter(self)
 
@@ -197,18 +506,14 @@ class SudokuBoard(QWidget):
         painter.setRenderHint(QPainter.TextAntialiasing)
         painter.drawRect(self.rect())
 
-        grid_size = self.cell_size * self.sudoku.size
-
-        painter.fillRect(QRect(self.cell_size, self.cell_size, grid_size, grid_size),
-                         QColor("#FFF"))
+        self.layers.update(self.sudoku, self.cell_size, self.size(), self.devicePixelRatioF())
 
-        # DRAW CELL COLORS
+        # Only the cells in the region of the event have to be drawn, Qt clips the rest anyway
+        cells = self.dirty_cells(event.region())
 
-        for cell in self.sudoku.cells:
-            cell.draw_colors(painter, self.cell_size)
-
-        for cell_cmp in self.sudoku.cell_components:
-            cell_cmp.draw(painter, self.cell_size)
+        draw_background(painter, self.sudoku, self.cell_size)
+        draw_colors(painter, self.sudoku, self.cell_size, cells)
+        painter.drawPixmap(0, 0, self.layers.cells)
 
         # DRAW PHISTOMEFEL RING
 
@@ -230,10 +535,13 @@ class SudokuBoard(QWidget):
 
         offset = self.cell_size // 16  # SHIFTS THE SELECTION LINES INWARDS
 
-        for edge in tile_to_poly(self.sudoku.cells, self.cell_size, self.selected, offset):
+        self.selection_outline.update(self.selected)
+        for edge in self.selection_outline.edges(self.cell_size, offset):
             if self.cell_component is None:
                 edge.draw(painter, self.cell_size, offset)
 
+        # INDICATE CELLS SEEN BY SINGLE SELECTED CELL
+
         if len(self.selected) == 1 and self.window_.highlight_cells_box.isChecked():
 
             c = self.sudoku.cells[next(iter(self.selected))]
@@ -244,108 +552,13 @@ class SudokuBoard(QWidget):
                     if cell != c:
                         painter.fillRect(cell.rect(self.cell_size), QColor(245, 230, 39, 69))
 
-        # DRAW DIAGONALS
-
-        painter.setPen(QPen(QColor(255, 0, 0, 90), 3.0))
-
-        if self.sudoku.diagonal_negative:
-            painter.drawLine(
-                self.cell_size, self.cell_size, self.cell_size * 10, self.cell_size * 10
-            )
-
-        if self.sudoku.diagonal_positive:
-            painter.drawLine(
-                self.cell_size * 10, self.cell_size, self.cell_size, self.cell_size * 10
-            )
-
-        # DRAW GRID
-
-        painter.setPen(QPen(QColor("#000"), 4.0))
-        painter.drawRect(
-            QRect(
-                self.cell_size,
-                self.cell_size,
-                grid_size,
-                grid_size
-            )
+        painter.drawPixmap(0, 0, self.layers.constraints)
+        draw_digits(
+            painter, self.sudoku, self.cell_size, indices=cells,
+            glyphs=digit_atlas(self.cell_size, self.devicePixelRatioF()),
+            conflicts=self.sudoku.conflict_index.conflicts
         )
 
-        for i in range(self.sudoku.size):
-            painter.setPen(QPen(QColor("#000"), 1.0))
-            if i % (self.sudoku.size // (math.sqrt(self.sudoku.size))) == 0:
-                painter.setPen(QPen(QColor("#000"), 4.0))
-
-            painter.drawLine(
-                self.cell_size,
-                self.cell_size + i * self.cell_size,
-                self.cell_size * (self.sudoku.size + 1),
-                self.cell_size + i * self.cell_size,
-            )
-
-            painter.drawLine(
-                self.cell_size + i * self.cell_size,
-                self.cell_size,
-                self.cell_size + i * self.cell_size,
-                self.cell_size * (self.sudoku.size + 1),
-            )
-
-        # INDICATE CELLS SEEN BY SINGLE SELECTED CELL
-
-        for line_cmp in sorted(self.sudoku.lines_components, key=lambda l_cmp: l_cmp.LAYER):
-            line_cmp.draw(painter, self.cell_size)
-
-        for region_cmp in self.sudoku.region_components:
-            region_cmp.draw(painter, self.cell_size)
-
-        for outside_cmp in self.sudoku.outside_components:
-            outside_cmp.draw(painter, self.cell_size)
-
-        for border_cmp in self.sudoku.border_components:
-            border_cmp.draw(painter, self.cell_size)
-
-        painter.setBrush(Qt.NoBrush)
-
-        painter.setPen(QPen(QColor("#000"), 1.0))
-
-        # DRAW CELL CONTENTS
-
-        for i, cell in enumerate(self.sudoku.cells):
-
-            painter.setFont(QFont("Asap", self.cell_size // 2, QFont.Bold))
-            painter.setPen(QPen(QColor("#000000"), 1.0))
-
-            if cell.colors.only(QColor("#000000")):
-                painter.setPen(QPen(QColor("#FFFFFF"), 1.0))
-
-            if cell.value != Constants.EMPTY:
-
-                if self.sudoku.initial_state[i].value != Constants.EMPTY:
-                    painter.setPen(QPen(QColor("#000000"), 1.0))
-                else:
-                    painter.setPen(
-                        QPen(QColor("#3b7cff") if not COLORS[-1] in cell.colors else Qt.white, 1.0))
-
-                painter.drawText(cell.rect(self.cell_size), Qt.AlignCenter, str(cell.value))
-
-            else:
-                size = self.cell_size // 6
-                painter.setBrush(Qt.NoBrush)
-                painter.setFont(QFont("Asap", size))
-                painter.setPen(QPen(QColor("#333333"), 1.0))
-
-                txt = ''.join(sorted(map(str, cell.valid_numbers)))
-
-                if len(txt) > 5:
-                    txt = txt[0:5] + "\n" + txt[5:]
-
-                painter.drawText(cell.rect(self.cell_size), Qt.AlignCenter, txt)
-
-                painter.setFont(QFont("Asap", size))
-
-                for num in cell.corner:
-                    painter.drawText(cell.scaled_rect(self.cell_size, 0.75), str(num),
-                                     cell.corners(num))
-
     def mousePressEvent(self, event: QMouseEvent) -> None:
         self.setFocus()
 
@@ -359,10 +572,6 @@ class SudokuBoard(QWidget):
 
         location = grid_row * 9 + grid_col
 
-        if 0 <= location <= 80:
-            # print(self.sudoku.valid_numbers(location))
-            print(self.sudoku.check_numbers(location))
-
         outside_col = event.x() // self.cell_size
         outside_row = event.y() // self.cell_size
 
@@ -371,7 +580,7 @@ class SudokuBoard(QWidget):
         cell_x = (event.x() - self.cell_size) % self.cell_size
         cell_y = (event.y() - self.cell_size) % self.cell_size
 
-        selected_border = self.get_component_indices(x, y, location)
+        selected_border = border_at(x, y, self.cell_size, corner=self.making_quadruple)
 
         threshhold = 10
         not_on_border = not (
@@ -411,13 +620,15 @@ class SudokuBoard(QWidget):
                             # Little Killer needs to determine the direction of its Diagonal
                             self.current_component.get_direction(event.pos(), self.cell_size)
 
-                        self.sudoku.outside_components.append(self.current_component)
+                        self.sudoku.add_component(
+                            self.sudoku.outside_components, self.current_component
+                        )
 
                         opp = self.current_component.opposite()
 
                         # E.g. There can only be one Sandwich Clue per row / column
-                        if opp is not None and opp in self.sudoku.outside_components:
-                            self.sudoku.outside_components.remove(opp)
+                        if opp is not None:
+                            self.sudoku.remove_component(self.sudoku.outside_components, opp)
 
                         self.selected_component = self.current_component
 
@@ -454,7 +665,9 @@ class SudokuBoard(QWidget):
                         else:
                             self.current_component.indices = selected_border
 
-                        self.sudoku.border_components.append(self.current_component)
+                        self.sudoku.add_component(
+                            self.sudoku.border_components, self.current_component
+                        )
                         self.selected_component = self.current_component
 
                         self.current_component = copy.copy(self.current_component)
@@ -473,25 +686,27 @@ class SudokuBoard(QWidget):
 
                     if event.modifiers() == Qt.ShiftModifier:
 
-                        self.selected_component = self.current_component.get_value(location)
+                        self.selected_component = self.current_component.get(location)
                         if self.selected_component is None:
                             return
 
-                        self.selected = {self.selected_component.hovered_cell}
+                        self.selected = {self.selected_component.index}
                         self.update()
 
                         return
                     else:
-                        self.current_component.hovered_cell = location
+                        self.current_component.index = location
 
-                        self.sudoku.cell_components.append(self.current_component)
+                        self.sudoku.add_component(
+                            self.sudoku.cell_components, self.current_component
+                        )
                         self.selected_component = self.current_component
 
                         self.current_component = copy.copy(self.current_component)
                         self.current_component.clear()
                         self.window_.rule_view.add_rule(self.current_component.RULE)
 
-                        self.selected = {self.selected_component.hovered_cell}
+                        self.selected = {self.selected_component.index}
                         self.update()
                         return
 
@@ -504,12 +719,13 @@ class SudokuBoard(QWidget):
                             and not isinstance(self.selected_component,
                                                Arrow | BetweenLine | LockoutLine | Thermometer)):
                             if self.selected_component.valid_location(location, not_on_border):
+                                self.sudoku.hit_index.update(self.selected_component)
                                 self.update()
                                 self.selected = {*self.selected_component.ends}
                         return
 
                     if event.modifiers() == Qt.ShiftModifier:
-                        self.selected_component = self.current_component.get_value(location)
+                        self.selected_component = self.current_component.get(location)
                         if not self.selected_component:
                             self.selected.clear()
                             return
@@ -522,13 +738,16 @@ class SudokuBoard(QWidget):
                         if isinstance(self.selected_component,
                                       Arrow | LockoutLine | BetweenLine | Thermometer):
                             if self.selected_component.delete_branch(location):
+                                self.sudoku.hit_index.update(self.selected_component)
                                 self.update()
                                 self.selected.clear()
                                 return
 
                         self.current_component.setup(location)
 
-                        self.sudoku.lines_components.append(self.current_component)
+                        self.sudoku.add_component(
+                            self.sudoku.lines_components, self.current_component
+                        )
                         self.selected_component = self.current_component
 
                         self.current_component = copy.copy(self.current_component)
@@ -540,7 +759,7 @@ class SudokuBoard(QWidget):
 
                 case RegionComponent() if not outside_grid:
                     if event.modifiers() == Qt.ShiftModifier:
-                        self.selected_component = self.current_component.get_value(location)
+                        self.selected_component = self.current_component.get(location)
 
                         if not self.selected_component:
                             return
@@ -553,7 +772,9 @@ class SudokuBoard(QWidget):
 
                         self.current_component.indices = BoundList([location], max_length=9)
 
-                        self.sudoku.region_components.append(self.current_component)
+                        self.sudoku.add_component(
+                            self.sudoku.region_components, self.current_component
+                        )
                         self.selected_component = self.current_component
 
                         self.current_component = copy.copy(self.current_component)
@@ -615,17 +836,22 @@ class SudokuBoard(QWidget):
                     if cmp.can_add_branch(new_location) and not_on_border:
                         cmp.branches.append([self.sudoku.cells[new_location]])
                         cmp.current_branch = cmp.branches[-1]
+                        self.sudoku.hit_index.update(cmp)
 
                 else:
                     if cmp.valid_location(new_location) and not_on_border:
                         cmp.current_branch.append(self.sudoku.cells[new_location])
+                        self.sudoku.hit_index.update(cmp)
                         self.update()
                     else:
                         if cmp.can_remove(new_location):
                             cmp.current_branch.remove(cmp.current_branch[-1])
+                            self.sudoku.hit_index.update(cmp)
+                            self.update()
 
             case PalindromeLine() | GermanWhispersLine() if not outside_grid:
                 if self.selected_component.valid_location(new_location, not_on_border):
+                    self.sudoku.hit_index.update(cmp)
                     self.update()
 
                     self.selected = {*cmp.ends}
@@ -636,6 +862,7 @@ class SudokuBoard(QWidget):
                 if (new_location in self.selected_component.get_neighbours()
                     and self.selected_component.valid_location(new_location)):
                     self.selected_component.indices.append(new_location)
+                    self.sudoku.hit_index.update(cmp)
 
                 self.update()
 
@@ -646,14 +873,22 @@ class SudokuBoard(QWidget):
 
         elif event.buttons() == Qt.RightButton and new_location in self.selected:
             self.selected.remove(new_location)
-        self.update()
+        self.update_selection()
 
     def mouseReleaseEvent(self, event: QMouseEvent) -> None:
 
         if isinstance(self.selected_component, Arrow | BetweenLine | LockoutLine | Thermometer):
             self.selected_component.current_branch = None
 
+        if self.current_component is not None:
+            self.update_components()
+        self.update_selection()
+
+    def update_components(self):
+        """Repaints after components were placed or changed, their rules may add conflicts"""
+        self.sudoku.refresh_rules()
         self.update()
+        self.request_candidates()
 
     def keyPressEvent(self, event: QKeyEvent) -> None:
         key = event.key()
@@ -671,6 +906,7 @@ class SudokuBoard(QWidget):
                 for i in self.selected:
                     cell = self.sudoku.cells[i]
                     cell.clear_values(self.sudoku, mode)
+                self.update_cells(self.selected)
 
         F_KEYS = [Qt.Key_F1, Qt.Key_F2, Qt.Key_F3, Qt.Key_F4]
         if key in F_KEYS:
@@ -687,7 +923,7 @@ class SudokuBoard(QWidget):
         if key == Qt.Key_Backspace:
             if isinstance(self.selected_component, Sandwich | Cage | LittleKiller | XSumsClue):
                 self.selected_component.reduce_total()
-                self.update()
+                self.update_components()
                 return
 
         number_keys = [
@@ -704,14 +940,14 @@ class SudokuBoard(QWidget):
 
         if isinstance(self.selected_component, XVSum):
             self.selected_component.set_value(self.v_pressed, self.x_pressed)
-            self.update()
+            self.update_components()
             return
 
         if key == Qt.Key_0:
 
             if isinstance(self.selected_component, Sandwich | Cage | LittleKiller | XSumsClue):
                 self.selected_component.increase_total(0)
-                self.update()
+                self.update_components()
                 return
 
         if key in number_keys:
@@ -721,15 +957,15 @@ class SudokuBoard(QWidget):
             if self.selected_component is not None:
                 if isinstance(self.selected_component, Difference | Ratio | Quadruple):
                     self.selected_component.set_value(val)
-                    self.update()
+                    self.update_components()
                     return
                 elif isinstance(self.selected_component,
                                 Sandwich | Cage | LittleKiller | XSumsClue):
                     self.selected_component.increase_total(val)
-                    self.update()
+                    self.update_components()
                     return
 
-            self.steps_done.append(copy.deepcopy(self.sudoku.cells))
+            self.steps_done.append(self.sudoku.snapshot())
             for index in self.selected:
                 cell = self.sudoku.cells[index]
 
@@ -739,15 +975,16 @@ class SudokuBoard(QWidget):
                     cell.set_values(mode, val, COLORS)
                     # self.sudoku.calculate_valid_numbers()
 
-        self.update()
+            self.update_cells(self.selected)
 
         if event.key() == Qt.Key_A and event.modifiers() == Qt.ControlModifier:
             self.selected = {i for i in range(81)}
 
         if event.key() == Qt.Key_Z and event.modifiers() == Qt.ControlModifier:
             if self.steps_done:
-                step = self.steps_done.pop()
-                self.sudoku.cells = copy.deepcopy(step)
+                self.sudoku.restore(self.steps_done.pop())
+                self.update()
+                self.update_cells(range(81))
 
         if len(self.selected) == 1:
             index = next(iter(self.selected))
@@ -764,7 +1001,7 @@ class SudokuBoard(QWidget):
             if event.key() in (Qt.Key_D, Qt.Key_Right) and index % 9 != 8:
                 self.selected = {index + 1}
 
-        self.update()
+        self.update_selection()
 
     def keyReleaseEvent(self, event: QKeyEvent) -> None:
         if event.key() == Qt.Key_V:
@@ -800,68 +1037,10 @@ class SudokuBoard(QWidget):
                 similar_cells = [selected_cell]
 
         for cell in similar_cells:
-            self.selected.add(cell.hovered_cell)
+            self.selected.add(cell.index)
 
         self.update()
 
-    def get_component_indices(self, x: int, y: int, cell_index: int) -> List[int]:
-        """
-
-        @param x: Mouse Click X
-        @param y: Mouse Click Y
-        @param cell_index: Index of clicked Cell
-        @return: List of indices that correspond tho the cells that share a clicked border
-        """
-
-        col, row = cell_index % 9, cell_index // 9
-        threshhold = self.cell_size // 3  # How far from a border can you click to select it
-
-        if self.making_quadruple:
-
-            if x % self.cell_size <= threshhold and y % self.cell_size <= threshhold:
-                # TOP_LEFT
-
-                if row > 0 and col > 0:
-                    return [cell_index - 10, cell_index - 9, cell_index - 1, cell_index]
-
-            if x % self.cell_size >= self.cell_size - threshhold and y % self.cell_size <= threshhold:
-                # TOP_RIGHT
-                if row > 0 and col < 8:
-                    return [cell_index - 9, cell_index - 8, cell_index, cell_index + 1, ]
-
-            if x % self.cell_size <= threshhold \
-                and y % self.cell_size >= self.cell_size - threshhold:
-                # BOTTOM_LEFT
-
-                if row < 8 and col > 0:
-                    return [cell_index - 1, cell_index, cell_index + 9, cell_index + 8]
-
-            if (x % self.cell_size >= self.cell_size - threshhold
-                and y % self.cell_size >= self.cell_size - threshhold):
-                # BOTTOM_RIGHT
-                if row < 8 and col < 8:
-                    return [cell_index, cell_index + 1, cell_index + 9, cell_index + 10]
-
-            return None
-
-        else:
-
-            if x % self.cell_size <= 10 and col > 0:
-                return [cell_index - 1, cell_index]
-
-            elif x % self.cell_size >= self.cell_size - 10 and col < 8:
-                return [cell_index, cell_index + 1]
-
-            elif y % self.cell_size <= 10 and row > 0:
-                return [cell_index - 9, cell_index]
-
-            elif y % self.cell_size >= self.cell_size - 10 and row < 8:
-                return [cell_index, cell_index + 9]
-
-            else:
-                return None
-                # NO BORDER HIT
-
     def is_orthogonal(self, location: int, lst: List[int]):
         if len(lst) <= 1:
             return True
@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import math
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 from PySide6.QtCore import QPoint, QRect
 from PySide6.QtGui import QPainter, QBrush, QColor, QPen, QFont, Qt
 
+from alt.sudoku_.hit_index import CELL, border_slot
 from alt.sudoku_.sudoku import Sudoku, Cell
 from alt.utils import BoundList
 
@@ -39,6 +40,20 @@ class Component(ABC):
     def second(self) -> Cell:
         return self.cells[1]
 
+    def slots(self) -> List[Tuple]:
+        """
+
+        :return: Slots of the board the component occupies (see sudoku_.hit_index)
+        """
+        return [(CELL, index) for index in self.indices]
+
+    def get(self, index: int):
+        """
+
+        :return: The newest component of this class in the cell, None if there is none
+        """
+        return self.sudoku.hit_index.find((CELL, index), self.__class__)
+
     def set_candidates(self) -> int:
         return 1
 
@@ -76,10 +91,12 @@ class BorderComponent(Component):
     def to_json(self) -> Dict:
         pass
 
+    def slots(self) -> List[Tuple]:
+        slot = border_slot(self.indices)
+        return [slot] if slot is not None else []
+
     def get(self, selected_indices: List[int]) -> BorderComponent:
-        for cmp in self.sudoku.border_components:
-            if sorted(cmp.indices) == sorted(selected_indices):
-                return cmp
+        return self.sudoku.hit_index.find(border_slot(selected_indices), BorderComponent)
 
     def other_cell(self, index: int) -> Cell:
         """
@@ -1,7 +1,10 @@
+from typing import List, Tuple
+
 from PySide6.QtCore import Qt, QPoint
 from PySide6.QtGui import QPainter, QColor, QBrush
 
 from alt.constraints.border_components import Component
+from alt.sudoku_.hit_index import CELL
 
 
 class CellComponent(Component):
@@ -15,7 +18,7 @@ class CellComponent(Component):
         return f"{self.index}"
 
     def __eq__(self, other):
-        return self.index == other.hovered_cell
+        return self.index == other.index
 
     def to_json(self):
         return {
@@ -26,10 +29,11 @@ class CellComponent(Component):
     def clear(self):
         self.index = 0
 
+    def slots(self) -> List[Tuple]:
+        return [(CELL, self.index)]
+
     def get(self, index: int):
-        for cmp in self.sudoku.cell_components:
-            if cmp.hovered_cell == index:
-                return cmp
+        return self.sudoku.hit_index.find((CELL, index), CellComponent)
 
 
 class OddDigit(CellComponent):
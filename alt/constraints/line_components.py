@@ -6,6 +6,7 @@ from PySide6.QtCore import Qt, QPoint
 from PySide6.QtGui import QPainter, QColor, QPen, QBrush, QPolygon
 
 from alt.constraints.border_components import Component
+from alt.sudoku_.hit_index import CELL
 from alt.sudoku_.sudoku import Sudoku, Cell
 from alt.utils import smallest_sum_including_x, sum_first_n, BoundList
 
@@ -27,10 +28,12 @@ class LineComponent(Component):
                     return True
         return False
 
-    def get(self, index: int) -> LineComponent:
-        for cmp in self.sudoku.lines_components:
-            if isinstance(cmp, self.__class__) and index in cmp.indices:
-                return cmp
+    def slots(self) -> List[Tuple]:
+        """Lines with a bulb keep most of their cells in branches"""
+        indices = set(self.indices)
+        for branch in getattr(self, "branches", ()):
+            indices.update(cell.index for cell in branch)
+        return [(CELL, index) for index in indices]
 
     @property
     def ends(self):
@@ -166,11 +169,6 @@ class GermanWhispersLine(LineComponent):
     def ends(self):
         return self.first.index, self.last.index
 
-    def get(self, index: int):
-        for cmp in self.sudoku.lines_components:
-            if isinstance(cmp, GermanWhispersLine) and index in cmp.indices:
-                return cmp
-
     def clear(self):
         self.indices = BoundList([])
 
@@ -219,11 +217,6 @@ class PalindromeLine(LineComponent):
                     return True
         return False
 
-    def get(self, index: int):
-        for cmp in self.sudoku.lines_components:
-            if isinstance(cmp, PalindromeLine) and index in cmp.indices:
-                return cmp
-
     def clear(self):
         self.indices = BoundList([])
 
@@ -278,30 +271,25 @@ class Thermometer(LineComponent):
     def to_json(self):
         return {
             "type": self.__class__.__name__,
-            "index": self.bulb.hovered_cell,
+            "index": self.bulb.index,
             "branches": [[c.index for c in branch] for branch in self.branches]
         }
 
-    def get(self, index: int):
-        for cmp in self.sudoku.lines_components:
-            if isinstance(cmp, Thermometer) and cmp.bulb.hovered_cell == index:
-                return cmp
-
     def __eq__(self, other):
         if isinstance(other, Thermometer):
-            return self.bulb.hovered_cell == other.bulb.hovered_cell
+            return self.bulb.index == other.bulb.index
         return False
 
     def can_remove(self, index: int):
-        if len(self.current_branch) > 1 and index == self.current_branch[-2].hovered_cell:
+        if len(self.current_branch) > 1 and index == self.current_branch[-2].index:
             return True
         return False
 
     def valid_location(self, index: int) -> bool:
         return (
             index in self.sudoku.indices(self.current_branch[-1].neighbours)
-            and index != self.bulb.hovered_cell
-            and index not in [c.hovered_cell for c in self.current_branch]
+            and index != self.bulb.index
+            and index not in [c.index for c in self.current_branch]
             and len(self.current_branch) < 8
         )
 
@@ -315,13 +303,13 @@ class Thermometer(LineComponent):
         else:
             branch = None
 
-        if branch is None and index != self.bulb.hovered_cell:
+        if branch is None and index != self.bulb.index:
             return True
 
         if not self.branches:
             return True
 
-        if index == self.bulb.hovered_cell:
+        if index == self.bulb.index:
 
             if number > 9 - max([len(branch) for branch in self.branches]):
                 return False
@@ -429,11 +417,6 @@ class Arrow(LineComponent):
 
         self.current_branch = None
 
-    def get(self, index: int):
-        for cmp in self.sudoku.lines_components:
-            if isinstance(cmp, Arrow) and cmp.bulb.hovered_cell == index:
-                return cmp
-
     @property
     def ends(self):
         return self.first.index,
@@ -451,7 +434,7 @@ class Arrow(LineComponent):
         return f"{' -> '.join(map(str, self.cells))}"
 
     def sum_so_far(self):
-        return sum([c.value for c in self.cells[self.bulb.hovered_cell:] if c.value != 0])
+        return sum([c.value for c in self.cells[self.bulb.index:] if c.value != 0])
 
     def can_add_branch(self, index: int):
         return index in self.sudoku.indices(self.bulb.neighbours)
@@ -477,19 +460,19 @@ class Arrow(LineComponent):
     def valid_location(self, index: int) -> bool:
         return (
             index in self.sudoku.indices(self.current_branch[-1].neighbours)
-            and index != self.bulb.hovered_cell
-            and index not in [c.hovered_cell for c in self.current_branch]
+            and index != self.bulb.index
+            and index not in [c.index for c in self.current_branch]
         )
 
     def can_remove(self, index: int):
-        if len(self.current_branch) > 1 and index == self.current_branch[-2].hovered_cell:
+        if len(self.current_branch) > 1 and index == self.current_branch[-2].index:
             return True
         return False
 
     def to_json(self):
         return {
             "type": self.__class__.__name__,
-            "index": self.bulb.hovered_cell,
+            "index": self.bulb.index,
             "branches": [[c.index for c in branch] for branch in self.branches]
         }
 
@@ -516,7 +499,7 @@ class Arrow(LineComponent):
         return True
 
     def valid(self, index: int, number: int):
-        if index == self.bulb.hovered_cell:
+        if index == self.bulb.index:
 
             if self.unique:
                 return number >= sum_first_n(len(self.arrow_cells))
@@ -626,19 +609,13 @@ class BetweenLine(LineComponent):
 
         self.color = QColor("#CCCCCC")
 
-    def get(self, index: int):
-
-        for cmp in self.sudoku.lines_components:
-            if isinstance(cmp, BetweenLine) and cmp.bulb.hovered_cell == index:
-                return cmp
-
     def can_add_branch(self, index: int):
         return index in self.sudoku.indices(self.bulb.neighbours)
 
     def to_json(self):
         return {
             "type": self.__class__.__name__,
-            "index": self.bulb.hovered_cell,
+            "index": self.bulb.index,
             "branches": [[c.index for c in branch] for branch in self.branches]
         }
 
@@ -662,8 +639,8 @@ class BetweenLine(LineComponent):
     def valid_location(self, index: int) -> bool:
         return (
             index in self.sudoku.indices(self.current_branch[-1].neighbours)
-            and index != self.bulb.hovered_cell
-            and index not in [c.hovered_cell for c in self.current_branch]
+            and index != self.bulb.index
+            and index not in [c.index for c in self.current_branch]
         )
 
     def get_branch(self, index: int) -> List[Cell]:
@@ -680,7 +657,7 @@ class BetweenLine(LineComponent):
         return False
 
     def can_remove(self, index: int):
-        if len(self.current_branch) > 1 and index == self.current_branch[-2].hovered_cell:
+        if len(self.current_branch) > 1 and index == self.current_branch[-2].index:
             return True
         return False
 
@@ -691,10 +668,10 @@ class BetweenLine(LineComponent):
         else:
             branch = None
 
-        if branch is None and index != self.bulb.hovered_cell:
+        if branch is None and index != self.bulb.index:
             return True
 
-        if index == self.bulb.hovered_cell:
+        if index == self.bulb.index:
 
             for branch_ in self.branches:
                 end = branch_[-1]
@@ -772,16 +749,10 @@ class LockoutLine(LineComponent):
     def to_json(self):
         return {
             "type": self.__class__.__name__,
-            "index": self.bulb.hovered_cell,
+            "index": self.bulb.index,
             "branches": [[c.index for c in branch] for branch in self.branches]
         }
 
-    def get(self, index: int):
-
-        for cmp in self.sudoku.lines_components:
-            if isinstance(cmp, LockoutLine) and cmp.bulb.hovered_cell == index:
-                return cmp
-
     @property
     def ends(self):
         return [self.first.index] + [branch[-1].index for branch in self.branches]
@@ -805,8 +776,8 @@ class LockoutLine(LineComponent):
     def valid_location(self, index: int) -> bool:
         return (
             index in self.sudoku.indices(self.current_branch[-1].neighbours)
-            and index != self.bulb.hovered_cell
-            and index not in [c.hovered_cell for c in self.current_branch]
+            and index != self.bulb.index
+            and index not in [c.index for c in self.current_branch]
         )
 
     def get_branch(self, index: int) -> List[Cell]:
@@ -823,7 +794,7 @@ class LockoutLine(LineComponent):
         return False
 
     def can_remove(self, index: int):
-        if len(self.current_branch) > 1 and index == self.current_branch[-2].hovered_cell:
+        if len(self.current_branch) > 1 and index == self.current_branch[-2].index:
             return True
         return False
 
@@ -834,10 +805,10 @@ class LockoutLine(LineComponent):
         else:
             branch = None
 
-        if branch is None and index != self.bulb.hovered_cell:
+        if branch is None and index != self.bulb.index:
             return True
 
-        if index == self.bulb.hovered_cell:
+        if index == self.bulb.index:
 
             for branch_ in self.branches:
                 end = branch_[-1]
@@ -7,6 +7,7 @@ from PySide6.QtCore import Qt, QRect, QPoint
 from PySide6.QtGui import QPainter, QPen, QColor, QFont
 
 from alt.constraints.border_components import Component
+from alt.sudoku_.hit_index import OUTSIDE
 from alt.sudoku_.sudoku import Cell
 from alt.utils import n_digit_sums
 
@@ -20,10 +21,10 @@ class OutsideComponent(Component):
         self.total = total
 
     def __eq__(self, other):
-        return self.col == other.col and self.row == other.get_entire_row
+        return self.col == other.col and self.row == other.row
 
     def __lt__(self, other):
-        return (self.row * 11 + self.col) < (other.get_entire_row * 11 + other.col)
+        return (self.row * 11 + self.col) < (other.row * 11 + other.col)
 
     @property
     def cells(self) -> List[Cell]:
@@ -43,10 +44,11 @@ class OutsideComponent(Component):
     def values(self):
         return [cell.value for cell in self.cells]
 
+    def slots(self) -> List[Tuple]:
+        return [(OUTSIDE, self.col, self.row)]
+
     def get(self, col: int, row: int):
-        for cmp in self.sudoku.outside_components:
-            if (cmp.col, cmp.get_entire_row) == (col, row):
-                return cmp
+        return self.sudoku.hit_index.find((OUTSIDE, col, row), OutsideComponent)
 
     def setup(self, col: int, row: int):
         self.col = col
@@ -326,9 +328,9 @@ class LittleKiller(OutsideComponent):
                 return [self.sudoku.cells[i] for i in range(0, 81, 10)]
 
             case 10, 0:
-                return [self.sudoku.cells[i] for i in range(8, 81, 8)]
+                return [self.sudoku.cells[i] for i in range(8, 73, 8)]
             case 0, 10:
-                return [self.sudoku.cells[i] for i in range(8, 81, 8)]
+                return [self.sudoku.cells[i] for i in range(8, 73, 8)]
             case 0, _ if 0 < self.col < 10:
                 cells = []
                 row = 0
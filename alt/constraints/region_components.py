@@ -8,8 +8,9 @@ from PySide6.QtCore import Qt, QRect, QPoint, QSize
 from PySide6.QtGui import QPainter, QPen, QColor, QFont
 
 from alt.constraints.border_components import Component
+from alt.sudoku_.hit_index import CELL
 from alt.sudoku_.sudoku import Cell
-from alt.sudoku_.edge import tile_to_poly
+from alt.sudoku_.edge import outline
 from alt.utils import BoundList, sum_first_n, n_digit_sums, Constants
 
 
@@ -23,11 +24,12 @@ class RegionComponent(Component, ABC):
     def opposite(self):
         pass
 
+    def get(self, index: int):
+        return self.sudoku.hit_index.find((CELL, index), RegionComponent)
+
     def valid_location(self, index: int):
-        for r_cmp in self.sudoku.region_components:
-            if index in r_cmp.indices:
-                return False
-        return True
+        """Regions do not overlap"""
+        return self.get(index) is None
 
     def get_neighbours(self):
         return list(itertools.chain.from_iterable(
@@ -124,11 +126,6 @@ class Cage(RegionComponent):
         if self.total is not None:
             self.total = sum_first_n(len(self.indices))
 
-    def get(self, index: int):
-        for cmp in self.sudoku.region_components:
-            if index in cmp.indices:
-                return cmp
-
     def valid(self, index: int, number: int) -> bool:
         if self.total is None:
             return True
@@ -180,7 +177,7 @@ class Cage(RegionComponent):
 
         painter.setPen(pen)
 
-        edges = tile_to_poly(self.sudoku.cells, cell_size, set(self.indices), self.inner_offset)
+        edges = outline(frozenset(self.indices)).edges(cell_size, self.inner_offset)
         for edge in edges:
             if edge.edge_type == (0 if funny else Constants.NORTH):
 
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import itertools
+import json
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List
+
+from PySide6.QtCore import QObject, QRect, QSize, Qt, Signal
+from PySide6.QtGui import QImage, QPainter, QPicture
+from PySide6.QtSvg import QSvgGenerator
+
+from render import BoardRenderer, Style, application, board_size, paint_sudoku, to_sudoku
+from alt.sudoku_.puzzle import Puzzle, load
+from alt.sudoku_.puzzle_file import parse_grid
+from sudoku_.sudoku import Sudoku
+
+FORMATS = ("png", "jpg", "bmp", "svg")
+
+
+def load_sudoku(puzzle: str) -> Sudoku:
+    """
+
+    :param puzzle: Path of a json file written by Sudoku.to_file or 81 digits (0 or . = empty)
+    :return: The Sudoku, digits of an 81 character string count as givens
+    """
+    if puzzle.endswith(".json"):
+        sudoku = Sudoku()
+        sudoku.from_file(puzzle)
+        return sudoku
+
+    sudoku = Sudoku.from_string(puzzle)
+    for given, cell in zip(sudoku.initial_state, sudoku.cells):
+        given.value = cell.value
+    return sudoku
+
+
+def load_puzzle(puzzle: str) -> Puzzle:
+    """
+    Same as load_sudoku but without building the Qt components, which is a lot faster.
+
+    :param puzzle: Path of a json file written by Sudoku.to_file or 81 digits (0 or . = empty)
+    """
+    if puzzle.endswith(".json"):
+        return load(puzzle)
+    return Puzzle(parse_grid(puzzle))
+
+
+def record(sudoku: Sudoku, cell_size: int = 64, pencil_marks: bool = False) -> QPicture:
+    """
+    Records the paint commands of the board. This is cheap enough for the GUI thread, the
+    picture does not reference the Sudoku anymore and can be played back on a worker.
+    """
+    picture = QPicture()
+    painter = QPainter(picture)
+    paint_sudoku(painter, sudoku, cell_size, pencil_marks)
+    painter.end()
+
+    picture.setBoundingRect(QRect(0, 0, *board_size(sudoku, cell_size).toTuple()))
+    return picture
+
+
+def render_image(sudoku: Sudoku, cell_size: int = 64, pencil_marks: bool = False) -> QImage:
+    image = QImage(board_size(sudoku, cell_size), QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.white)
+
+    painter = QPainter(image)
+    paint_sudoku(painter, sudoku, cell_size, pencil_marks)
+    painter.end()
+    return image
+
+
+def save_image(image: QImage, path: str):
+    if not image.save(path):
+        raise OSError(f"Could not write {path}")
+
+
+def write(path: str, size: QSize, paint: Callable[[QPainter], None]):
+    """
+
+    :param path: Target file, .svg files are written as vector graphics, everything else as image
+    :param size: Size of the image
+    :param paint: Paints the content with the painter it is given
+    """
+    if path.endswith(".svg"):
+        generator = QSvgGenerator()
+        generator.setFileName(path)
+        generator.setSize(size)
+        generator.setViewBox(QRect(0, 0, size.width(), size.height()))
+
+        painter = QPainter(generator)
+        paint(painter)
+        painter.end()
+        return
+
+    image = QImage(size, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.white)
+
+    painter = QPainter(image)
+    paint(painter)
+    painter.end()
+
+    save_image(image, path)
+
+
+def write_picture(picture: QPicture, size: QSize, path: str):
+    write(path, size, picture.play)
+
+
+def write_json(data: Dict, path: str):
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+
+
+def export_sudoku(puzzle: str | Sudoku, path: str, cell_size: int = 64,
+                  pencil_marks: bool = False) -> str:
+    """
+    Renders and writes one board in the calling thread.
+
+    :param puzzle: A Sudoku or anything load_sudoku accepts
+    :return: path
+    """
+    sudoku = load_sudoku(puzzle) if isinstance(puzzle, str) else puzzle
+    write(path, board_size(sudoku, cell_size),
+          lambda painter: paint_sudoku(painter, sudoku, cell_size, pencil_marks))
+    return path
+
+
+def export_puzzle(puzzle: Puzzle, path: str, renderer: BoardRenderer) -> str:
+    """
+    Writes one board with the cached layers of renderer, svg files are painted as vectors.
+
+    :return: path
+    """
+    if path.endswith(".svg"):
+        return export_sudoku(to_sudoku(puzzle), path, renderer.style.cell_size)
+
+    save_image(renderer.render(puzzle), path)
+    return path
+
+
+# Renderer of a batch worker process, its layers are reused for all puzzles of the process
+_renderer: BoardRenderer | None = None
+
+
+def _start_worker(cell_size: int):
+    global _renderer
+
+    application()
+    _renderer = BoardRenderer(Style(cell_size))
+
+
+def _export_numbered(number: int, puzzle: str, directory: str, fmt: str) -> str:
+    if puzzle.endswith(".json"):
+        name = os.path.splitext(os.path.basename(puzzle))[0]
+    else:
+        name = f"{number:06d}"
+    return export_puzzle(load_puzzle(puzzle), os.path.join(directory, f"{name}.{fmt}"), _renderer)
+
+
+def export_batch(puzzles: Iterable[str], directory: str, fmt: str = "png", cell_size: int = 64,
+                 workers: int = None, progress: Callable[[int, str], None] = None) -> List[str]:
+    """
+    Exports many boards in parallel. Painting is mostly Python, so the puzzles are spread over
+    processes (each with its own offscreen application and BoardRenderer) instead of threads.
+
+    :param puzzles: Json files and / or 81 character strings
+    :param directory: Target directory, json files keep their name, strings are numbered
+    :param fmt: One of FORMATS
+    :param workers: Number of processes, None = one per processor
+    :param progress: Called with (number of the puzzle, written path) once a file is written
+    :return: The written paths in order of puzzles
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, use one of {', '.join(FORMATS)}")
+
+    os.makedirs(directory, exist_ok=True)
+    puzzles = list(puzzles)
+    paths = []
+
+    with ProcessPoolExecutor(workers, initializer=_start_worker, initargs=(cell_size,)) as pool:
+        for number, path in enumerate(pool.map(
+            _export_numbered, range(len(puzzles)), puzzles, itertools.repeat(directory),
+            itertools.repeat(fmt), chunksize=16
+        )):
+            paths.append(path)
+            if progress is not None:
+                progress(number, path)
+
+    return paths
+
+
+class Exporter(QObject):
+    """
+    Writes files on worker threads so saving never blocks the GUI. Everything that touches the
+    Sudoku (recording the board, building the json) happens in the calling thread, the workers
+    only get finished snapshots. Signals are delivered in the thread of the exporter.
+    """
+    saved = Signal(str)
+    failed = Signal(str, str)
+
+    def __init__(self, parent: QObject = None, workers: int = 2):
+        super().__init__(parent)
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="export")
+
+    def _submit(self, path: str, function: Callable, *args) -> Future:
+        future = self._pool.submit(function, *args)
+        future.add_done_callback(lambda done: self._finished(path, done))
+        return future
+
+    def _finished(self, path: str, future: Future):
+        if future.exception() is not None:
+            self.failed.emit(path, str(future.exception()))
+        else:
+            self.saved.emit(path)
+
+    def save_board(self, sudoku: Sudoku, path: str, cell_size: int = 64,
+                   pencil_marks: bool = False) -> Future:
+        """
+
+        :param path: .svg for vector graphics, any other image extension for a raster image
+        """
+        picture = record(sudoku, cell_size, pencil_marks)
+        return self._submit(path, write_picture, picture, board_size(sudoku, cell_size), path)
+
+    def save_image(self, image: QImage, path: str) -> Future:
+        return self._submit(path, save_image, image, path)
+
+    def save_json(self, sudoku: Sudoku, path: str) -> Future:
+        return self._submit(path, write_json, sudoku.to_json(), path)
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait)
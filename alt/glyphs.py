@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from PySide6.QtCore import QRect, Qt
+from PySide6.QtGui import QColor, QFont, QPainter, QPen, QPixmap
+
+# Positions of the first four corner marks, any further marks are centered
+CORNERS = (
+    Qt.AlignTop | Qt.AlignLeft, Qt.AlignTop | Qt.AlignRight,
+    Qt.AlignBottom | Qt.AlignLeft, Qt.AlignBottom | Qt.AlignRight
+)
+
+# Bits 0 - 8 stand for the digits 1 - 9
+MASK_TEXT = [
+    ''.join(str(d) for d in range(1, 10) if mask & (1 << (d - 1))) for mask in range(0x200)
+]
+
+
+class GlyphAtlas:
+    """
+    Pre-rendered digits of one pair of fonts at one cell size. Every glyph is a transparent
+    pixmap of a whole cell, so painting a cell is one blit at its top left corner instead of
+    setting fonts and laying out text.
+
+    digit gives the big digits (per color), marks the center and corner marks of an empty cell,
+    composed once per pair of digit masks and kept in an LRU.
+    """
+
+    def __init__(self, cell_size: int, digit_font: QFont, pencil_font: QFont,
+                 ratio: float = 1.0, wrap: int = 5, layouts: int = 2048):
+        """
+
+        :param ratio: Device pixel ratio of the widget the glyphs are drawn on
+        :param wrap: Center marks start a second line after this many digits, 0 = never
+        :param layouts: Number of mark layouts that are kept
+        """
+        self.cell_size = cell_size
+        self.digit_font = digit_font
+        self.pencil_font = pencil_font
+        self.ratio = ratio
+        self.wrap = wrap
+        self.layouts = layouts
+
+        self._digits: Dict[Tuple[int, int], QPixmap] = {}
+        self._marks: OrderedDict[Tuple[int, int, int], QPixmap] = OrderedDict()
+
+    def _glyph(self, paint) -> QPixmap:
+        pixmap = QPixmap(round(self.cell_size * self.ratio), round(self.cell_size * self.ratio))
+        pixmap.setDevicePixelRatio(self.ratio)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        paint(painter, QRect(0, 0, self.cell_size, self.cell_size))
+        painter.end()
+        return pixmap
+
+    def digit(self, number: int, color: QColor) -> QPixmap:
+        key = (number, color.rgba())
+        if key not in self._digits:
+            def paint(painter: QPainter, rect: QRect):
+                painter.setFont(self.digit_font)
+                painter.setPen(QPen(color, 1.0))
+                painter.drawText(rect, Qt.AlignCenter, str(number))
+
+            self._digits[key] = self._glyph(paint)
+        return self._digits[key]
+
+    def marks(self, candidates: int, corners: int, color: QColor) -> QPixmap:
+        """
+
+        :param candidates: Mask of the center marks
+        :param corners: Mask of the corner marks
+        """
+        key = (candidates, corners, color.rgba())
+        if key in self._marks:
+            self._marks.move_to_end(key)
+            return self._marks[key]
+
+        def paint(painter: QPainter, rect: QRect):
+            painter.setFont(self.pencil_font)
+            painter.setPen(QPen(color, 1.0))
+
+            text = MASK_TEXT[candidates]
+            if self.wrap and len(text) > self.wrap:
+                text = text[:self.wrap] + "\n" + text[self.wrap:]
+            painter.drawText(rect, Qt.AlignCenter, text)
+
+            # The corner marks sit in the middle three quarters of the cell
+            shift = int(self.cell_size - self.cell_size * 0.75) // 2
+            inner = QRect(shift, shift, int(self.cell_size * 0.75), int(self.cell_size * 0.75))
+            for i, number in enumerate(MASK_TEXT[corners]):
+                painter.drawText(inner, number, CORNERS[i] if i < 4 else Qt.AlignCenter)
+
+        pixmap = self._marks[key] = self._glyph(paint)
+        if len(self._marks) > self.layouts:
+            self._marks.popitem(last=False)
+        return pixmap
+
+
+_atlases: OrderedDict[Tuple, GlyphAtlas] = OrderedDict()
+
+
+def glyph_atlas(cell_size: int, digit_font: QFont, pencil_font: QFont, ratio: float = 1.0,
+                wrap: int = 5) -> GlyphAtlas:
+    """
+
+    :return: The atlas of the fonts at this cell size, the last few atlases are kept so
+    resizing back and forth does not render the glyphs again
+    """
+    key = (cell_size, digit_font.key(), pencil_font.key(), ratio, wrap)
+    if key in _atlases:
+        _atlases.move_to_end(key)
+    else:
+        _atlases[key] = GlyphAtlas(cell_size, digit_font, pencil_font, ratio, wrap)
+        if len(_atlases) > 4:
+            _atlases.popitem(last=False)
+    return _atlases[key]
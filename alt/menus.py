@@ -211,4 +211,6 @@ class ConstraintCheckBox(QCheckBox):
             case "Nonconsecutive":
                 self.frame.sudoku.nonconsecutive = not self.frame.sudoku.nonconsecutive
 
+        self.frame.sudoku.refresh_rules()
+        self.frame.window_.board.request_candidates()
         self.frame.update()
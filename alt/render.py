@@ -0,0 +1,431 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from collections import OrderedDict
+from typing import Iterable, Set
+
+from PySide6.QtCore import QRect, QSize, Qt
+from PySide6.QtGui import QPainter, QPen, QColor, QFont, QGuiApplication, QImage, QPixmap
+
+from alt.sudoku_.puzzle import Puzzle
+from glyphs import GlyphAtlas, glyph_atlas
+from sudoku_.snapshot import to_mask
+from sudoku_.sudoku import Sudoku
+from utils import Constants
+
+BLACK = QColor("#000000")
+GIVEN_COLOR = QColor("#000000")
+DIGIT_COLOR = QColor("#3b7cff")
+PENCIL_COLOR = QColor("#333333")
+CONFLICT_COLOR = QColor("#e0312b")
+DIAGONAL_COLOR = QColor(255, 0, 0, 90)
+
+FONT = "Asap"
+
+
+class Style:
+    """Everything about the look of a rendered board that is not part of the puzzle"""
+
+    def __init__(self, cell_size: int = 48, pencil_marks: bool = False,
+                 background: QColor = QColor("#FFFFFF"), given_color: QColor = GIVEN_COLOR,
+                 digit_color: QColor = DIGIT_COLOR, font: str = FONT):
+        self.cell_size = cell_size
+        self.pencil_marks = pencil_marks
+        self.background = background
+        self.given_color = given_color
+        self.digit_color = digit_color
+        self.font = font
+
+
+DEFAULT_STYLE = Style()
+
+
+def application() -> QGuiApplication:
+    """
+    Painting text needs a gui application. Scripts without one get an offscreen application,
+    so no display is required.
+    """
+    if QGuiApplication.instance() is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        return QGuiApplication([])
+    return QGuiApplication.instance()
+
+
+def board_size(sudoku: Sudoku, cell_size: int) -> QSize:
+    """
+
+    :return: Size of a rendered board, the grid plus one cell on every side for outside clues
+    """
+    return QSize(cell_size * (sudoku.size + 2), cell_size * (sudoku.size + 2))
+
+
+def draw_background(painter: QPainter, sudoku: Sudoku, cell_size: int):
+    grid_size = cell_size * sudoku.size
+    painter.fillRect(QRect(cell_size, cell_size, grid_size, grid_size), QColor("#FFF"))
+
+
+def draw_colors(painter: QPainter, sudoku: Sudoku, cell_size: int, indices: Iterable[int] = None):
+    """
+
+    :param indices: Only draw these cells, None = all cells
+    """
+    for index in indices if indices is not None else range(len(sudoku.cells)):
+        sudoku.cells[index].draw_colors(painter, cell_size)
+
+
+def draw_cell_components(painter: QPainter, sudoku: Sudoku, cell_size: int):
+    for cell_cmp in sudoku.cell_components:
+        cell_cmp.draw(painter, cell_size)
+
+
+def draw_cell_colors(painter: QPainter, sudoku: Sudoku, cell_size: int):
+    draw_colors(painter, sudoku, cell_size)
+    draw_cell_components(painter, sudoku, cell_size)
+
+
+def draw_grid(painter: QPainter, sudoku: Sudoku, cell_size: int):
+    """Diagonals, the outline and the cell and box lines"""
+    painter.setBrush(Qt.NoBrush)
+    painter.setPen(QPen(DIAGONAL_COLOR, 3.0))
+
+    if sudoku.diagonal_negative:
+        painter.drawLine(cell_size, cell_size, cell_size * 10, cell_size * 10)
+
+    if sudoku.diagonal_positive:
+        painter.drawLine(cell_size * 10, cell_size, cell_size, cell_size * 10)
+
+    grid_size = cell_size * sudoku.size
+
+    painter.setPen(QPen(BLACK, 4.0))
+    painter.drawRect(QRect(cell_size, cell_size, grid_size, grid_size))
+
+    for i in range(sudoku.size):
+        painter.setPen(QPen(BLACK, 1.0))
+        if i % (sudoku.size // (math.sqrt(sudoku.size))) == 0:
+            painter.setPen(QPen(BLACK, 4.0))
+
+        painter.drawLine(
+            cell_size, cell_size + i * cell_size,
+            cell_size * (sudoku.size + 1), cell_size + i * cell_size,
+        )
+        painter.drawLine(
+            cell_size + i * cell_size, cell_size,
+            cell_size + i * cell_size, cell_size * (sudoku.size + 1),
+        )
+
+
+def draw_components(painter: QPainter, sudoku: Sudoku, cell_size: int):
+    """Lines, regions, outside clues and border clues in the order the board shows them"""
+    for line_cmp in sorted(sudoku.lines_components, key=lambda l_cmp: l_cmp.LAYER):
+        line_cmp.draw(painter, cell_size)
+
+    for region_cmp in sudoku.region_components:
+        region_cmp.draw(painter, cell_size)
+
+    for outside_cmp in sudoku.outside_components:
+        outside_cmp.draw(painter, cell_size)
+
+    for border_cmp in sudoku.border_components:
+        border_cmp.draw(painter, cell_size)
+
+    painter.setBrush(Qt.NoBrush)
+
+
+def digit_atlas(cell_size: int, ratio: float = 1.0, style: Style = DEFAULT_STYLE) -> GlyphAtlas:
+    """
+
+    :return: Glyphs in the fonts draw_digits uses
+    """
+    return glyph_atlas(
+        cell_size, QFont(style.font, cell_size // 2, QFont.Bold), QFont(style.font, cell_size // 6),
+        ratio
+    )
+
+
+def draw_digits(painter: QPainter, sudoku: Sudoku, cell_size: int, pencil_marks: bool = True,
+                style: Style = DEFAULT_STYLE, indices: Iterable[int] = None,
+                glyphs: GlyphAtlas = None, conflicts: Set[int] = frozenset()):
+    """
+
+    :param pencil_marks: Also draw the candidates and corner marks of empty cells
+    :param style: Font and colors of the digits
+    :param indices: Only draw these cells, None = all cells
+    :param glyphs: Blit the digits from this atlas (see digit_atlas) instead of drawing text,
+    only for pixel devices
+    :param conflicts: Cells whose digits are drawn in CONFLICT_COLOR
+    """
+    if glyphs is not None:
+        _blit_digits(painter, sudoku, cell_size, pencil_marks, style, indices, glyphs, conflicts)
+        return
+
+    digit_font = QFont(style.font, cell_size // 2, QFont.Bold)
+    pencil_font = QFont(style.font, cell_size // 6)
+
+    given_pen = QPen(style.given_color, 1.0)
+    digit_pen = QPen(style.digit_color, 1.0)
+    white_pen = QPen(Qt.white, 1.0)
+    pencil_pen = QPen(PENCIL_COLOR, 1.0)
+    conflict_pen = QPen(CONFLICT_COLOR, 1.0)
+
+    painter.setBrush(Qt.NoBrush)
+
+    for i in indices if indices is not None else range(len(sudoku.cells)):
+        cell = sudoku.cells[i]
+
+        if cell.value != Constants.EMPTY:
+            painter.setFont(digit_font)
+
+            if i in conflicts:
+                painter.setPen(conflict_pen)
+            elif sudoku.initial_state[i].value != Constants.EMPTY:
+                painter.setPen(given_pen)
+            else:
+                painter.setPen(digit_pen if BLACK not in cell.colors else white_pen)
+
+            painter.drawText(cell.rect(cell_size), Qt.AlignCenter, str(cell.value))
+
+        elif pencil_marks:
+            painter.setFont(pencil_font)
+            painter.setPen(pencil_pen)
+
+            txt = ''.join(sorted(map(str, cell.valid_numbers)))
+
+            if len(txt) > 5:
+                txt = txt[0:5] + "\n" + txt[5:]
+
+            painter.drawText(cell.rect(cell_size), Qt.AlignCenter, txt)
+
+            for num in cell.corner:
+                painter.drawText(cell.scaled_rect(cell_size, 0.75), str(num), cell.corners(num))
+
+
+def _blit_digits(painter: QPainter, sudoku: Sudoku, cell_size: int, pencil_marks: bool,
+                 style: Style, indices: Iterable[int] | None, glyphs: GlyphAtlas,
+                 conflicts: Set[int]):
+    white = QColor(Qt.white)
+
+    for i in indices if indices is not None else range(len(sudoku.cells)):
+        cell = sudoku.cells[i]
+
+        if cell.value != Constants.EMPTY:
+            if i in conflicts:
+                color = CONFLICT_COLOR
+            elif sudoku.initial_state[i].value != Constants.EMPTY:
+                color = style.given_color
+            else:
+                color = style.digit_color if BLACK not in cell.colors else white
+            painter.drawPixmap(cell.rect(cell_size).topLeft(), glyphs.digit(cell.value, color))
+
+        elif pencil_marks and (cell.valid_numbers or cell.corner):
+            painter.drawPixmap(
+                cell.rect(cell_size).topLeft(),
+                glyphs.marks(to_mask(cell.valid_numbers), to_mask(cell.corner), PENCIL_COLOR)
+            )
+
+
+def draw_givens(painter: QPainter, digits: Iterable[int], cell_size: int,
+                style: Style = DEFAULT_STYLE):
+    """Digits of a puzzle model, without the Sudoku and its cells"""
+    painter.setFont(QFont(style.font, cell_size // 2, QFont.Bold))
+    painter.setPen(QPen(style.given_color, 1.0))
+
+    for index, digit in enumerate(digits):
+        if digit:
+            rect = QRect(
+                (index % 9 + 1) * cell_size, (index // 9 + 1) * cell_size, cell_size, cell_size
+            )
+            painter.drawText(rect, Qt.AlignCenter, str(digit))
+
+
+def draw_constraints(painter: QPainter, sudoku: Sudoku, cell_size: int):
+    draw_grid(painter, sudoku, cell_size)
+    draw_components(painter, sudoku, cell_size)
+
+
+def draw_overlay(painter: QPainter, sudoku: Sudoku, cell_size: int):
+    """Everything between the cell colors and the digits, i.e. all that is fixed by the layout"""
+    draw_cell_components(painter, sudoku, cell_size)
+    draw_constraints(painter, sudoku, cell_size)
+
+
+def paint_sudoku(painter: QPainter, sudoku: Sudoku, cell_size: int, pencil_marks: bool = False):
+    """
+    Paints a whole board without anything interactive (selection, highlighting), the same
+    way the board widget does. Works on any paint device, including QImage, QPicture and
+    QSvgGenerator outside of the GUI thread.
+    """
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setRenderHint(QPainter.TextAntialiasing)
+
+    draw_background(painter, sudoku, cell_size)
+    draw_cell_colors(painter, sudoku, cell_size)
+    draw_grid(painter, sudoku, cell_size)
+    draw_components(painter, sudoku, cell_size)
+    draw_digits(painter, sudoku, cell_size, pencil_marks)
+
+
+def to_sudoku(puzzle: Puzzle) -> Sudoku:
+    """
+
+    :return: A Sudoku with the components of puzzle, its digits are givens
+    """
+    sudoku = Sudoku()
+    sudoku.load_json(puzzle.to_json())
+    return sudoku
+
+
+def layout_key(puzzle: Puzzle | Sudoku) -> str:
+    """
+
+    :return: Key that is the same for all puzzles with the same constraints and components
+    """
+    data = puzzle.to_json()
+    del data["digits"]
+    return json.dumps(data, sort_keys=True)
+
+
+class BoardRenderer:
+    """
+    Renders boards into QImages without a window (see application for headless use).
+
+    Everything that only depends on the layout (grid, cages, lines, border and outside clues)
+    is painted once into a transparent layer. The layers of the most recent layouts are kept,
+    so rendering another puzzle with the same layout only paints the background, the cell
+    colors and the digits on top of a copy of the layer.
+
+        renderer = BoardRenderer(Style(cell_size=32))
+        for puzzle in puzzles:
+            renderer.render(puzzle).save(...)
+    """
+
+    def __init__(self, style: Style = None, layers: int = 64):
+        """
+
+        :param style: Look of the boards
+        :param layers: Number of layouts whose static layer is kept
+        """
+        self.style = style if style is not None else Style()
+        self.layers = layers
+
+        self.hits = 0
+        self.misses = 0
+
+        self._layers: OrderedDict[str, QImage] = OrderedDict()
+
+    @property
+    def size(self) -> QSize:
+        return QSize(self.style.cell_size * 11, self.style.cell_size * 11)
+
+    def layer(self, puzzle: Puzzle | Sudoku) -> QImage:
+        """
+
+        :return: The cached static layer of the layout of puzzle
+        """
+        key = layout_key(puzzle)
+
+        if key in self._layers:
+            self.hits += 1
+            self._layers.move_to_end(key)
+            return self._layers[key]
+
+        self.misses += 1
+        sudoku = puzzle if isinstance(puzzle, Sudoku) else to_sudoku(puzzle)
+
+        image = QImage(self.size, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        draw_overlay(painter, sudoku, self.style.cell_size)
+        painter.end()
+
+        self._layers[key] = image
+        if len(self._layers) > self.layers:
+            self._layers.popitem(last=False)
+        return image
+
+    def paint(self, painter: QPainter, puzzle: Puzzle | Sudoku):
+        """Paints the board with the cached layer, e.g. into an image of a larger page"""
+        cell_size = self.style.cell_size
+        layer = self.layer(puzzle)
+
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        painter.fillRect(QRect(cell_size, cell_size, cell_size * 9, cell_size * 9),
+                         self.style.background)
+
+        if isinstance(puzzle, Sudoku):
+            for cell in puzzle.cells:
+                cell.draw_colors(painter, cell_size)
+            painter.drawImage(0, 0, layer)
+            draw_digits(painter, puzzle, cell_size, self.style.pencil_marks, self.style)
+        else:
+            painter.drawImage(0, 0, layer)
+            draw_givens(painter, puzzle.digits, cell_size, self.style)
+
+    def render(self, puzzle: Puzzle | Sudoku) -> QImage:
+        image = QImage(self.size, QImage.Format_ARGB32_Premultiplied)
+        image.fill(self.style.background)
+
+        painter = QPainter(image)
+        self.paint(painter, puzzle)
+        painter.end()
+        return image
+
+    def clear(self):
+        self._layers.clear()
+
+
+class BoardLayers:
+    """
+    Static layers of an interactive board as pixmaps. The board paints the cell colors, then
+    the cells layer (cell components), the selection and then the constraints layer (grid,
+    lines, regions, outside and border clues) and the digits on top. Both layers are only
+    repainted when the layout of the Sudoku, the cell size or the pixel ratio changes.
+    """
+
+    def __init__(self):
+        self.key = None
+        self.cells: QPixmap | None = None
+        self.constraints: QPixmap | None = None
+
+        self.repaints = 0
+
+    def _layer(self, size: QSize, ratio: float, paint) -> QPixmap:
+        pixmap = QPixmap(size * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        paint(painter)
+        painter.end()
+        return pixmap
+
+    def update(self, sudoku: Sudoku, cell_size: int, size: QSize, ratio: float = 1.0):
+        """
+        Repaints the layers if anything they show has changed since the last call.
+
+        :param size: Size of the widget
+        :param ratio: Device pixel ratio of the widget
+        """
+        key = (cell_size, size.toTuple(), ratio, layout_key(sudoku))
+        if key == self.key:
+            return
+
+        self.key = key
+        self.repaints += 1
+
+        self.cells = self._layer(
+            size, ratio, lambda painter: draw_cell_components(painter, sudoku, cell_size)
+        )
+        self.constraints = self._layer(
+            size, ratio, lambda painter: draw_constraints(painter, sudoku, cell_size)
+        )
+
+    def invalidate(self):
+        self.key = None
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+from alt.sudoku_.mask_solver import MaskSolver, EMPTY, POPCOUNT, DIGITS, ROW, COLUMN, BOX, bit
+
+HOUSES = (
+    [[row * 9 + column for column in range(9)] for row in range(9)]
+    + [[row * 9 + column for row in range(9)] for column in range(9)]
+    + [[(box // 3 * 3 + i // 3) * 9 + box % 3 * 3 + i % 3 for i in range(9)] for box in range(9)]
+)
+
+
+class ClueAnalysis:
+    """
+    Result of analyse. solutions maps every given to the number of solutions (at most limit)
+    the puzzle has without it, 1 means the clue is redundant. candidates maps every empty cell to
+    the number of digits left after propagating singles.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.solutions: Dict[int, int] = {}
+        self.candidates: Dict[int, int] = {}
+
+    def __repr__(self):
+        out = ""
+        for i in range(81):
+            if i != 0 and i % 9 == 0:
+                out += '\n'
+            if i in self.solutions:
+                out += f"{self.solutions[i]:>3}"
+            else:
+                out += f"{'(' + str(self.candidates[i]) + ')':>3}" if i in self.candidates else "  -"
+        return out
+
+    def importance(self, index: int) -> float:
+        """
+
+        :return: 0.0 for a redundant clue up to 1.0 for a clue whose removal opens limit solutions
+        """
+        if index not in self.solutions or self.limit <= 1:
+            return 0.0
+        return (self.solutions[index] - 1) / (self.limit - 1)
+
+
+def elimination_reason(solver: MaskSolver, index: int, number: int) -> str:
+    """
+
+    :return: Name of the house, constraint or rule that keeps number out of the cell
+    """
+    b = bit(number)
+    if solver.rows[ROW[index]] & b:
+        return "row"
+    if solver.columns[COLUMN[index]] & b:
+        return "column"
+    if solver.boxes[BOX[index]] & b:
+        return "box"
+    if solver.banned[index] & b:
+        return "banned"
+
+    values, rules = solver.values, getattr(solver, "cell_rules", None)
+    for rule in rules[index] if rules is not None else ():
+        if not rule.allowed(values, index) & b:
+            return rule.NAME
+    return "constraint"
+
+
+def propagate(solver: MaskSolver, trace=None) -> List[int]:
+    """
+    Applies naked and hidden singles until nothing changes. The digits placed on the way are
+    taken out again before returning, so the solver is left as it was.
+
+    :param solver: Solver holding a puzzle
+    :param trace: Optional trace.Trace that records every elimination (with the house or rule
+    behind it) and every single (naked / hidden single), it ends in the propagated grid
+    :return: Candidates of every cell, the value itself for filled cells
+    """
+    placed = []
+
+    while True:
+        masks = [bit(v) if v else solver.candidates(i) for i, v in enumerate(solver.values)]
+        if trace is not None:
+            _record_eliminations(solver, masks, trace)
+
+        singles = {
+            i: (DIGITS[masks[i]][0], "naked single")
+            for i in range(81) if not solver.values[i] and POPCOUNT[masks[i]] == 1
+        }
+
+        for house in HOUSES:
+            for number in range(1, 10):
+                cells = [i for i in house if masks[i] & bit(number)]
+                if len(cells) == 1 and not solver.values[cells[0]]:
+                    singles.setdefault(cells[0], (number, "hidden single"))
+
+        progress = False
+        for index, (number, technique) in singles.items():
+            # Two singles of the same round may contradict each other
+            if solver.candidates(index) & bit(number):
+                solver.place(index, number)
+                placed.append(index)
+                progress = True
+                if trace is not None:
+                    trace.assign(index, number, technique)
+
+        if not progress or any(mask == 0 for mask in masks):
+            break
+
+    solver.propagations += len(placed)
+    for index in placed:
+        solver.remove(index)
+    return masks
+
+
+def _record_eliminations(solver: MaskSolver, masks: List[int], trace):
+    values = solver.values
+    for index in range(81):
+        if values[index]:
+            continue
+        for number in DIGITS[trace.masks[index] & ~masks[index]]:
+            trace.eliminate(index, number, elimination_reason(solver, index, number))
+
+
+def analyse(grid: List[int], limit: int = 10, empty: int = EMPTY,
+            solver: MaskSolver = None) -> ClueAnalysis:
+    """
+    Both measures share one solver. The propagation runs on the full puzzle and every clue is
+    only toggled off for its bounded count, so there are no copies of the grid at all.
+
+    :param grid: A puzzle, ignored if a solver is given
+    :param limit: Stop counting the solutions without a clue at this number
+    :param empty: Value used for empty cells in grid
+    :param solver: Solver of the puzzle, e.g. a VariantSolver with its rules and constraints
+    :return: Solutions without each given and surviving candidates of each empty cell
+    """
+    if solver is None:
+        solver = MaskSolver([EMPTY if value == empty else value for value in grid])
+    analysis = ClueAnalysis(limit)
+
+    masks = propagate(solver)
+    for index in range(81):
+        if solver.values[index] == EMPTY:
+            analysis.candidates[index] = POPCOUNT[masks[index]]
+
+    for index in range(81):
+        if solver.values[index] != EMPTY:
+            analysis.solutions[index] = solver.solutions_without(index, limit)
+
+    return analysis
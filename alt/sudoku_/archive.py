@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import json
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from alt.sudoku_.puzzle import Puzzle, LOADERS, load
+
+FORMAT = "sudoku-archive"
+VERSION = 1
+
+# Entries of a component that change between puzzles with the same layout, in stored order.
+# Everything else (type, indices, branches, col, row, direction) is geometry.
+VALUE_FIELDS = {
+    "Cage": ("total",),
+    "XVSum": ("total",),
+    "Difference": ("difference",),
+    "Ratio": ("ratio",),
+    "LessGreater": ("less",),
+    "Quadruple": ("numbers",),
+    "Sandwich": ("total",),
+    "XSumsClue": ("total",),
+    "LittleKiller": ("total",),
+}
+
+# Width of the last line, it holds the byte offset of the footer
+TRAILER = 20
+
+COMPACT = (",", ":")
+
+
+def split(puzzle: Puzzle) -> Tuple[Dict, List]:
+    """
+
+    :return: The layout (constraints and component geometry) and the values of the components
+    """
+    geometry, values = [], []
+
+    for rule in puzzle.rules:
+        item = rule.to_json()
+        fields = VALUE_FIELDS.get(item["type"], ())
+
+        values.extend(item.pop(field) for field in fields)
+        geometry.append(item)
+
+    layout = {
+        "constraints": puzzle.constraints,
+        "negative_constraints": puzzle.negative_constraints,
+        "components": geometry
+    }
+    return layout, values
+
+
+class Layout:
+    """A stored layout, prepared once so puzzles only merge their values into it"""
+
+    def __init__(self, data: Dict):
+        self.data = data
+        self.components = [
+            (LOADERS[item["type"]], item, VALUE_FIELDS.get(item["type"], ()))
+            for item in data["components"]
+        ]
+
+    def puzzle(self, digits: str, values: List) -> Puzzle:
+        rules, position = [], 0
+
+        for loader, item, fields in self.components:
+            if fields:
+                item = item | dict(zip(fields, values[position:position + len(fields)]))
+                position += len(fields)
+            rules.append(loader(item))
+
+        return Puzzle(
+            [int(digit) for digit in digits], rules,
+            self.data["constraints"], self.data["negative_constraints"]
+        )
+
+
+class ArchiveWriter:
+    """
+    Writes puzzles as one compact json line each: layout number, digits and the component
+    values. Layouts are collected while writing and stored once in the footer together with
+    the byte offset of every puzzle line.
+
+        with ArchiveWriter("killers.sda") as writer:
+            for puzzle in puzzles:
+                writer.add(puzzle)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        self.layouts: List[Dict] = []
+        self.offsets: List[int] = []
+        self._layout_ids: Dict[str, int] = {}
+
+        self._file = open(path, "wb")
+
+    def __enter__(self) -> ArchiveWriter:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, puzzle: Puzzle) -> int:
+        """
+
+        :return: Number of the puzzle in the archive
+        """
+        layout, values = split(puzzle)
+
+        key = json.dumps(layout, sort_keys=True, separators=COMPACT)
+        if key not in self._layout_ids:
+            self._layout_ids[key] = len(self.layouts)
+            self.layouts.append(layout)
+
+        line = {
+            "layout": self._layout_ids[key],
+            "digits": ''.join(map(str, puzzle.digits)),
+            "values": values
+        }
+
+        self.offsets.append(self._file.tell())
+        self._file.write(json.dumps(line, separators=COMPACT).encode() + b"\n")
+        return len(self.offsets) - 1
+
+    def close(self):
+        if self._file.closed:
+            return
+
+        footer = {
+            "format": FORMAT,
+            "version": VERSION,
+            "layouts": self.layouts,
+            "offsets": self.offsets
+        }
+
+        footer_offset = self._file.tell()
+        self._file.write(json.dumps(footer, separators=COMPACT).encode() + b"\n")
+        self._file.write(f"{footer_offset:0{TRAILER - 1}d}\n".encode())
+        self._file.close()
+
+
+class Archive:
+    """
+    Reads an archive. Opening only reads the footer; archive[k] seeks to a single line and
+    builds that puzzle, iterating reads the puzzle lines front to back in one pass.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+
+        self._file.seek(-TRAILER, 2)
+        self._file.seek(int(self._file.read(TRAILER)))
+        footer = json.loads(self._file.readline())
+
+        if footer.get("format") != FORMAT or footer.get("version") != VERSION:
+            raise ValueError(f"{path} is not a puzzle archive")
+
+        self.layouts = [Layout(data) for data in footer["layouts"]]
+        self.offsets = footer["offsets"]
+
+    def __enter__(self) -> Archive:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, number: int) -> Puzzle:
+        self._file.seek(self.offsets[number])
+        return self._build(self._file.readline())
+
+    def __iter__(self) -> Iterator[Puzzle]:
+        self._file.seek(0)
+        for _ in range(len(self.offsets)):
+            yield self._build(self._file.readline())
+
+    def _build(self, line: bytes) -> Puzzle:
+        entry = json.loads(line)
+        return self.layouts[entry["layout"]].puzzle(entry["digits"], entry["values"])
+
+    def load_all(self) -> List[Puzzle]:
+        return list(self)
+
+    def close(self):
+        self._file.close()
+
+
+def write_archive(path: str, puzzles: Iterable[Puzzle]) -> int:
+    """
+
+    :return: Number of puzzles written
+    """
+    with ArchiveWriter(path) as writer:
+        for puzzle in puzzles:
+            writer.add(puzzle)
+        return len(writer.offsets)
+
+
+def archive_files(path: str, files: Iterable[str]) -> int:
+    """Collects json files written by Sudoku.to_file (or puzzle.save) into one archive"""
+    return write_archive(path, (load(file) for file in files))
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, Iterator, Set, Tuple
+
+from alt.sudoku_.analysis import propagate
+from alt.sudoku_.jobs import Job, FINISHED, generate, stream
+from alt.sudoku_.mask_solver import MaskSolver, EMPTY
+from alt.sudoku_.puzzle_file import read_puzzles, to_line
+from alt.sudoku_.solution_cache import SolutionCache
+from alt.sudoku_.variants import VariantSolver
+
+MASK = "mask"
+VARIANT = "variant"
+CACHE = "cache"
+
+
+class ResultStream:
+    """
+    Output of a batch run as json lines, one object per finished input. Every line is flushed
+    as soon as it is written, so a crash loses at most the line that was being written.
+
+    Opening an existing file resumes it: the ids of its finished records are collected in done
+    and a torn last line is cut off. Inputs whose job was cancelled or timed out are not in
+    done, so they run again and their new record follows the old one (the last record of an
+    id counts). Lines that cannot be read are skipped and counted in corrupt.
+
+        with ResultStream("solved.jsonl") as out:
+            for id_, grid in inputs:
+                if id_ not in out.done:
+                    out.write({"id": id_, ...})
+    """
+
+    def __init__(self, path: str, resume: bool = True):
+        self.path = path
+        self.done: Set = set()
+        self.written = 0
+        self.corrupt = 0
+
+        if resume and os.path.exists(path):
+            self._load()
+            self._file = open(path, "a", encoding="utf-8")
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+
+    def __enter__(self) -> ResultStream:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _load(self):
+        complete = 0
+        with open(self.path, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    # Only the last line can miss its newline, it was torn by a crash
+                    break
+                complete += len(line)
+
+                try:
+                    record = json.loads(line)
+                    id_ = record["id"]
+                except (ValueError, KeyError, TypeError):
+                    self.corrupt += 1
+                    continue
+
+                if record.get("status", FINISHED) == FINISHED:
+                    self.done.add(id_)
+
+        if complete != os.path.getsize(self.path):
+            os.truncate(self.path, complete)
+
+    def write(self, record: Dict):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+        self.done.add(record["id"])
+        self.written += 1
+
+    def close(self):
+        self._file.close()
+
+
+def _solver(grid, constraints: Dict[str, bool] = None) -> Tuple[MaskSolver, str]:
+    active = {name: True for name, on in (constraints or {}).items() if on}
+    if active:
+        return VariantSolver(grid, **active), VARIANT
+    return MaskSolver(grid), MASK
+
+
+def solve_record(id_, grid, job: Job, constraints: Dict[str, bool] = None,
+                 cache: SolutionCache = None, rate: bool = False) -> Dict:
+    """
+    Solves (and counts up to 2 solutions of) one puzzle under job.
+
+    :param rate: Also store the rating and the cells left open after propagating singles
+    :return: The record for the result stream
+    """
+    started = time.perf_counter()
+    record = {"id": id_}
+
+    cached = cache.get(grid, constraints) if cache is not None else None
+    if cached is not None:
+        record.update(status=FINISHED, backend=CACHE, count=cached.count, nodes=0,
+                      propagations=0)
+        record["solution"] = to_line(cached.solution) if cached.solution else None
+        if rate:
+            record["rating"] = cached.rating
+    else:
+        solver, backend = _solver(grid, constraints)
+        solver.job = job
+
+        empty = solver.values.count(EMPTY)
+        masks = propagate(solver)
+
+        status = job.run(lambda job: solver.count(2))
+        record.update(status=status, backend=backend, count=job.result, nodes=solver.nodes,
+                      propagations=solver.propagations)
+        record["solution"] = to_line(solver.solution) if solver.solution else None
+
+        if rate:
+            record["rating"] = solver.nodes
+            record["open_after_singles"] = empty - solver.propagations
+            record["contradiction"] = not all(masks)
+
+        if cache is not None and status == FINISHED:
+            cache.put(grid, solver.solution, job.result, solver.nodes, constraints)
+
+    record["elapsed"] = round(time.perf_counter() - started, 6)
+    return record
+
+
+def _run(inputs: Iterable[Tuple], output: str, task: Callable[..., Dict],
+         progress: Callable[[Dict], None] = None) -> int:
+    with ResultStream(output) as out:
+        for id_, *args in inputs:
+            if id_ in out.done:
+                continue
+
+            record = task(id_, *args)
+            out.write(record)
+            if progress is not None:
+                progress(record)
+
+        return out.written
+
+
+def _puzzles(source: str) -> Iterator[Tuple[int, list]]:
+    for record in read_puzzles(source, EMPTY):
+        yield record.line, record.puzzle
+
+
+def solve_file(source: str, output: str, time_limit: float = 0.0, max_nodes: int = 0,
+               constraints: Dict[str, bool] = None, cache: SolutionCache = None,
+               progress: Callable[[Dict], None] = None) -> int:
+    """
+    Solves every puzzle of a puzzle file (see puzzle_file.read_puzzles). The id of a puzzle is
+    its line number, so a rerun with the same output only solves the puzzles that are missing.
+
+    Every record holds id, status, solution (None if there is none or the job stopped), count,
+    nodes, propagations, elapsed seconds and backend (mask, variant or cache).
+
+    :param time_limit: Seconds one puzzle may take
+    :param max_nodes: Nodes one puzzle may take
+    :param progress: Called with every record once it is written
+    :return: Number of records written by this run
+    """
+    return _run(
+        _puzzles(source), output,
+        lambda id_, grid: solve_record(id_, grid, Job(time_limit, max_nodes), constraints, cache),
+        progress
+    )
+
+
+def rate_file(source: str, output: str, time_limit: float = 0.0, max_nodes: int = 0,
+              constraints: Dict[str, bool] = None, progress: Callable[[Dict], None] = None
+              ) -> int:
+    """
+    Same as solve_file, the records also hold the rating (search nodes), the cells singles
+    do not fill (open_after_singles) and whether singles run into a contradiction.
+    """
+    return _run(
+        _puzzles(source), output,
+        lambda id_, grid: solve_record(id_, grid, Job(time_limit, max_nodes), constraints,
+                                       rate=True),
+        progress
+    )
+
+
+def generate_record(id_: int, seed: int, hints: int, job: Job) -> Dict:
+    """
+
+    :return: The record of puzzle id_, drawn from the random stream (seed, id_)
+    """
+    started = time.perf_counter()
+
+    status = job.run(generate, hints, rng=stream(seed, id_))
+    puzzle = job.result
+
+    return {
+        "id": id_,
+        "status": status,
+        "puzzle": to_line(puzzle) if puzzle else None,
+        "clues": sum(1 for value in puzzle if value) if puzzle else None,
+        "seed": seed,
+        "nodes": job.nodes,
+        "propagations": 0,
+        "elapsed": round(time.perf_counter() - started, 6),
+        "backend": MASK,
+    }
+
+
+def generate_file(output: str, seed: int, amount: int, hints: int = 17,
+                  time_limit: float = 0.0, progress: Callable[[Dict], None] = None) -> int:
+    """
+    Generates puzzles 0 .. amount - 1. Every puzzle has its own random stream, so a resumed run
+    produces exactly the puzzles an uninterrupted run would have.
+
+    :return: Number of records written by this run
+    """
+    return _run(
+        ((id_,) for id_ in range(amount)), output,
+        lambda id_: generate_record(id_, seed, hints, Job(time_limit)),
+        progress
+    )
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-import copy
 import random
 import time
 import timeit
 from typing import List, Tuple, Optional
 
+from alt.sudoku_.conflicts import ConflictIndex
+from alt.sudoku_.mask_solver import ClueReduction
+
 EMPTY = -1
 
 
@@ -15,7 +17,7 @@ class Sudoku:
 
         self.cells = [Cell(self, i) for i in range(self.size ** 2)]
 
-        self.initial = copy.deepcopy(self.cells)
+        self.initial = self.snapshot()
 
     def __repr__(self):
         out = ""
@@ -25,6 +27,17 @@ class Sudoku:
             out += f"{self.cells[i]}  "
         return out
 
+    def snapshot(self) -> bytes:
+        """
+
+        :return: The values of all cells as one byte each (0 = empty) for restore
+        """
+        return bytes(0 if cell.value == EMPTY else cell.value for cell in self.cells)
+
+    def restore(self, blob: bytes) -> None:
+        for cell, value in zip(self.cells, blob):
+            cell.value = value if value else EMPTY
+
     def get_coordinate_1D(self, row: int, column: int) -> int:
         """
         Returns the Index associated with a given Row and Column..
@@ -147,39 +160,43 @@ class Sudoku:
             and self.count_box(b, number) == 0
         )
 
-    def generate_random_board(self):
+    def generate_random_board(self, rng: random.Random = None):
+        rng = rng if rng is not None else random.Random()
+
         for cell in self.cells:
             cell.value = EMPTY
 
         _l = list(range(1, 10))
         for row in range(3):
             for col in range(3):
-                _num = random.choice(_l)
+                _num = rng.choice(_l)
                 self.cells[row * self.size + col].value = _num
                 _l.remove(_num)
 
         _l = list(range(1, 10))
         for row in range(3, 6):
             for col in range(3, 6):
-                _num = random.choice(_l)
+                _num = rng.choice(_l)
                 self.cells[row * self.size + col].value = _num
                 _l.remove(_num)
 
         _l = list(range(1, 10))
         for row in range(6, 9):
             for col in range(6, 9):
-                _num = random.choice(_l)
+                _num = rng.choice(_l)
                 self.cells[row * self.size + col].value = _num
                 _l.remove(_num)
 
-        self.brute_force(True)
+        self.brute_force(True, rng)
 
-    def genereate_board_with_unique_solution(self, hints: int = 30) -> None:
+    def genereate_board_with_unique_solution(self, hints: int = 30,
+                                             rng: random.Random = None) -> None:
+        rng = rng if rng is not None else random.Random()
 
         full_board = Sudoku(self.size)
-        full_board.generate_random_board()
+        full_board.generate_random_board(rng)
 
-        generator = Generator(full_board)
+        generator = Generator(full_board, rng)
         generator.remove_numbers_from_grid(hints)
         for i in range(self.size ** 2):
             self.cells[i].value = generator.grid[i]
@@ -205,15 +222,15 @@ class Sudoku:
                 if self.cells[row * self.size + column].is_empty:
                     _z += 1
 
+        state = self.snapshot()
         for i in range(1, _z + 1):
 
-            _board_copy = copy.deepcopy(self)
-
-            _r, _c = self.find_empty_to_count_solutions(_board_copy, i)
+            _r, _c = self.find_empty_to_count_solutions(self, i)
 
-            _board_copy_solution = _board_copy.__solveToFindNumberOfSolutions(_r, _c)
+            _board_solution = self.__solveToFindNumberOfSolutions(_r, _c)
 
-            solutions.append(tuple(c.value for c in _board_copy_solution))
+            solutions.append(tuple(c.value for c in _board_solution))
+            self.restore(state)
 
             if len(list(set(solutions))) > 1:
                 return True
@@ -234,43 +251,16 @@ class Sudoku:
         return False
 
     def is_valid_grid(self) -> bool:
-
-        for number in (n for n in range(1, self.size + 1)):
-            for row in range(self.size):
-                if self.count_row(row, number) > 1:
-                    return False
-
-            for column in range(self.size):
-                if self.count_column(column, number) > 1:
-                    return False
-
-            for box in range(self.size):
-                if self.count_box(box, number) > 1:
-                    return False
-
-        return True
+        """One pass over the cells, see conflicts.ConflictIndex"""
+        return not ConflictIndex(self.snapshot()).duplicates
 
     def is_solved_grid(self) -> bool:
-
-        for number in (n for n in range(1, self.size + 1)):
-            for row in range(self.size):
-                if self.count_row(row, number) != 1:
-                    return False
-
-            for column in range(self.size):
-                if self.count_column(column, number) != 1:
-                    return False
-
-            for box in range(self.size):
-                if self.count_box(box, number) != 1:
-                    return False
-
-        return True
+        return ConflictIndex(self.snapshot()).solved
 
     def has_solution(self):
         return self.brute_force()
 
-    def brute_force(self, random_pick: bool = False) -> bool:
+    def brute_force(self, random_pick: bool = False, rng: random.Random = None) -> bool:
 
         current = self.get_empty()
 
@@ -279,14 +269,15 @@ class Sudoku:
 
         numbers = [1, 2, 3, 4, 5, 6, 7, 8, 9]
         if random_pick:
-            random.shuffle(numbers)
+            rng = rng if rng is not None else random.Random()
+            rng.shuffle(numbers)
 
         for number in numbers:
 
             if self.can_set(current.index, number):
                 current.value = number
 
-                if self.brute_force(random_pick):
+                if self.brute_force(random_pick, rng):
                     return True
 
                 current.value = EMPTY
@@ -370,9 +361,12 @@ class Cell:
         return len(self.neighbours)
 
 
-class Generator:
-    def __init__(self, sudoku: Sudoku):
+class Generator(ClueReduction):
+    empty = EMPTY
+
+    def __init__(self, sudoku: Sudoku, rng: random.Random = None):
         self.sudoku = sudoku
+        self.rng = rng if rng is not None else random.Random()
 
         self.grid = [self.sudoku.cells[i].value for i in range(self.sudoku.size ** 2)]
         self.counter = 0
@@ -394,7 +388,7 @@ class Generator:
         rounds = 3
         while rounds > 0 and non_empty_squares_count != hints:
 
-            index = random.choice(non_empty_squares)
+            index = self.rng.choice(non_empty_squares)
             non_empty_squares.remove(index)
 
             non_empty_squares_count -= 1
@@ -402,7 +396,7 @@ class Generator:
             removed_square = self.grid[index]
             self.grid[index] = EMPTY
 
-            grid_copy = copy.deepcopy(self.grid)
+            grid_copy = self.grid.copy()
 
             self.counter = 0
             self.solve_puzzle(grid_copy)
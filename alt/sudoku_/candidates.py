@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from alt.sudoku_.analysis import HOUSES
+from alt.sudoku_.mask_solver import EMPTY, bit
+from alt.sudoku_.observer import LatestState
+from alt.sudoku_.puzzle import Puzzle
+
+
+def candidates_and_conflicts(data: Dict) -> Tuple[List[int], List[int]]:
+    """
+    Candidates under every constraint and component of a board, and the filled cells that
+    break one of them.
+
+    :param data: The board in the format Sudoku.to_json returns
+    :return: Candidate mask of every cell (0 for filled cells) and the indices of conflicts
+    """
+    solver = Puzzle.from_json(data).solver()
+    values = solver.values
+
+    conflicts = set()
+    for house in HOUSES:
+        seen = {}
+        for index in house:
+            if values[index] == EMPTY:
+                continue
+            if values[index] in seen:
+                conflicts.update((index, seen[values[index]]))
+            seen[values[index]] = index
+
+    masks = [0] * 81
+    for index, value in enumerate(values):
+        if value == EMPTY:
+            masks[index] = solver.candidates(index)
+        elif index not in conflicts:
+            # Without a duplicate in its houses the cell holds the only bit of its digit there,
+            # so taking it out leaves the house masks of the solver intact
+            solver.remove(index)
+            if not solver.candidates(index) & bit(value):
+                conflicts.add(index)
+            solver.place(index, value)
+
+    return masks, sorted(conflicts)
+
+
+class CandidateResult:
+    def __init__(self, version: int, masks: List[int], conflicts: List[int]):
+        self.version = version
+        self.masks = masks
+        self.conflicts = conflicts
+
+
+class CandidateWorker:
+    """
+    Computes candidates and conflicts on a background thread. A request replaces the one that
+    is still waiting, so while the user types only the newest board is computed and the others
+    are dropped. Results are published as a whole (see observer.LatestState), a reader compares
+    their version with the one request returned to skip outdated results.
+
+        worker = CandidateWorker(notify=signal.emit)
+        version = worker.request(sudoku.to_json())
+        ...
+        _, result = worker.results.latest()
+    """
+
+    def __init__(self, notify: Callable[[], None] = None):
+        """
+
+        :param notify: Called on the worker thread after every published result
+        """
+        self.notify = notify
+        self.results = LatestState()
+
+        self.requested = 0
+        self.computed = 0
+
+        self._pending: Optional[Tuple[int, Dict]] = None
+        self._condition = threading.Condition()
+        self._running = True
+
+        self._thread = threading.Thread(target=self._run, name="candidates", daemon=True)
+        self._thread.start()
+
+    def request(self, data: Dict) -> int:
+        """
+
+        :param data: The board in the format Sudoku.to_json returns
+        :return: Version the result of this request will have
+        """
+        with self._condition:
+            self.requested += 1
+            self._pending = (self.requested, data)
+            self._condition.notify()
+        return self.requested
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and self._running:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                version, data = self._pending
+                self._pending = None
+
+            try:
+                masks, conflicts = candidates_and_conflicts(data)
+            except ValueError:
+                # Unknown component type, there is nothing sensible to show
+                continue
+
+            self.computed += 1
+            self.results.publish(CandidateResult(version, masks, conflicts))
+            if self.notify is not None:
+                self.notify()
+
+    def stop(self, wait: bool = True):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if wait:
+            self._thread.join()
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Set
+
+from alt.sudoku_.analysis import HOUSES
+from alt.sudoku_.mask_solver import EMPTY, ROW, COLUMN, BOX, bit
+from alt.sudoku_.variants import CONSECUTIVE, ORTHOGONAL, Rule, extra_peers
+
+# Houses of every cell as indices into HOUSES: its row, column and box
+CELL_HOUSES = [(ROW[index], 9 + COLUMN[index], 18 + BOX[index]) for index in range(81)]
+
+
+class ConflictIndex:
+    """
+    Conflicts of a grid that is edited one cell at a time. Every house counts its digits, so an
+    edit changes six counters and only the cells of the three houses that hold the old or the
+    new digit are looked at again. Rules and base constraints (diagonals, antiknight, ...) are
+    only checked for the cells that share one with the edited cell.
+
+    duplicates are the cells whose digit appears twice in a house, violations the cells whose
+    digit breaks a constraint or rule. changed collects the cells whose state flipped, a view
+    takes it to know what to repaint.
+    """
+
+    def __init__(self, values: Iterable[int] = (), rules: Iterable[Rule] = (), **constraints):
+        """
+
+        :param values: Digits of the cells, EMPTY for empty cells
+        :param constraints: Base constraints as in VariantSolver, e.g. antiknight=True
+        """
+        self.values = [EMPTY] * 81
+        # house * 10 + digit -> how often the digit is in the house
+        self.counts = [0] * (len(HOUSES) * 10)
+        self.filled = 0
+
+        self.duplicates: Set[int] = set()
+        self.violations: Set[int] = set()
+        self.changed: Set[int] = set()
+
+        self.cell_rules: List[List[Rule]] = [[] for _ in range(81)]
+        self.peers: List[List[int]] = [[] for _ in range(81)]
+        self.nonconsecutive = False
+        # Cells whose violation has to be checked again after an edit of a cell
+        self.affected: List[List[int]] = [[index] for index in range(81)]
+
+        for index, value in enumerate(values):
+            self.set(index, value)
+        self.set_rules(rules, **constraints)
+
+    @property
+    def conflicts(self) -> Set[int]:
+        return self.duplicates | self.violations
+
+    @property
+    def valid(self) -> bool:
+        return not self.duplicates and not self.violations
+
+    @property
+    def solved(self) -> bool:
+        return self.filled == 81 and self.valid
+
+    def set_rules(self, rules: Iterable[Rule] = (), **constraints):
+        """Replaces rules and constraints, checks every filled cell against them once"""
+        self.cell_rules = [[] for _ in range(81)]
+        affected = [{index} for index in range(81)]
+
+        for rule in rules:
+            indices = set(rule.indices)
+            for index in indices:
+                self.cell_rules[index].append(rule)
+                affected[index] |= indices
+
+        self.peers = extra_peers(**constraints)
+        self.nonconsecutive = constraints.get("nonconsecutive", False)
+        for index in range(81):
+            affected[index].update(self.peers[index])
+            if self.nonconsecutive:
+                affected[index].update(ORTHOGONAL[index])
+
+        self.affected = [sorted(cells) for cells in affected]
+        for index in range(81):
+            self._check_rules(index)
+
+    def reset(self, values: Iterable[int]):
+        """Rebuilds the index for a new grid, changed gets every cell whose state differs"""
+        old, changed = self.conflicts, self.changed
+
+        self.values = [EMPTY] * 81
+        self.counts = [0] * (len(HOUSES) * 10)
+        self.filled = 0
+        self.duplicates, self.violations = set(), set()
+
+        for index, value in enumerate(values):
+            self.set(index, value)
+        self.changed = changed | (old ^ self.conflicts)
+
+    def set(self, index: int, value: int):
+        """
+
+        :param value: New digit of the cell, EMPTY to clear it
+        """
+        old = self.values[index]
+        if old == value:
+            return
+
+        counts, houses = self.counts, CELL_HOUSES[index]
+        if old != EMPTY:
+            self.filled -= 1
+            for house in houses:
+                counts[house * 10 + old] -= 1
+
+        self.values[index] = value
+        if value != EMPTY:
+            self.filled += 1
+            for house in houses:
+                counts[house * 10 + value] += 1
+
+        self._check_houses(index)
+        digits = {old, value} - {EMPTY}
+        for house in houses:
+            for cell in HOUSES[house]:
+                if self.values[cell] in digits:
+                    self._check_houses(cell)
+
+        for cell in self.affected[index]:
+            self._check_rules(cell)
+
+    def _flag(self, cells: Set[int], index: int, flagged: bool):
+        if flagged != (index in cells):
+            if flagged:
+                cells.add(index)
+            else:
+                cells.discard(index)
+            self.changed.add(index)
+
+    def _check_houses(self, index: int):
+        value = self.values[index]
+        self._flag(self.duplicates, index, value != EMPTY and any(
+            self.counts[house * 10 + value] > 1 for house in CELL_HOUSES[index]
+        ))
+
+    def _check_rules(self, index: int):
+        values = self.values
+        value = values[index]
+
+        broken = False
+        if value != EMPTY:
+            broken = any(values[peer] == value for peer in self.peers[index])
+
+            if not broken and self.nonconsecutive:
+                broken = any(
+                    values[neighbour] != EMPTY and CONSECUTIVE[value] & bit(values[neighbour])
+                    for neighbour in ORTHOGONAL[index]
+                )
+
+            if not broken and self.cell_rules[index]:
+                # Rules tell which digits an empty cell allows, so the cell is emptied for a moment
+                values[index] = EMPTY
+                broken = any(
+                    not rule.allowed(values, index) & bit(value) for rule in self.cell_rules[index]
+                )
+                values[index] = value
+
+        self._flag(self.violations, index, broken)
+
+    def take_changed(self) -> Set[int]:
+        """
+
+        :return: The cells whose conflicts changed since the last call
+        """
+        changed, self.changed = self.changed, set()
+        return changed
@@ -1,11 +1,18 @@
-from typing import List, Set
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
 
-from PySide6.QtCore import QPoint
 from PySide6.QtGui import QPainter
 
-from alt.sudoku_.sudoku import Cell
 from alt.utils import Constants
 
+# Index offset to the neighbour on each side and the side of the neighbour that touches the cell
+SIDES = {
+    Constants.WEST: (-1, Constants.EAST),
+    Constants.NORTH: (-9, Constants.SOUTH),
+    Constants.EAST: (1, Constants.WEST),
+    Constants.SOUTH: (9, Constants.NORTH),
+}
+
 
 class Edge:
     def __init__(self, sx: int, sy: int, ex: int, ey: int, edge_type: int):
@@ -55,155 +62,144 @@ class Edge:
             )
 
 
-def tile_to_poly(cells: List[Cell], cell_size: int, selected: Set, inner_offset: int):
-    edges = []
-
-    selected = {QPoint(i % 9, i // 9) for i in selected}
-
-    for cell in cells:
-        cell.reset()
-
-    for i in range(81):
-
-        p = get_point(i)
-        if p not in selected:
-            continue
-
-        north = QPoint(p.x(), p.y() - 1)
-        north_east = QPoint(p.x() + 1, p.y() - 1)
-
-        east = QPoint(p.x() + 1, p.y())
-        south_east = QPoint(p.x() + 1, p.y() + 1)
-
-        south = QPoint(p.x(), p.y() + 1)
-        south_west = QPoint(p.x() - 1, p.y() + 1)
-
-        west = QPoint(p.x() - 1, p.y())
-        north_west = QPoint(p.x() - 1, p.y() - 1)
-
-        if west not in selected:
-            if cells[get_index(north)].edge_exists[Constants.WEST]:
-
-                edges[cells[get_index(north)].edge_id[Constants.WEST]].ey += cell_size
-                cells[i].edge_id[Constants.WEST] = cells[get_index(north)].edge_id[Constants.WEST]
-                cells[i].edge_exists[Constants.WEST] = True
+def neighbour(index: int, side: int) -> int:
+    """
 
-            else:
-
-                sx = p.x() * cell_size
-                sy = p.y() * cell_size
-                ex, ey = sx, sy + cell_size
-                edge = Edge(sx, sy, ex, ey, Constants.WEST)
-
-                edge.id_ = len(edges)
-                edges.append(edge)
+    :return: Index of the neighbour on that side of the cell, -1 outside of the grid
+    """
+    if side == Constants.WEST and index % 9 == 0 or side == Constants.EAST and index % 9 == 8:
+        return -1
+    index += SIDES[side][0]
+    return index if 0 <= index < 81 else -1
 
-                cells[i].edge_id[Constants.WEST] = edge.id_
-                cells[i].edge_exists[Constants.WEST] = True
 
-            # Fill the gap if a cell corner is shifted by a given offset
+class Outline:
+    """
+    Outline of a set of cells, i.e. the sides of the cells that do not border another cell of the
+    set. Adding or removing a cell only touches the sides of the cell and its four neighbours,
+    so the outline of the selection is kept up to date while it is dragged. The merged edges
+    are built once per cell size and offset until the cells change again.
+    """
 
-            if south in selected and south_west in selected:
-                edges[cells[i].edge_id[Constants.WEST]].ey += inner_offset * 2
+    def __init__(self, indices: Iterable[int] = ()):
+        self.indices: Set[int] = set()
+        self.sides: Set[Tuple[int, int]] = set()
 
-            if north in selected and north_west in selected:
-                edges[cells[i].edge_id[Constants.WEST]].sy -= inner_offset * 2
+        self._edges: Dict[Tuple[int, int], List[Edge]] = {}
 
-        if north not in selected:
+        for index in indices:
+            self.add(index)
 
-            if (cells[get_index(west)].edge_exists[Constants.NORTH]
-                and cells[get_index(p)].row == cells[
-                    get_index(west)].row):  # Don't connect to row above
-
-                edges[cells[get_index(west)].edge_id[Constants.NORTH]].ex += cell_size
-                cells[i].edge_id[Constants.NORTH] = cells[get_index(west)].edge_id[Constants.NORTH]
-                cells[i].edge_exists[Constants.NORTH] = True
+    def add(self, index: int):
+        if index in self.indices:
+            return
 
+        self.indices.add(index)
+        for side, (_, opposite) in SIDES.items():
+            other = neighbour(index, side)
+            if other in self.indices:
+                self.sides.discard((other, opposite))
             else:
-                sx = p.x() * cell_size
-                sy = p.y() * cell_size
-                ex, ey = sx + cell_size, sy
-                edge = Edge(sx, sy, ex, ey, Constants.NORTH)
-
-                edge.id_ = len(edges)
-                edges.append(edge)
-
-                cells[i].edge_id[Constants.NORTH] = edge.id_
-                cells[i].edge_exists[Constants.NORTH] = True
-
-            # Fill the gap if a cell corner is shifted by a given offset
-
-            if east in selected and north_east in selected:
-                edges[cells[i].edge_id[Constants.NORTH]].ex += inner_offset * 2
-
-            if west in selected and north_west in selected:
-                edges[cells[i].edge_id[Constants.NORTH]].sx -= inner_offset * 2
-
-        if east not in selected:
-            if cells[get_index(north)].edge_exists[Constants.EAST]:
-                edges[cells[get_index(north)].edge_id[Constants.EAST]].ey += cell_size
-                cells[i].edge_id[Constants.EAST] = cells[get_index(north)].edge_id[Constants.EAST]
-                cells[i].edge_exists[Constants.EAST] = True
-
-            else:
-                sx = (1 + p.x()) * cell_size
-                sy = p.y() * cell_size
-                ex, ey = sx, sy + cell_size
-                edge = Edge(sx, sy, ex, ey, Constants.EAST)
-
-                edge.id_ = len(edges)
-                edges.append(edge)
-
-                cells[i].edge_id[Constants.EAST] = edge.id_
-                cells[i].edge_exists[Constants.EAST] = True
-
-            # Fill the gap if a cell corner is shifted by a given offset
-
-            if north in selected and north_east in selected:
-                edges[cells[i].edge_id[Constants.EAST]].sy -= inner_offset * 2
-
-            if south in selected and south_east in selected:
-                edges[cells[i].edge_id[Constants.EAST]].ey += inner_offset * 2
-
-        if south not in selected:
-            if (cells[get_index(west)].edge_exists[Constants.SOUTH]
-                and cells[get_index(p)].row == cells[
-                    get_index(west)].row):  # Don't connect to row above
-
-                edges[cells[get_index(west)].edge_id[Constants.SOUTH]].ex += cell_size
-                cells[i].edge_id[Constants.SOUTH] = cells[get_index(west)].edge_id[Constants.SOUTH]
-                cells[i].edge_exists[Constants.SOUTH] = True
-
-            else:
-                sx = p.x() * cell_size
-                sy = (1 + p.y()) * cell_size
-                ex, ey = sx + cell_size, sy
-                edge = Edge(sx, sy, ex, ey, Constants.SOUTH)
-
-                edge.id_ = len(edges)
-                edges.append(edge)
-
-                cells[i].edge_id[Constants.SOUTH] = edge.id_
-                cells[i].edge_exists[Constants.SOUTH] = True
-
-            # Fill the gap if a cell corner is shifted by a given offset
-
-            if east in selected and south_east in selected:
-                edges[cells[i].edge_id[Constants.SOUTH]].ex += inner_offset * 2
-
-            if west in selected and south_west in selected:
-                edges[cells[i].edge_id[Constants.SOUTH]].sx -= inner_offset * 2
-
-    return edges
-
-
-def get_index(p: QPoint) -> int:
-    return p.y() * 9 + p.x()
-
-
-def get_point(index: int) -> QPoint:
-    return QPoint(index % 9, index // 9)
-
+                self.sides.add((index, side))
+
+        self._edges.clear()
+
+    def remove(self, index: int):
+        if index not in self.indices:
+            return
+
+        self.indices.remove(index)
+        for side, (_, opposite) in SIDES.items():
+            other = neighbour(index, side)
+            self.sides.discard((index, side))
+            if other in self.indices:
+                self.sides.add((other, opposite))
+
+        self._edges.clear()
+
+    def update(self, indices: Set[int]):
+        """Adds and removes cells until the outline is the one of indices"""
+        for index in self.indices - indices:
+            self.remove(index)
+        for index in indices - self.indices:
+            self.add(index)
+
+    def edges(self, cell_size: int, inner_offset: int) -> List[Edge]:
+        """
+        Sides in the same row (or column) that touch are merged into one edge. Edges that end in
+        an inner corner are stretched by twice the offset, so shifting them inwards by the
+        offset leaves no gap in the corner.
+
+        :return: The edges in pixels, relative to the top left corner of the grid
+        """
+        key = (cell_size, inner_offset)
+        if key not in self._edges:
+            self._edges[key] = self._merge(cell_size, inner_offset * 2)
+        return self._edges[key]
+
+    def _merge(self, cell_size: int, stretch: int) -> List[Edge]:
+        edges = []
+        inside = self.indices
+
+        def selected(index: int, *sides: int) -> bool:
+            for side in sides:
+                index = neighbour(index, side)
+            return index in inside
+
+        for side in SIDES:
+            horizontal = side in (Constants.NORTH, Constants.SOUTH)
+            # Walk along rows for horizontal sides and along columns for vertical ones
+            step, order = (1, lambda i: i) if horizontal else (9, lambda i: i % 9 * 9 + i // 9)
+            cells = sorted((index for index, s in self.sides if s == side), key=order)
+
+            runs = []
+            for index in cells:
+                if runs and runs[-1][1] + step == index and (
+                    not horizontal or index % 9 != 0
+                ):
+                    runs[-1][1] = index
+                else:
+                    runs.append([index, index])
+
+            for first, last in runs:
+                sx, sy = first % 9 * cell_size, first // 9 * cell_size
+                ex, ey = (last % 9 + horizontal) * cell_size, (last // 9 + 1) * cell_size
+
+                if side == Constants.NORTH:
+                    ey = sy
+                elif side == Constants.SOUTH:
+                    sy += cell_size
+                elif side == Constants.EAST:
+                    sx += cell_size
+                    ex += cell_size
+
+                if horizontal:
+                    ahead = Constants.NORTH if side == Constants.NORTH else Constants.SOUTH
+                    if selected(first, Constants.WEST) and selected(first, Constants.WEST, ahead):
+                        sx -= stretch
+                    if selected(last, Constants.EAST) and selected(last, Constants.EAST, ahead):
+                        ex += stretch
+                else:
+                    ahead = Constants.WEST if side == Constants.WEST else Constants.EAST
+                    if selected(first, Constants.NORTH) and selected(first, Constants.NORTH, ahead):
+                        sy -= stretch
+                    if selected(last, Constants.SOUTH) and selected(last, Constants.SOUTH, ahead):
+                        ey += stretch
+
+                edges.append((first, side, Edge(sx, sy, ex, ey, side)))
+
+        # Same order as a scan over the cells, so overlapping corners are painted as before
+        edges = [edge for _, _, edge in sorted(edges, key=lambda item: item[:2])]
+        for id_, edge in enumerate(edges):
+            edge.id_ = id_
+        return edges
+
+
+@lru_cache(maxsize=1024)
+def outline(indices: FrozenSet[int]) -> Outline:
+    """
+
+    :return: The shared outline of a fixed set of cells (e.g. a cage), it must not be changed
+    """
+    return Outline(indices)
 
-def valid(p: QPoint) -> bool:
-    return 0 <= p.y() * 9 + p.x() <= 81
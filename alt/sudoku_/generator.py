@@ -1,12 +1,21 @@
-import copy
 import random
+from typing import Dict, List
+
+from alt.sudoku_.jobs import Job, JobStopped
+from alt.sudoku_.mask_solver import ClueReduction, random_solution, reduce_clues
+from alt.sudoku_.puzzle import Puzzle
+from alt.sudoku_.variants import Rule, VariantSolver, CageRule, ThermometerRule, ArrowRule, \
+    DifferenceRule, RatioRule, XVRule, SandwichRule, LittleKillerRule, ORTHOGONAL, NEIGHBOURS
 
 EMPTY = -1
 
 
-class SudokuGenerator:
-    def __init__(self, sudoku: "Sudoku"):
+class SudokuGenerator(ClueReduction):
+    empty = EMPTY
+
+    def __init__(self, sudoku: "Sudoku", rng: random.Random = None):
         self.sudoku = sudoku
+        self.rng = rng if rng is not None else random.Random()
 
         self.grid = [self.sudoku.cells[i].value for i in range(self.sudoku.size ** 2)]
         self.counter = 0
@@ -28,7 +37,7 @@ class SudokuGenerator:
         rounds = 3
         while rounds > 0 and non_empty_squares_count != hints:
 
-            index = random.choice(non_empty_squares)
+            index = self.rng.choice(non_empty_squares)
             non_empty_squares.remove(index)
 
             non_empty_squares_count -= 1
@@ -36,7 +45,7 @@ class SudokuGenerator:
             removed_square = self.grid[index]
             self.grid[index] = EMPTY
 
-            grid_copy = copy.deepcopy(self.grid)
+            grid_copy = self.grid.copy()
 
             self.counter = 0
             self.solve_puzzle(grid_copy)
@@ -103,3 +112,238 @@ class SudokuGenerator:
             if grid[i] == EMPTY:
                 return i // self.sudoku.size, i % self.sudoku.size
         return
+
+
+class VariantGenerator:
+    """
+    Builds a variant puzzle around a solved grid. Components are only added where they agree
+    with the solution, afterwards givens are removed as long as the puzzle stays unique.
+    All random choices come from rng, so the same seed gives the same puzzle.
+    """
+
+    def __init__(self, solution: List[int] = None, rng: random.Random = None, **constraints):
+        self.rng = rng if rng is not None else random.Random()
+        self.constraints = constraints
+        if solution is None:
+            solution = random_solution(VariantSolver([0] * 81, **constraints), self.rng)
+        self.solution = solution
+
+        self.grid = self.solution.copy()
+        self.rules: List[Rule] = []
+
+        self.caged = set()
+        self.lined = set()
+        self.borders = set()
+        self.outside = set()
+
+    def __repr__(self):
+        out = ""
+        for i in range(81):
+            if i != 0 and i % 9 == 0:
+                out += '\n'
+            out += f"{self.grid[i] if self.grid[i] else '-'}  "
+        return out
+
+    def generate(self, cages: int = 0, thermometers: int = 0, arrows: int = 0, kropki: int = 0,
+                 xv: int = 0, sandwiches: int = 0, little_killers: int = 0, hints: int = 0):
+        """add the requested amount of each component and remove givens afterwards"""
+        self.add_cages(cages)
+        self.add_thermometers(thermometers)
+        self.add_arrows(arrows)
+        self.add_kropki(kropki)
+        self.add_xv(xv)
+        self.add_sandwiches(sandwiches)
+        self.add_little_killers(little_killers)
+        self.remove_givens(hints)
+
+    def add_cages(self, amount: int, max_size: int = 4, attempts: int = 100):
+        """grow cages from random cells, every cage holds distinct digits of the solution"""
+        while amount > 0 and attempts > 0:
+            attempts -= 1
+
+            start = self.rng.choice([i for i in range(81) if i not in self.caged])
+            cage = [start]
+            size = self.rng.randint(2, max_size)
+
+            while len(cage) < size:
+                options = [
+                    n for i in cage for n in ORTHOGONAL[i]
+                    if n not in self.caged and n not in cage
+                    and self.solution[n] not in [self.solution[c] for c in cage]
+                ]
+                if not options:
+                    break
+                cage.append(self.rng.choice(options))
+
+            if len(cage) < 2:
+                continue
+
+            self.caged.update(cage)
+            self.rules.append(CageRule(cage, sum(self.solution[i] for i in cage)))
+            amount -= 1
+
+    def add_thermometers(self, amount: int, max_length: int = 6, attempts: int = 100):
+        """walk from a random bulb along strictly increasing digits of the solution"""
+        while amount > 0 and attempts > 0:
+            attempts -= 1
+
+            path = [self.rng.choice([i for i in range(81) if i not in self.lined])]
+
+            while len(path) < max_length:
+                options = [
+                    n for n in NEIGHBOURS[path[-1]]
+                    if n not in self.lined and n not in path
+                    and self.solution[n] > self.solution[path[-1]]
+                ]
+                if not options:
+                    break
+                path.append(min(options, key=lambda n: self.solution[n]))
+
+            if len(path) < 3:
+                continue
+
+            self.lined.update(path)
+            self.rules.append(ThermometerRule(path[0], [path[1:]]))
+            amount -= 1
+
+    def add_arrows(self, amount: int, max_length: int = 3, attempts: int = 100):
+        """walk from a random circle until the digits on the arrow sum to the circle"""
+        while amount > 0 and attempts > 0:
+            attempts -= 1
+
+            bulb = self.rng.choice([i for i in range(81) if i not in self.lined])
+            target, path = self.solution[bulb], []
+
+            while sum(self.solution[i] for i in path) < target and len(path) < max_length:
+                options = [
+                    n for n in NEIGHBOURS[path[-1] if path else bulb]
+                    if n not in self.lined and n not in path and n != bulb
+                ]
+                if not options:
+                    break
+                path.append(self.rng.choice(options))
+
+            if not path or sum(self.solution[i] for i in path) != target:
+                continue
+
+            self.lined.update([bulb] + path)
+            self.rules.append(ArrowRule(bulb, [path]))
+            amount -= 1
+
+    def border_pairs(self) -> List[List[int]]:
+        """all pairs of orthogonal neighbours that have no border component yet"""
+        pairs = [
+            [i, n] for i in range(81) for n in ORTHOGONAL[i]
+            if i < n and (i, n) not in self.borders
+        ]
+        self.rng.shuffle(pairs)
+        return pairs
+
+    def add_kropki(self, amount: int):
+        """white dots between consecutive digits, black dots between digits with a ratio of 2"""
+        for first, second in self.border_pairs():
+            if amount <= 0:
+                return
+
+            a, b = self.solution[first], self.solution[second]
+
+            if abs(a - b) == 1:
+                self.rules.append(DifferenceRule([first, second], 1))
+            elif max(a, b) == 2 * min(a, b):
+                self.rules.append(RatioRule([first, second], 2))
+            else:
+                continue
+
+            self.borders.add((first, second))
+            amount -= 1
+
+    def add_xv(self, amount: int):
+        """V between digits summing to 5, X between digits summing to 10"""
+        for first, second in self.border_pairs():
+            if amount <= 0:
+                return
+
+            total = self.solution[first] + self.solution[second]
+            if total not in (5, 10):
+                continue
+
+            self.rules.append(XVRule([first, second], total))
+            self.borders.add((first, second))
+            amount -= 1
+
+    def add_sandwiches(self, amount: int):
+        """sums between the 1 and the 9 of random rows (left of the grid) and columns (above)"""
+        clues = [(0, row) for row in range(1, 10)] + [(col, 0) for col in range(1, 10)]
+        self.rng.shuffle(clues)
+
+        for col, row in clues:
+            if amount <= 0:
+                return
+
+            if (col, row) in self.outside:
+                continue
+
+            rule = SandwichRule.at(col, row, 0)
+            line = [self.solution[i] for i in rule.indices]
+            first, last = sorted((line.index(1), line.index(9)))
+            rule.total = sum(line[first + 1:last])
+
+            self.rules.append(rule)
+            self.outside.add((col, row))
+            amount -= 1
+
+    def add_little_killers(self, amount: int, min_length: int = 3):
+        """sums along random diagonals that start next to the top or the left side of the grid"""
+        clues = [
+            (col, 0, direction) for col in range(1, 10)
+            for direction in (LittleKillerRule.DOWN_LEFT, LittleKillerRule.DOWN_RIGHT)
+        ] + [
+            (0, row, direction) for row in range(1, 10)
+            for direction in (LittleKillerRule.TOP_RIGHT, LittleKillerRule.DOWN_RIGHT)
+        ]
+        self.rng.shuffle(clues)
+
+        for col, row, direction in clues:
+            if amount <= 0:
+                return
+
+            if (col, row) in self.outside:
+                continue
+
+            indices = LittleKillerRule.diagonal(col, row, direction)
+            if len(indices) < min_length:
+                continue
+
+            total = sum(self.solution[i] for i in indices)
+            self.rules.append(LittleKillerRule(indices, col, row, total, direction))
+            self.outside.add((col, row))
+            amount -= 1
+
+    def remove_givens(self, hints: int = 0, max_nodes: int = 20000, job: Job = None):
+        """
+        Removes givens in random order while the constraint aware solver confirms uniqueness.
+        A given whose check runs out of nodes is kept, so the result is always unique.
+        If the job stops the removal the givens removed so far stay removed.
+        """
+        solver = VariantSolver(self.grid, self.rules, **self.constraints)
+        solver.job = job
+
+        order = [i for i in range(81) if self.grid[i]]
+        self.rng.shuffle(order)
+
+        try:
+            reduce_clues(solver, order, hints, max_nodes)
+        except JobStopped:
+            # The stopped search has taken its trial digits out again and the clue it tested
+            # is back, so only givens whose removal was confirmed are missing
+            self.grid = solver.grid()
+            raise
+
+        self.grid = solver.grid()
+
+    def puzzle(self) -> Puzzle:
+        return Puzzle(self.grid, self.rules, self.constraints)
+
+    def to_json(self) -> Dict:
+        """the puzzle in the same format Sudoku.to_file writes"""
+        return self.puzzle().to_json()
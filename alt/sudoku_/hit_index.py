@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Kinds of slots, a slot is a tuple that starts with its kind:
+# (CELL, index), (EDGE, first, second), (CORNER, top left index), (OUTSIDE, col, row)
+CELL = 0
+EDGE = 1
+CORNER = 2
+OUTSIDE = 3
+
+Slot = Tuple[int, ...]
+
+
+def border_slot(indices: Iterable[int]) -> Optional[Slot]:
+    """
+
+    :param indices: The 2 cells next to an edge or the 4 cells around a corner
+    :return: The slot of the edge / corner, None if indices is empty
+    """
+    indices = sorted(indices)
+    if not indices:
+        return None
+    if len(indices) == 4:
+        return CORNER, indices[0]
+    return EDGE, indices[0], indices[-1]
+
+
+def border_at(x: int, y: int, cell_size: int, corner: bool = False,
+              threshold: int = 10) -> Optional[List[int]]:
+    """
+    Works out the edge (or with corner the 4 cells around a corner) next to a point.
+
+    :param x: X relative to the top left corner of the grid
+    :param y: Y relative to the top left corner of the grid
+    :param threshold: How far from an edge a point may be to hit it, corners use a third of
+    the cell size instead
+    :return: Indices of the cells next to the edge / around the corner, None if there is none
+    """
+    column, row = x // cell_size, y // cell_size
+    if not (0 <= column <= 8 and 0 <= row <= 8):
+        return None
+
+    index = row * 9 + column
+    inner_x, inner_y = x % cell_size, y % cell_size
+
+    if corner:
+        threshold = cell_size // 3
+        # Offset of the corner from the clicked cell, -1 = left / top, 1 = right / bottom
+        dx = -1 if inner_x <= threshold else 1 if inner_x >= cell_size - threshold else 0
+        dy = -1 if inner_y <= threshold else 1 if inner_y >= cell_size - threshold else 0
+        if not dx or not dy or not (0 <= column + dx <= 8 and 0 <= row + dy <= 8):
+            return None
+
+        top_left = index + min(dx, 0) + min(dy, 0) * 9
+        return [top_left, top_left + 1, top_left + 9, top_left + 10]
+
+    if inner_x <= threshold and column > 0:
+        return [index - 1, index]
+    if inner_x >= cell_size - threshold and column < 8:
+        return [index, index + 1]
+    if inner_y <= threshold and row > 0:
+        return [index - 9, index]
+    if inner_y >= cell_size - threshold and row < 8:
+        return [index, index + 9]
+    return None
+
+
+class HitIndex:
+    """
+    Components by the slots of the board they occupy: the cells they cover, the edge or corner
+    they sit on, the place of an outside clue. A click is turned into a slot by arithmetic
+    (see border_at), so finding the component under the mouse is a dictionary lookup instead
+    of a scan over all components.
+
+    The index has to be told about changes: add / remove with the component lists and update
+    whenever the cells of a component change (e.g. while a line is drawn).
+    """
+
+    def __init__(self):
+        self._slots: Dict[Slot, List] = {}
+        # id of a component -> the slots it was added under
+        self._added: Dict[int, List[Slot]] = {}
+
+    def __len__(self):
+        return len(self._added)
+
+    def __contains__(self, component) -> bool:
+        return id(component) in self._added
+
+    def add(self, component):
+        """
+
+        :param component: Any component with a slots method
+        """
+        if id(component) in self._added:
+            self.remove(component)
+
+        slots = component.slots()
+        self._added[id(component)] = slots
+        for slot in slots:
+            self._slots.setdefault(slot, []).append(component)
+
+    def remove(self, component):
+        for slot in self._added.pop(id(component), ()):
+            components = self._slots[slot]
+            components[:] = [other for other in components if other is not component]
+            if not components:
+                del self._slots[slot]
+
+    def update(self, component):
+        """Moves a component that was added to the slots it occupies now"""
+        self.add(component)
+
+    def clear(self):
+        self._slots.clear()
+        self._added.clear()
+
+    def rebuild(self, components: Iterable):
+        self.clear()
+        for component in components:
+            self.add(component)
+
+    def at(self, slot: Slot) -> List:
+        """
+
+        :return: The components in a slot, oldest first
+        """
+        return self._slots.get(slot, [])
+
+    def find(self, slot: Optional[Slot], kind: type = None):
+        """
+
+        :param kind: Only return components of this class (or its subclasses)
+        :return: The newest component in the slot, None if there is none
+        """
+        if slot is None:
+            return None
+
+        for component in reversed(self._slots.get(slot, ())):
+            if kind is None or isinstance(component, kind):
+                return component
+        return None
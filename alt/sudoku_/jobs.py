@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+from alt.sudoku_.mask_solver import MaskSolver, EMPTY, random_solution, reduce_clues
+from alt.sudoku_.solution_cache import SolutionCache
+
+FINISHED = "finished"
+CANCELLED = "cancelled"
+TIMEOUT = "timeout"
+OUT_OF_NODES = "out of nodes"
+
+
+class JobStopped(Exception):
+    """Raised inside a search once its job has been cancelled or ran out of budget"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Progress:
+    """Snapshot that is handed to the progress callback of a job"""
+
+    def __init__(self, nodes: int, elapsed: float, clues: int = None):
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.clues = clues
+
+    def __repr__(self):
+        out = f"{self.nodes} nodes in {self.elapsed:.2f}s ({self.nodes_per_second:.0f}/s)"
+        if self.clues is not None:
+            out += f", {self.clues} clues left"
+        return out
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class Job:
+    """
+    Budget and cancellation flag for a long running search. Searches call tick or check every
+    few nodes. That is cheap enough for the hot loop, the clock is only read on those calls and
+    the progress callback is throttled to one call per interval.
+
+    The same object works for the GUI (cancel from the main thread, progress as a signal)
+    and for batch scripts (time_limit / max_nodes so runaway puzzles are skipped).
+    """
+
+    def __init__(self, time_limit: float = 0.0, max_nodes: int = 0,
+                 progress: Callable[[Progress], None] = None, interval: float = 0.25):
+        """
+
+        :param time_limit: Wall clock budget in seconds, 0 = no limit
+        :param max_nodes: Node budget over all searches of the job, 0 = no limit
+        :param progress: Called with a Progress at most once per interval
+        :param interval: Seconds between two progress callbacks
+        """
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.progress = progress
+        self.interval = interval
+
+        self.nodes = 0
+        self.clues = None
+        self.status = None
+        self.result = None
+
+        self._cancelled = threading.Event()
+        self._started = time.perf_counter()
+        self._last_report = self._started
+
+    def cancel(self):
+        """Can be called from any thread, the search stops at its next tick"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def start(self):
+        self.nodes = 0
+        self.status = None
+        self._started = self._last_report = time.perf_counter()
+
+    def tick(self, nodes: int = 1) -> bool:
+        """
+
+        :param nodes: Nodes visited since the last tick
+        :return: False if the search has to stop, the reason is stored in status
+        """
+        self.nodes += nodes
+
+        if self._cancelled.is_set():
+            self.status = CANCELLED
+        elif self.max_nodes and self.nodes >= self.max_nodes:
+            self.status = OUT_OF_NODES
+        else:
+            now = time.perf_counter()
+            if self.time_limit and now - self._started >= self.time_limit:
+                self.status = TIMEOUT
+            elif self.progress is not None and now - self._last_report >= self.interval:
+                self._last_report = now
+                self.progress(self.snapshot())
+            return self.status is None
+
+        return False
+
+    def check(self, nodes: int = 1):
+        """Same as tick but raises JobStopped, so deep searches unwind without extra checks"""
+        if not self.tick(nodes):
+            raise JobStopped(self.status)
+
+    def snapshot(self) -> Progress:
+        return Progress(self.nodes, self.elapsed, self.clues)
+
+    def run(self, function: Callable, *args, **kwargs):
+        """
+        Runs function(*args, job=self, **kwargs) and stores its return value in result.
+
+        :return: The status of the job, FINISHED unless the job has been stopped
+        """
+        self.start()
+        try:
+            self.result = function(*args, job=self, **kwargs)
+            self.status = FINISHED
+        except JobStopped as e:
+            self.status = e.reason
+
+        if self.progress is not None:
+            self.progress(self.snapshot())
+        return self.status
+
+
+def solve(grid: List[int], job: Job = None, cache: SolutionCache = None
+          ) -> Optional[List[int]]:
+    """
+
+    :param cache: Asked first, misses are solved and stored in it
+    :return: The first solution of grid or None if it has none
+    """
+    if cache is not None:
+        return cache.solve(grid, job=job).solution
+
+    solver = MaskSolver(grid)
+    solver.job = job
+    return solver.solve()
+
+
+def solve_batch(grids: Iterable[List[int]], job: Job = None, cache: SolutionCache = None
+                ) -> List[Optional[List[int]]]:
+    """
+
+    :param cache: Puzzles that repeat (also rotated, mirrored or relabeled) are only solved once
+    :return: The solution of every grid in order, None for grids without one
+    """
+    cache = cache if cache is not None else SolutionCache()
+    return [solve(grid, job, cache) for grid in grids]
+
+
+def count(grid: List[int], limit: int = 2, job: Job = None, cache: SolutionCache = None) -> int:
+    """
+
+    :param cache: Asked first, it knows counts up to 2
+    :return: Number of solutions of grid, at most limit
+    """
+    if cache is not None and limit <= 2:
+        return min(cache.solve(grid, job=job).count, limit)
+
+    solver = MaskSolver(grid)
+    solver.job = job
+    return solver.count(limit)
+
+
+def generate(hints: int = 17, job: Job = None, empty: int = EMPTY,
+             rng: random.Random = None) -> List[int]:
+    """
+    Fills a random grid and removes clues in random order while the puzzle stays unique.
+    If the job stops during the removal the puzzle is still unique, it only keeps more clues
+    than asked for, so the partial result is stored in job.result before the job ends.
+
+    :param hints: Stop once only this many clues are left
+    :param job: Job that limits the generation
+    :param empty: Value used for empty cells in the returned grid
+    :param rng: Source of all random choices, the same seed gives the same puzzle
+    :return: A puzzle with a unique solution
+    """
+    rng = rng if rng is not None else random.Random()
+
+    solver = MaskSolver(random_solution(rng=rng))
+    solver.job = job
+
+    order = list(range(81))
+    rng.shuffle(order)
+
+    try:
+        reduce_clues(solver, order, hints)
+    finally:
+        if job is not None:
+            job.result = solver.grid(empty)
+
+    return solver.grid(empty)
+
+
+def stream(seed: int, worker: int = 0) -> random.Random:
+    """
+    Independent random stream for one worker. The string is hashed with SHA-512 when seeding,
+    so neighbouring workers do not get correlated sequences.
+
+    :param seed: Seed of the whole run
+    :param worker: Index of the worker
+    :return: Generator that always produces the same numbers for the same (seed, worker)
+    """
+    return random.Random(f"{seed}/{worker}")
+
+
+def generate_batch(seed: int, worker: int, amount: int, hints: int = 17,
+                   time_limit: float = 0.0) -> List[List[int]]:
+    """
+
+    :return: amount puzzles drawn from the stream of (seed, worker)
+    """
+    rng = stream(seed, worker)
+    puzzles = []
+
+    for _ in range(amount):
+        job = Job(time_limit=time_limit)
+        job.run(generate, hints, rng=rng)
+        puzzles.append(job.result)
+
+    return puzzles
+
+
+def generate_bank(seed: int, amount: int, workers: int = 4, hints: int = 17,
+                  time_limit: float = 0.0) -> List[List[int]]:
+    """
+    Generates puzzles on a process pool. Worker w produces the puzzles w, w + workers, ... from
+    its own stream, so a bank is reproduced exactly by the same seed and number of workers and
+    a single puzzle by generate_batch with its (seed, worker).
+
+    :param seed: Seed of the whole bank
+    :param amount: Number of puzzles
+    :param workers: Number of processes
+    :param hints: Clues each puzzle is reduced to (if possible)
+    :param time_limit: Seconds one puzzle may take, a stopped puzzle keeps more clues
+    :return: The puzzles in order
+    """
+    counts = [len(range(worker, amount, workers)) for worker in range(workers)]
+
+    with ProcessPoolExecutor(workers) as pool:
+        batches = list(pool.map(
+            generate_batch, [seed] * workers, range(workers), counts,
+            [hints] * workers, [time_limit] * workers
+        ))
+
+    return [batches[i % workers][i // workers] for i in range(amount)]
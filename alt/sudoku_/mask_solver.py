@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import random
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EMPTY = 0
+
+# Number of nodes between two checks of the job (power of two minus one, used as bitmask)
+JOB_INTERVAL = 1023
+
+ALL = 0x1FF  # Bits 0 - 8 stand for the digits 1 - 9
+
+ROW = [index // 9 for index in range(81)]
+COLUMN = [index % 9 for index in range(81)]
+BOX = [(index // 27) * 3 + (index % 9) // 3 for index in range(81)]
+
+POPCOUNT = [bin(mask).count("1") for mask in range(ALL + 1)]
+DIGITS = [[d for d in range(1, 10) if mask & (1 << (d - 1))] for mask in range(ALL + 1)]
+
+
+def bit(number: int) -> int:
+    return 1 << (number - 1)
+
+
+class MaskSolver:
+    """
+    Classic 9x9 solver that keeps the used digits of every row, column and box as bitmasks.
+
+    Placing or removing a digit only flips three bits, so one instance can be reused for many
+    searches on nearly identical grids (e.g. the same puzzle with a single clue removed).
+    """
+
+    def __init__(self, grid: Iterable[int]):
+        self.values = [EMPTY] * 81
+        self.rows = [0] * 9
+        self.columns = [0] * 9
+        self.boxes = [0] * 9
+
+        # Digits a cell is not allowed to take on top of the sudoku rules
+        self.banned = [0] * 81
+
+        self.consistent = True
+        self.nodes = 0
+        # Digits placed by analysis.propagate (naked and hidden singles)
+        self.propagations = 0
+        # Searches give up once nodes reaches this value, 0 means unbounded
+        self.node_limit = 0
+        # Optional jobs.Job that can cancel the search or limit its time
+        self.job = None
+        # Optional observer.SearchObserver that is told about every placement of the search
+        self.observer = None
+        self.solution = None
+
+        for index, value in enumerate(grid):
+            if 1 <= value <= 9:
+                if not self.candidates(index) & bit(value):
+                    self.consistent = False
+                self.place(index, value)
+
+    def __repr__(self):
+        return '\n'.join(
+            '  '.join(str(v) if v else '-' for v in self.values[row * 9:row * 9 + 9])
+            for row in range(9)
+        )
+
+    def place(self, index: int, number: int) -> None:
+        b = bit(number)
+        self.values[index] = number
+        self.rows[ROW[index]] |= b
+        self.columns[COLUMN[index]] |= b
+        self.boxes[BOX[index]] |= b
+
+    def remove(self, index: int) -> None:
+        number = self.values[index]
+        if number == EMPTY:
+            return
+
+        b = ~bit(number)
+        self.values[index] = EMPTY
+        self.rows[ROW[index]] &= b
+        self.columns[COLUMN[index]] &= b
+        self.boxes[BOX[index]] &= b
+
+    def snapshot(self) -> bytes:
+        """
+
+        :return: Values, house masks and banned digits as one blob for restore
+        """
+        return bytes(self.values) + array(
+            "H", self.rows + self.columns + self.boxes + self.banned
+        ).tobytes()
+
+    def restore(self, blob: bytes) -> None:
+        """Puts the grid back into the state of a snapshot with a few slice assignments"""
+        masks = array("H")
+        masks.frombytes(blob[81:])
+
+        self.values[:] = blob[:81]
+        self.rows[:] = masks[0:9]
+        self.columns[:] = masks[9:18]
+        self.boxes[:] = masks[18:27]
+        self.banned[:] = masks[27:108]
+
+    def candidates(self, index: int) -> int:
+        """
+
+        :param index: Index of a cell
+        :return: Bitmask of the digits that can still be placed in the cell
+        """
+        return ALL & ~(
+            self.rows[ROW[index]] | self.columns[COLUMN[index]] | self.boxes[BOX[index]]
+            | self.banned[index]
+        )
+
+    def grid(self, empty: int = EMPTY) -> List[int]:
+        return [value if value else empty for value in self.values]
+
+    def count(self, limit: int = 2) -> int:
+        """
+
+        :param limit: Stop searching as soon as this many solutions have been found
+        :return: Number of solutions, at most limit
+        """
+        self.solution = None
+        if not self.consistent:
+            return 0
+        return self._search(limit)
+
+    def solve(self) -> Optional[List[int]]:
+        """
+
+        :return: The first solution found or None if the grid cannot be solved
+        """
+        self.count(1)
+        return self.solution
+
+    def _choose(self) -> Tuple[int, int]:
+        """
+
+        :return: The empty cell with the fewest candidates and its candidates, (-1, 0) if solved
+        """
+        values, rows, columns, boxes, banned = (
+            self.values, self.rows, self.columns, self.boxes, self.banned
+        )
+
+        best, best_mask, best_size = -1, 0, 10
+        for index in range(81):
+            if values[index]:
+                continue
+
+            mask = ALL & ~(rows[ROW[index]] | columns[COLUMN[index]] | boxes[BOX[index]]
+                           | banned[index])
+            size = POPCOUNT[mask]
+            if size < best_size:
+                best, best_mask, best_size = index, mask, size
+                if size <= 1:
+                    break
+
+        return best, best_mask
+
+    def _search(self, limit: int) -> int:
+        self.nodes += 1
+        if self.nodes == self.node_limit:
+            # Out of budget, report the limit so every caller stops and assumes the worst
+            return limit
+        if self.job is not None and not self.nodes & JOB_INTERVAL:
+            self.job.check(JOB_INTERVAL + 1)
+
+        best, best_mask = self._choose()
+        if best == -1:
+            if self.solution is None:
+                self.solution = self.values.copy()
+            return 1
+
+        found = 0
+        observer = self.observer
+        for number in DIGITS[best_mask]:
+            self.place(best, number)
+            if observer is not None:
+                observer.placed(best, number)
+
+            # A stopped job unwinds through here, every frame takes its trial digit out again
+            try:
+                found += self._search(limit - found)
+            finally:
+                self.remove(best)
+                if observer is not None:
+                    observer.removed(best)
+
+            if found >= limit:
+                break
+
+        return found
+
+    def has_alternative(self, index: int, max_nodes: int = 0) -> bool:
+        """
+        Checks whether the puzzle stays unique if the clue at index is removed. The clue is
+        taken out, its digit is banned from the cell and a single solution is searched for.
+        Any solution found that way differs from the original one, so the clue is needed.
+
+        :param index: Index of a given
+        :param max_nodes: Give up after visiting this many nodes and keep the clue, 0 = no limit
+        :return: True if another digit could be placed in the cell after removing the clue
+        """
+        number = self.values[index]
+        self.remove(index)
+        self.banned[index] = bit(number)
+        self.node_limit = self.nodes + max_nodes + 1 if max_nodes else 0
+
+        try:
+            return self._search(1) > 0
+        finally:
+            self.node_limit = 0
+            self.banned[index] = 0
+            self.place(index, number)
+
+    def solutions_without(self, index: int, limit: int = 2) -> int:
+        """
+
+        :param index: Index of a given
+        :param limit: Stop searching as soon as this many solutions have been found
+        :return: Number of solutions (at most limit) once the clue at index is removed
+        """
+        number = self.values[index]
+        self.remove(index)
+
+        try:
+            return self._search(limit)
+        finally:
+            self.place(index, number)
+
+
+def random_solution(solver: MaskSolver = None, rng: random.Random = None) -> List[int]:
+    """
+    Without a solver the boxes on the main diagonal are filled at random, they never interact.
+    A given solver may enforce extra rules, so its first row is picked from the candidates
+    instead and the whole attempt is repeated if it cannot be completed.
+
+    :param solver: Empty solver whose rules the solution has to follow
+    :param rng: Source of all random choices, pass a seeded one for reproducible grids
+    :return: A solved grid
+    """
+    rng = rng if rng is not None else random.Random()
+
+    if solver is None:
+        solver = MaskSolver([EMPTY] * 81)
+
+        for box_top_left in (0, 30, 60):
+            numbers = list(range(1, 10))
+            rng.shuffle(numbers)
+
+            for offset, number in enumerate(numbers):
+                solver.place(box_top_left + offset // 3 * 9 + offset % 3, number)
+
+        return solver.solve()
+
+    while True:
+        for index in range(9):
+            options = DIGITS[solver.candidates(index)]
+            if not options:
+                break
+            solver.place(index, rng.choice(options))
+        else:
+            if solution := solver.solve():
+                return solution
+
+        for index in range(9):
+            solver.remove(index)
+
+
+def clue_criticality(grid: List[int]) -> Dict[int, bool]:
+    """
+    All checks share one solver, only the tested clue is toggled between searches.
+
+    :param grid: A puzzle with a unique solution
+    :return: Index of each given mapped to True if removing it breaks uniqueness (critical)
+    """
+    solver = MaskSolver(grid)
+    if solver.count(2) != 1:
+        raise ValueError("Puzzle must have exactly one solution")
+
+    return {
+        index: solver.has_alternative(index)
+        for index in range(81) if solver.values[index] != EMPTY
+    }
+
+
+def minimal_puzzle(grid: List[int], order: List[int] = None, empty: int = EMPTY) -> List[int]:
+    """
+    Removes redundant clues one after another until every remaining clue is critical.
+    A clue that is critical stays critical when more clues are removed, so one pass is enough.
+
+    :param grid: A puzzle with a unique solution
+    :param order: Order in which the clues are tried, defaults to top left to bottom right
+    :param empty: Value used for empty cells in the returned grid
+    :return: Minimal puzzle with the same solution
+    """
+    solver = MaskSolver(grid)
+    if solver.count(2) != 1:
+        raise ValueError("Puzzle must have exactly one solution")
+
+    reduce_clues(solver, order)
+    return solver.grid(empty)
+
+
+def reduce_clues(solver: MaskSolver, order: Iterable[int] = None, hints: int = 0,
+                 max_nodes: int = 0) -> None:
+    """
+    Takes out every clue of a unique puzzle that is not needed for uniqueness, in place.
+
+    :param solver: Solver holding a puzzle with a unique solution
+    :param order: Order in which the clues are tried, defaults to top left to bottom right
+    :param hints: Stop once only this many clues are left
+    :param max_nodes: Search budget for each clue, clues that exceed it are kept, 0 = no limit
+    """
+    if order is None:
+        order = range(81)
+
+    clues = sum(1 for value in solver.values if value != EMPTY)
+
+    for index in order:
+        if solver.job is not None:
+            solver.job.clues = clues
+
+        if clues <= hints:
+            return
+
+        if solver.values[index] == EMPTY:
+            continue
+
+        if not solver.has_alternative(index, max_nodes):
+            solver.remove(index)
+            clues -= 1
+
+
+class ClueReduction:
+    """
+    Clue checks for the generators that keep their puzzle in self.grid and their random
+    source in self.rng. empty is the value they use for empty cells.
+    """
+
+    empty = EMPTY
+
+    def clue_criticality(self) -> Dict[int, bool]:
+        """maps every clue of the grid to True if removing it breaks the unique solution"""
+        return clue_criticality(self.grid)
+
+    def redundant_clues(self) -> List[int]:
+        """returns the clues that can be removed on their own without losing uniqueness"""
+        return [index for index, critical in self.clue_criticality().items() if not critical]
+
+    def minimize(self) -> None:
+        """remove clues in random order until every remaining clue is critical"""
+        order = [i for i in range(81) if self.grid[i] != self.empty]
+        self.rng.shuffle(order)
+        self.grid = minimal_puzzle(self.grid, order, empty=self.empty)
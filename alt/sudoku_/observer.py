@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import time
+from typing import Iterable, Optional, Tuple
+
+from alt.sudoku_.mask_solver import EMPTY
+from alt.sudoku_.trace import Trace
+
+# Steps between two reads of the clock (power of two minus one, used as bitmask)
+CLOCK_INTERVAL = 63
+
+
+class LatestState:
+    """
+    Slot that holds the newest published state of a search. Publishing replaces one reference,
+    which is atomic under the GIL, so the search never waits for a reader and a reader never
+    sees a half written state. Readers compare the version to skip states they already have.
+    """
+
+    def __init__(self, state=None):
+        self._entry = (0, state)
+
+    def publish(self, state):
+        """Only the search publishes, so the version can be counted without a lock"""
+        self._entry = (self._entry[0] + 1, state)
+
+    def latest(self) -> Tuple[int, object]:
+        """
+
+        :return: Version and state, the version grows with every publish
+        """
+        return self._entry
+
+
+class SearchObserver:
+    """
+    Watches a MaskSolver search (solver.observer = observer) without slowing it down. The search
+    reports every placement, the observer keeps its own copy of the grid and publishes it at
+    most once per interval. A viewer samples state on its own frame timer.
+
+    With record the steps also go into a trace.Trace, so the search can be replayed afterwards.
+    """
+
+    def __init__(self, grid: Iterable[int], interval: float = 1 / 60, record: bool = False):
+        """
+
+        :param grid: The grid the search starts with, EMPTY for empty cells
+        :param interval: Seconds between two published states
+        :param record: Keep every step for a replay
+        """
+        self.start = bytes(grid)
+        self.values = bytearray(self.start)
+        self.interval = interval
+
+        self.state = LatestState(self.start)
+        self.steps = 0
+        self.trace: Optional[Trace] = Trace(self.start) if record else None
+        self.finished = False
+        # Step at which the grid was full for the first time, the search only unwinds after it
+        self.solved_at: Optional[int] = None
+
+        self._empty = self.values.count(EMPTY)
+
+        self._next = 0.0
+
+    def placed(self, index: int, number: int):
+        self.values[index] = number
+        self._empty -= 1
+        if self.trace is not None:
+            self.trace.assign(index, number)
+        self._step()
+
+        if not self._empty and self.solved_at is None:
+            self.solved_at = self.steps
+
+    def removed(self, index: int):
+        self.values[index] = EMPTY
+        self._empty += 1
+        if self.trace is not None:
+            self.trace.backtrack(index)
+        self._step()
+
+    def _step(self):
+        self.steps += 1
+        if not self.steps & CLOCK_INTERVAL:
+            now = time.perf_counter()
+            if now >= self._next:
+                self._next = now + self.interval
+                self.state.publish(bytes(self.values))
+
+    def finish(self, solution: Iterable[int] = None):
+        """
+
+        :param solution: Published as last state if given, otherwise the current grid is
+        """
+        self.state.publish(bytes(solution) if solution is not None else bytes(self.values))
+        self.finished = True
+
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import hashlib
+import heapq
+import mmap
+import operator
+import struct
+import tempfile
+from array import array
+from typing import Iterable, Iterator, List, Optional
+
+from alt.sudoku_.puzzle_file import read_puzzles
+
+EMPTY = 0
+
+MAGIC = b"SDKP"
+VERSION = 1
+
+CELLS = 81
+RECORD_SIZE = (CELLS + 1) // 2  # Two cells per byte, the last low nibble is unused
+
+# magic, version, cells, record size, puzzle count, offset of the index (0 = no index)
+HEADER = struct.Struct("<4sBBHQQ")
+# hash of the record (big endian, so bytes and numbers sort the same), record number
+INDEX_ENTRY = struct.Struct(">QQ")
+
+# Index entries sorted in memory at once, larger indices are merged from sorted runs
+INDEX_CHUNK = 1 << 20
+# Entries read from a run at a time while merging
+MERGE_BLOCK = 4096
+
+# Nibble lookups so packing and unpacking run through bytes.translate instead of a loop
+HIGH = bytes(byte >> 4 for byte in range(256))
+LOW = bytes(byte & 0xF for byte in range(256))
+SHIFT = bytes((byte << 4) & 0xFF for byte in range(256))
+
+
+def encode(grid: Iterable[int], empty: int = EMPTY) -> bytes:
+    """
+
+    :param grid: 81 cell values
+    :param empty: Value of empty cells in grid
+    :return: The grid as 41 bytes, one cell per nibble (high nibble first), 0 for empty cells
+    """
+    values = bytearray(0 if value == empty else value for value in grid)
+    if len(values) != CELLS:
+        raise ValueError(f"Expected {CELLS} cells, got {len(values)}")
+    if max(values) > 9:
+        raise ValueError("Cell values have to be between 1 and 9")
+
+    values.append(0)
+    return bytes(map(operator.or_, values[0::2].translate(SHIFT), values[1::2]))
+
+
+def decode_into(data: bytes | memoryview, buffer: bytearray) -> bytearray:
+    """
+    Unpacks a record without a loop over the cells: the high and low nibbles are split with
+    bytes.translate and written into every other slot of the buffer.
+
+    :param data: 41 bytes of a record (a zero-copy slice of the bank works)
+    :param buffer: Bytearray of at least 82 bytes that receives the values, 0 for empty cells
+    :return: buffer
+    """
+    data = bytes(data)
+    buffer[0:CELLS + 1:2] = data.translate(HIGH)
+    buffer[1:CELLS + 1:2] = data.translate(LOW)
+    return buffer
+
+
+def decode(data: bytes | memoryview, empty: int = EMPTY) -> List[int]:
+    """
+
+    :return: The 81 cell values of a record
+    """
+    values = list(decode_into(data, bytearray(CELLS + 1))[:CELLS])
+    if empty != 0:
+        return [value if value else empty for value in values]
+    return values
+
+
+def record_hash(record: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(record, digest_size=8).digest(), "big")
+
+
+class PackedWriter:
+    """
+    Writes a packed bank. Records are streamed to disk; with index=True only the 16 byte
+    index entries are kept in memory and written sorted behind the records on close.
+    """
+
+    def __init__(self, path: str, index: bool = False):
+        self.path = path
+        self.count = 0
+
+        self._hashes = array("Q") if index else None
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, CELLS, RECORD_SIZE, 0, 0))
+
+    def __enter__(self) -> PackedWriter:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, grid: Iterable[int], empty: int = EMPTY):
+        record = encode(grid, empty)
+        self._file.write(record)
+
+        if self._hashes is not None:
+            self._hashes.append(record_hash(record))
+        self.count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+
+        index_offset = 0
+        if self._hashes is not None:
+            index_offset = self._file.tell()
+            self._write_index()
+
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, CELLS, RECORD_SIZE, self.count, index_offset))
+        self._file.close()
+
+    def _run(self, start: int) -> bytes:
+        """
+
+        :return: The packed index entries of one chunk of records, sorted
+        """
+        hashes = self._hashes[start:start + INDEX_CHUNK]
+        order = sorted(range(len(hashes)), key=hashes.__getitem__)
+        return b"".join(INDEX_ENTRY.pack(hashes[i], start + i) for i in order)
+
+    def _write_index(self):
+        """
+        Sorts the index a chunk at a time into runs on a temporary file and merges them. Entries
+        are big endian, so comparing the packed bytes sorts by hash and then record number.
+        """
+        if self.count <= INDEX_CHUNK:
+            self._file.write(self._run(0))
+            return
+
+        with tempfile.TemporaryFile() as runs:
+            starts = range(0, self.count, INDEX_CHUNK)
+            for start in starts:
+                runs.write(self._run(start))
+
+            def entries(start: int) -> Iterator[bytes]:
+                position, end = start * INDEX_ENTRY.size, min(start + INDEX_CHUNK, self.count)
+                while position < end * INDEX_ENTRY.size:
+                    runs.seek(position)
+                    block = runs.read(min(MERGE_BLOCK * INDEX_ENTRY.size,
+                                          end * INDEX_ENTRY.size - position))
+                    position += len(block)
+                    for offset in range(0, len(block), INDEX_ENTRY.size):
+                        yield block[offset:offset + INDEX_ENTRY.size]
+
+            block = []
+            for entry in heapq.merge(*(entries(start) for start in starts)):
+                block.append(entry)
+                if len(block) == MERGE_BLOCK:
+                    self._file.write(b"".join(block))
+                    block.clear()
+            self._file.write(b"".join(block))
+
+
+class PackedBank:
+    """
+    Read only view on a packed bank. The file is memory mapped, so opening is instant, puzzle k
+    is a slice at a computed offset and only the pages that are touched are ever read.
+
+        with PackedBank("bank.sdkp") as bank:
+            grid = bank[123456]
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        magic, version, cells, record_size, count, index_offset = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a packed puzzle bank")
+        if cells != CELLS or record_size != RECORD_SIZE:
+            raise ValueError(f"{path} has unsupported records ({cells} cells)")
+
+        self.count = count
+        self.index_offset = index_offset
+
+    def __enter__(self) -> PackedBank:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, number: int) -> List[int]:
+        return decode(self.record(number))
+
+    def __iter__(self) -> Iterator[List[int]]:
+        buffer = bytearray(CELLS + 1)
+        for number in range(self.count):
+            yield list(decode_into(self.record(number), buffer)[:CELLS])
+
+    @property
+    def has_index(self) -> bool:
+        return self.index_offset != 0
+
+    def record(self, number: int) -> memoryview:
+        """
+
+        :return: Zero-copy slice of the mapped file holding the 41 bytes of puzzle number, drop
+        it before the bank is closed (see close)
+        """
+        if number < 0:
+            number += self.count
+        if not 0 <= number < self.count:
+            raise IndexError(f"Puzzle {number} out of range ({self.count} puzzles)")
+
+        start = HEADER.size + number * RECORD_SIZE
+        return self._view[start:start + RECORD_SIZE]
+
+    def decode_into(self, number: int, buffer: bytearray) -> bytearray:
+        """Unpacks puzzle number into buffer (82 bytes) without creating a new list"""
+        return decode_into(self.record(number), buffer)
+
+    def find(self, grid: Iterable[int], empty: int = EMPTY) -> Optional[int]:
+        """
+        Binary search over the index, only log2(count) index entries are touched.
+
+        :return: Number of the puzzle in the bank or None if it is not in there
+        """
+        if not self.has_index:
+            raise ValueError(f"{self.path} has no index")
+
+        record = encode(grid, empty)
+        key = record_hash(record)
+
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        # Hashes may collide, so the records themselves are compared as well
+        while low < self.count and (entry := self._entry(low))[0] == key:
+            if self.record(entry[1]) == record:
+                return entry[1]
+            low += 1
+        return None
+
+    def _entry(self, position: int):
+        return INDEX_ENTRY.unpack_from(self._map, self.index_offset + position * INDEX_ENTRY.size)
+
+    def close(self):
+        """
+        Slices returned by record point into the map, it can only be unmapped once they are
+        dropped. While one is still alive the file is closed anyway and the map goes away
+        with the last slice.
+        """
+        if self._file.closed:
+            return
+
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+        finally:
+            self._file.close()
+
+
+def pack_file(source: str, destination: str, index: bool = False) -> int:
+    """
+    Converts a text file (see puzzle_file.read_puzzles) into a packed bank, streaming both.
+
+    :return: Number of puzzles written
+    """
+    with PackedWriter(destination, index) as writer:
+        for record in read_puzzles(source):
+            writer.write(record.puzzle)
+        return writer.count
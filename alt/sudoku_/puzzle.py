@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+from typing import Callable, Dict, Iterable
+
+from alt.sudoku_.variants import Rule, VariantSolver, CageRule, ThermometerRule, ArrowRule, \
+    PalindromeRule, GermanWhispersRule, BetweenRule, LockoutRule, DifferenceRule, RatioRule, \
+    XVRule, LessGreaterRule, QuadrupleRule, EvenRule, OddRule, SandwichRule, XSumsRule, \
+    LittleKillerRule
+
+EMPTY = 0
+
+CONSTRAINTS = (
+    "diagonal_positive", "diagonal_negative", "antiknight", "antiking", "disjoint_groups",
+    "nonconsecutive"
+)
+NEGATIVE_CONSTRAINTS = ("ratio", "XV")
+CATEGORIES = ("lines", "border", "cells", "regions", "outside")
+
+# Component type in the json file -> function that builds the matching rule from its entry
+LOADERS: Dict[str, Callable[[Dict], Rule]] = {
+    "Cage": lambda item: CageRule(item["indices"], item.get("total")),
+    "Thermometer": lambda item: ThermometerRule(item["index"], item["branches"]),
+    "Arrow": lambda item: ArrowRule(item["index"], item["branches"]),
+    "BetweenLine": lambda item: BetweenRule(item["index"], item["branches"]),
+    "LockoutLine": lambda item: LockoutRule(item["index"], item["branches"]),
+    "PalindromeLine": lambda item: PalindromeRule(item["indices"]),
+    "GermanWhispersLine": lambda item: GermanWhispersRule(item["indices"]),
+    "XVSum": lambda item: XVRule(item["indices"], item["total"]),
+    "Difference": lambda item: DifferenceRule(item["indices"], item["difference"]),
+    "Ratio": lambda item: RatioRule(item["indices"], item["ratio"]),
+    "LessGreater": lambda item: LessGreaterRule(item["indices"], item["less"]),
+    "Quadruple": lambda item: QuadrupleRule(item["indices"], item["numbers"]),
+    "EvenDigit": lambda item: EvenRule(item["index"]),
+    "OddDigit": lambda item: OddRule(item["index"]),
+    "Sandwich": lambda item: SandwichRule.at(item["col"], item["row"], item["total"]),
+    "XSumsClue": lambda item: XSumsRule.at(item["col"], item["row"], item["total"]),
+    "LittleKiller": lambda item: LittleKillerRule.at(
+        item["col"], item["row"], item["total"], item["direction"]
+    ),
+}
+
+
+class Puzzle:
+    """
+    Pure data version of a sudoku file: digits, global constraints and rules. Nothing in here
+    imports Qt, so puzzles can be loaded, solved and saved on machines without a display.
+    """
+
+    def __init__(self, digits: Iterable[int] = None, rules: Iterable[Rule] = (),
+                 constraints: Dict[str, bool] = None,
+                 negative_constraints: Dict[str, bool] = None):
+        self.digits = list(digits) if digits is not None else [EMPTY] * 81
+        self.rules = list(rules)
+        self.constraints = {name: False for name in CONSTRAINTS} | (constraints or {})
+        self.negative_constraints = (
+            {name: False for name in NEGATIVE_CONSTRAINTS} | (negative_constraints or {})
+        )
+
+    def __repr__(self):
+        out = ""
+        for i in range(81):
+            if i != 0 and i % 9 == 0:
+                out += '\n'
+            out += f"{self.digits[i] if self.digits[i] else '-'}  "
+        return out
+
+    @property
+    def active_constraints(self) -> Dict[str, bool]:
+        return {name: True for name, active in self.constraints.items() if active}
+
+    def solver(self) -> VariantSolver:
+        return VariantSolver(self.digits, self.rules, **self.active_constraints)
+
+    @classmethod
+    def from_json(cls, data: Dict) -> Puzzle:
+        """
+
+        :param data: Dictionary in the format Sudoku.to_file writes
+        :return: The puzzle, unknown component types raise a ValueError
+        """
+        rules = []
+        for category in CATEGORIES:
+            for item in data.get("components", {}).get(category, []):
+                if item["type"] not in LOADERS:
+                    raise ValueError(f"Unknown component type {item['type']!r}")
+                rules.append(LOADERS[item["type"]](item))
+
+        return cls(
+            [int(digit) for digit in data["digits"]],
+            rules,
+            data.get("constraints"),
+            data.get("negative_constraints")
+        )
+
+    def to_json(self) -> Dict:
+        components = {category: [] for category in CATEGORIES}
+        for rule in self.rules:
+            components[rule.CATEGORY].append(rule.to_json())
+
+        return {
+            "digits": ''.join(map(str, self.digits)),
+            "constraints": self.constraints,
+            "negative_constraints": self.negative_constraints,
+            "components": components
+        }
+
+
+def load(path: str) -> Puzzle:
+    with open(path, "r") as file:
+        return Puzzle.from_json(json.load(file))
+
+
+def save(puzzle: Puzzle, path: str):
+    with open(path, "w") as file:
+        json.dump(puzzle.to_json(), file, indent=2)
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import gzip
+import re
+from typing import Iterable, Iterator, List, Optional, TextIO
+
+EMPTY = 0
+
+BLANKS = ".0-_*"
+WHITESPACE = b" \t\r\n"
+SEPARATORS = re.compile(r"[\s,;|]+")
+
+CHARS = {d: str(d) for d in range(1, 10)}
+
+INVALID = 0xFF
+
+# Byte -> cell value for bytes.translate, blanks become 0 and anything else INVALID
+VALUES = bytes(
+    d - 48 if 49 <= d <= 57 else 0 if chr(d) in BLANKS else INVALID for d in range(256)
+)
+
+
+class PuzzleRecord:
+    """One line of a puzzle file: the puzzle, optionally its solution and a rating"""
+
+    def __init__(self, puzzle: List[int], solution: Optional[List[int]] = None,
+                 rating: float | str | None = None, line: int = 0):
+        self.puzzle = puzzle
+        self.solution = solution
+        self.rating = rating
+        self.line = line
+
+    def __repr__(self):
+        return f"PuzzleRecord(line={self.line}, {to_line(self.puzzle)}, rating={self.rating})"
+
+
+def open_text(path: str, mode: str = "r", errors: str = "strict") -> TextIO:
+    """
+
+    :param path: File path, files ending with .gz are (de)compressed on the fly
+    :param mode: "r", "w" or "a"
+    :param errors: How bytes that are not ascii are handled, see open
+    :return: Text stream that yields / takes lines
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="ascii", errors=errors, newline="")
+    return open(path, mode, encoding="ascii", errors=errors, newline="")
+
+
+def parse_grid(text: str, empty: int = EMPTY) -> List[int]:
+    """
+
+    :param text: 81 characters, digits for givens and one of .0-_* for blanks. Whitespace
+        (line breaks of a 9x9 block) is dropped first
+    :param empty: Value used for blanks
+    :return: The 81 cell values
+    """
+    data = text.encode("ascii", "replace").translate(None, WHITESPACE)
+    if len(data) != 81:
+        raise ValueError(f"Expected 81 characters, got {len(data)}")
+
+    values = data.translate(VALUES)
+    if INVALID in values:
+        raise ValueError(f"Invalid character {chr(data[values.index(INVALID)])!r} in puzzle")
+
+    if empty == 0:
+        return list(values)
+    return [value if value else empty for value in values]
+
+
+def to_line(grid: Iterable[int], blank: str = ".", empty: int = EMPTY) -> str:
+    """
+
+    :param grid: 81 cell values
+    :param blank: Character written for empty cells
+    :param empty: Value of empty cells in grid
+    :return: The grid as a single 81 character line
+    """
+    chars = CHARS | {empty: blank, None: blank}
+    return ''.join(map(chars.__getitem__, grid))
+
+
+def parse_line(line: str, empty: int = EMPTY, number: int = 0) -> Optional[PuzzleRecord]:
+    """
+    Accepts "puzzle", "puzzle solution", "puzzle rating", "puzzle solution rating" as well as a
+    puzzle and solution written as one 162 character block. Fields may be separated by
+    whitespace, commas, semicolons or bars.
+
+    :return: The record or None for blank lines and comments (#)
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    fields = SEPARATORS.split(line)
+    if len(fields[0]) == 162:
+        fields[0:1] = fields[0][:81], fields[0][81:]
+
+    puzzle = parse_grid(fields[0], empty)
+    solution, rating = None, None
+
+    rest = fields[1:]
+    if rest and len(rest[0]) == 81:
+        solution = parse_grid(rest.pop(0), empty)
+    if rest:
+        try:
+            rating = float(rest[0])
+        except ValueError:
+            rating = rest[0]
+
+    return PuzzleRecord(puzzle, solution, rating, number)
+
+
+def read_puzzles(path: str, empty: int = EMPTY, skip_invalid: bool = False
+                 ) -> Iterator[PuzzleRecord]:
+    """
+    Lazily reads a puzzle file line by line, only the current line is held in memory.
+
+    :param path: Text file, gzip compressed if the name ends with .gz
+    :param empty: Value used for blanks
+    :param skip_invalid: Skip malformed lines instead of raising a ValueError
+    :return: Generator of records in file order
+    """
+    # Bytes that are not ascii become U+FFFD, so their line fails to parse like any malformed one
+    with open_text(path, errors="replace") as file:
+        for number, line in enumerate(file, 1):
+            try:
+                record = parse_line(line, empty, number)
+            except ValueError as e:
+                if skip_invalid:
+                    continue
+                raise ValueError(f"{path}:{number}: {e}") from None
+
+            if record is not None:
+                yield record
+
+
+class PuzzleWriter:
+    """
+    Writes one puzzle per line. Lines are collected and written in chunks, so millions of
+    puzzles do not mean millions of write calls.
+
+        with PuzzleWriter("bank.txt.gz") as writer:
+            writer.write(puzzle, solution, rating)
+    """
+
+    def __init__(self, path: str, blank: str = ".", separator: str = " ", empty: int = EMPTY,
+                 buffer_lines: int = 4096, append: bool = False):
+        self.path = path
+        self.blank = blank
+        self.separator = separator
+        self.empty = empty
+        self.buffer_lines = buffer_lines
+
+        self.written = 0
+        self._chars = CHARS | {empty: blank, None: blank}
+        self._buffer: List[str] = []
+        self._file = open_text(path, "a" if append else "w")
+
+    def __enter__(self) -> PuzzleWriter:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, puzzle: Iterable[int], solution: Iterable[int] = None,
+              rating: float | str = None):
+        char = self._chars.__getitem__
+
+        fields = [''.join(map(char, puzzle))]
+        if solution is not None:
+            fields.append(''.join(map(char, solution)))
+        if rating is not None:
+            fields.append(str(rating))
+
+        self._buffer.append(self.separator.join(fields) + "\n")
+        self.written += 1
+
+        if len(self._buffer) >= self.buffer_lines:
+            self.flush()
+
+    def write_record(self, record: PuzzleRecord):
+        self.write(record.puzzle, record.solution, record.rating)
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(''.join(self._buffer))
+            self._buffer.clear()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+def write_puzzles(path: str, records: Iterable[PuzzleRecord], **kwargs) -> int:
+    """
+
+    :param kwargs: Passed on to PuzzleWriter
+    :return: Number of puzzles written
+    """
+    with PuzzleWriter(path, **kwargs) as writer:
+        for record in records:
+            writer.write_record(record)
+        return writer.written
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import struct
+from array import array
+from typing import Iterable, List, Tuple
+
+CELLS = 81
+COLOR_SLOTS = 4  # Cells hold at most 4 colors
+
+# Digits <-> bitmask, bits 0 - 8 stand for the digits 1 - 9
+MASK_DIGITS = [[d for d in range(1, 10) if mask & (1 << (d - 1))] for mask in range(0x200)]
+
+# values (0 = empty), candidate masks, corner masks
+STATE = struct.Struct(f"<{CELLS}s{CELLS * 2}s{CELLS * 2}s")
+# colors as 32 bit rgba, 0 = free slot
+COLORS = struct.Struct(f"<{CELLS * COLOR_SLOTS * 4}s")
+
+
+def to_mask(digits: Iterable[int]) -> int:
+    mask = 0
+    for digit in digits:
+        mask |= 1 << (digit - 1)
+    return mask
+
+
+def pack(values: Iterable[int], candidates: Iterable[int], corners: Iterable[int],
+         colors: Iterable[int] = None, empty: int = 0) -> bytes:
+    """
+    Packs the state of a board into one blob of STATE.size bytes (plus COLORS.size bytes with
+    colors), small enough to keep one per undo step or search node.
+
+    :param values: 81 cell values
+    :param candidates: 81 bitmasks of the center pencil marks / solver candidates
+    :param corners: 81 bitmasks of the corner pencil marks
+    :param colors: 81 * COLOR_SLOTS rgba values, 0 for free slots
+    :param empty: Value of empty cells in values
+    """
+    blob = STATE.pack(
+        bytes(0 if value == empty else value for value in values),
+        array("H", candidates).tobytes(),
+        array("H", corners).tobytes()
+    )
+    if colors is not None:
+        blob += COLORS.pack(array("I", colors).tobytes())
+    return blob
+
+
+def unpack(blob: bytes, empty: int = 0) -> Tuple[List[int], array, array, array | None]:
+    """
+
+    :param blob: A blob written by pack
+    :param empty: Value empty cells get in the returned values
+    :return: Values, candidate masks, corner masks and colors (None if the blob has none)
+    """
+    if len(blob) not in (STATE.size, STATE.size + COLORS.size):
+        raise ValueError(f"Expected a snapshot of {STATE.size} or {STATE.size + COLORS.size} "
+                         f"bytes, got {len(blob)}")
+
+    values, candidates, corners = STATE.unpack_from(blob)
+
+    colors = None
+    if len(blob) > STATE.size:
+        colors = array("I", COLORS.unpack_from(blob, STATE.size)[0])
+
+    return (
+        [value if value else empty for value in values],
+        array("H", candidates), array("H", corners), colors
+    )
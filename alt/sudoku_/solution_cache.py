@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from alt.sudoku_.mask_solver import MaskSolver, EMPTY
+from alt.sudoku_.variants import VariantSolver
+
+# Global constraints that survive rotating, mirroring and relabeling the grid
+INVARIANT = ("diagonal_positive", "diagonal_negative", "antiknight", "antiking", "disjoint_groups")
+
+DIAGONALS = {
+    "diagonal_positive": frozenset(range(8, 73, 8)),
+    "diagonal_negative": frozenset(range(0, 81, 10)),
+}
+
+# Cell values <-> digit characters for the text column of the database
+DIGITS = bytes(48 + value if value < 10 else value for value in range(256))
+VALUES = bytes(value - 48 if 48 <= value <= 57 else value for value in range(256))
+
+IDENTITY = tuple(range(81))
+# Transforms are tuples where entry i is the index the new cell i is taken from
+ROTATE = tuple((8 - index % 9) * 9 + index // 9 for index in range(81))
+TRANSPOSE = tuple(index % 9 * 9 + index // 9 for index in range(81))
+
+
+def compose(first: Tuple[int, ...], second: Tuple[int, ...]) -> Tuple[int, ...]:
+    """
+
+    :return: Transform that applies first and then second
+    """
+    return tuple(first[index] for index in second)
+
+
+def _dihedral() -> List[Tuple[int, ...]]:
+    transforms = []
+    for start in (IDENTITY, TRANSPOSE):
+        for _ in range(4):
+            transforms.append(start)
+            start = compose(start, ROTATE)
+    return transforms
+
+
+# The 8 rotations and reflections of the grid
+SYMMETRIES = _dihedral()
+
+
+def _as_text(values: bytes) -> str:
+    return values.translate(DIGITS).decode("ascii")
+
+
+def cacheable(constraints: Dict[str, bool] = None) -> bool:
+    """
+
+    :param constraints: Base constraints of the puzzle (name: active)
+    :return: If puzzles with these constraints can be cached, rules (cages, lines, ...) never can
+    """
+    return all(name in INVARIANT for name, active in (constraints or {}).items() if active)
+
+
+def symmetries(constraints: Dict[str, bool] = None) -> List[Tuple[int, ...]]:
+    """
+
+    :return: The rotations and reflections that map the active diagonals onto themselves
+    """
+    return _symmetries(*(bool((constraints or {}).get(name)) for name in DIAGONALS))
+
+
+@lru_cache
+def _symmetries(*diagonals: bool) -> List[Tuple[int, ...]]:
+    active = {cells for cells, on in zip(DIAGONALS.values(), diagonals) if on}
+    return [
+        transform for transform in SYMMETRIES
+        if {frozenset(i for i in range(81) if transform[i] in cells) for cells in active} == active
+    ]
+
+
+class Canonical:
+    """
+    Canonical form of a grid: the smallest of its rotations and reflections after the digits
+    have been relabeled in order of their first appearance.
+
+    :ivar key: Key of the canonical form in the cache
+    :ivar transform: Rotation or reflection that leads from the grid to the canonical form
+    :ivar labels: Table for bytes.translate from digits of the grid to canonical digits
+    """
+
+    def __init__(self, grid: Iterable[int], constraints: Dict[str, bool] = None,
+                 empty: int = EMPTY):
+        values = bytes(0 if value == empty else value for value in grid)
+        if len(values) != 81:
+            raise ValueError(f"Expected 81 cells, got {len(values)}")
+
+        best = None
+        for transform in symmetries(constraints):
+            moved = bytes(map(values.__getitem__, transform))
+
+            # First appearance order of the digits, the digits that do not appear come last
+            order = [digit for digit in dict.fromkeys(moved) if digit]
+            order += [digit for digit in range(1, 10) if digit not in order]
+
+            labels = bytearray(range(256))
+            for label, digit in enumerate(order, 1):
+                labels[digit] = label
+
+            form = moved.translate(labels)
+            if best is None or form < best[0]:
+                best = (form, transform, bytes(labels))
+
+        form, self.transform, self.labels = best
+
+        inverse = bytearray(range(256))
+        for digit in range(1, 10):
+            inverse[self.labels[digit]] = digit
+        self.inverse = bytes(inverse)
+
+        active = ','.join(sorted(name for name, on in (constraints or {}).items() if on))
+        self.key = f"{active}:{_as_text(form)}" if active else _as_text(form)
+
+    def to_canonical(self, grid: Iterable[int]) -> bytes:
+        """
+
+        :param grid: A grid in the frame of the original puzzle, e.g. its solution
+        :return: The grid moved and relabeled like the puzzle
+        """
+        values = bytes(grid)
+        return bytes(map(values.__getitem__, self.transform)).translate(self.labels)
+
+    def from_canonical(self, values: bytes) -> List[int]:
+        """
+
+        :param values: A grid in the canonical frame, e.g. a stored solution
+        :return: The grid mapped back onto the original puzzle
+        """
+        values = values.translate(self.inverse)
+        grid = [EMPTY] * 81
+        for index, source in enumerate(self.transform):
+            grid[source] = values[index]
+        return grid
+
+
+class CachedSolution:
+    """
+    :ivar solution: The solution or None if the puzzle has none
+    :ivar count: Number of solutions, at most 2 (= not unique)
+    :ivar rating: Nodes the solver needed for the count, a rough measure of the difficulty
+    """
+
+    def __init__(self, solution: Optional[List[int]], count: int, rating: float = None):
+        self.solution = solution
+        self.count = count
+        self.rating = rating
+
+    def __repr__(self):
+        return f"CachedSolution(count={self.count}, rating={self.rating})"
+
+
+class SolutionCache:
+    """
+    Maps the canonical form of classic puzzles (optionally with the constraints in INVARIANT)
+    to their solution, solution count and rating. The entries live in an sqlite file with a
+    small LRU dictionary in front, a puzzle that comes back rotated, mirrored or with other
+    digits is answered from the entry of the first one.
+
+        with SolutionCache("solutions.db") as cache:
+            result = cache.solve(grid)
+    """
+
+    def __init__(self, path: str = ":memory:", size: int = 4096):
+        """
+
+        :param path: sqlite file, ":memory:" keeps the entries for the lifetime of the cache
+        :param size: Number of entries held in memory
+        """
+        self.path = path
+        self.size = size
+
+        self.hits = 0
+        self.misses = 0
+
+        self._recent: OrderedDict[str, Tuple[Optional[bytes], int, Optional[float]]] = \
+            OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS solutions "
+            "(key TEXT PRIMARY KEY, solution TEXT, count INTEGER, rating REAL)"
+        )
+        self._db.commit()
+
+    def __enter__(self) -> SolutionCache:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def _lookup(self, key: str) -> Optional[Tuple[Optional[bytes], int, Optional[float]]]:
+        with self._lock:
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                return self._recent[key]
+
+            row = self._db.execute(
+                "SELECT solution, count, rating FROM solutions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            solution, count, rating = row
+            entry = (solution.encode("ascii").translate(VALUES) if solution else None,
+                     count, rating)
+            self._remember(key, entry)
+            return entry
+
+    def _remember(self, key: str, entry: Tuple[Optional[bytes], int, Optional[float]]):
+        self._recent[key] = entry
+        self._recent.move_to_end(key)
+        if len(self._recent) > self.size:
+            self._recent.popitem(last=False)
+
+    def get(self, grid: Iterable[int], constraints: Dict[str, bool] = None,
+            empty: int = EMPTY) -> Optional[CachedSolution]:
+        """
+
+        :return: The stored entry mapped back onto grid or None if the puzzle is not cached
+        """
+        if not cacheable(constraints):
+            return None
+
+        canonical = Canonical(grid, constraints, empty)
+        entry = self._lookup(canonical.key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        solution, count, rating = entry
+        if solution is not None:
+            solution = canonical.from_canonical(solution)
+        return CachedSolution(solution, count, rating)
+
+    def put(self, grid: Iterable[int], solution: Optional[Iterable[int]], count: int,
+            rating: float = None, constraints: Dict[str, bool] = None, empty: int = EMPTY):
+        """
+
+        :param grid: The puzzle
+        :param solution: A solution of the puzzle (or None if there is none)
+        :param count: Number of solutions, anything above 1 is stored as 2
+        :param rating: Any difficulty measure, the cache only hands it back
+        """
+        if not cacheable(constraints):
+            return
+
+        canonical = Canonical(grid, constraints, empty)
+        values = canonical.to_canonical(solution) if solution is not None else None
+        entry = (values, min(count, 2), rating)
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)",
+                (canonical.key, _as_text(values) if values else None, entry[1], rating)
+            )
+            self._db.commit()
+            self._remember(canonical.key, entry)
+
+    def solve(self, grid: Iterable[int], constraints: Dict[str, bool] = None, job=None,
+              empty: int = EMPTY) -> CachedSolution:
+        """
+        Answers from the cache if possible, otherwise counts the solutions (up to 2) and stores
+        the result. A job that stops the search raises JobStopped and nothing is stored.
+
+        :param job: Optional jobs.Job for the search on a miss
+        :return: Solution, count and rating of grid
+        """
+        grid = [EMPTY if value == empty else value for value in grid]
+
+        cached = self.get(grid, constraints)
+        if cached is not None:
+            return cached
+
+        active = {name: True for name, on in (constraints or {}).items() if on}
+        solver = VariantSolver(grid, **active) if active else MaskSolver(grid)
+        solver.job = job
+
+        count = solver.count(2)
+        result = CachedSolution(solver.solution, count, solver.nodes)
+
+        self.put(grid, result.solution, count, result.rating, constraints)
+        return result
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -58,7 +58,8 @@ class SudokuGenerator:
             or self.num_used_in_box(grid, row, column, number)
         )
 
-    def brute_force(self, grid: List[int], random_pick: bool = True) -> List[int] | bool:
+    def brute_force(self, grid: List[int], random_pick: bool = True,
+                    rng: random.Random = None) -> List[int] | bool:
 
         current = self.get_empty(grid)
 
@@ -67,14 +68,15 @@ class SudokuGenerator:
 
         options = [1, 2, 3, 4, 5, 6, 7, 8, 9]
         if random_pick:
-            random.shuffle(options)
+            rng = rng if rng is not None else random.Random()
+            rng.shuffle(options)
 
         for number in options:
 
             if self.can_set(grid, current, number):
                 grid[current] = number
 
-                if self.brute_force(grid, random_pick):
+                if self.brute_force(grid, random_pick, rng):
                     return grid
 
                 grid[current] = EMPTY
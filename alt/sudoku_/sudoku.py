@@ -1,17 +1,104 @@
 from __future__ import annotations
 
-import copy
 import itertools
 import os
 import random
-import time
+from contextlib import contextmanager
 from typing import List, Dict, Tuple
 
-from PySide6.QtCore import QPoint, QRect, Qt, QObject
+from PySide6.QtCore import QPoint, QRect, Qt
 from PySide6.QtGui import QPainter, QPolygon, QColor
 from PySide6.QtWidgets import QFileDialog
 
-from alt.utils import StoppableThread, BoundList, Constants
+from alt.sudoku_.conflicts import ConflictIndex
+from alt.sudoku_.hit_index import HitIndex
+from alt.sudoku_.jobs import Job, JobStopped
+from alt.sudoku_.puzzle import Puzzle
+from alt.sudoku_.puzzle_file import parse_grid, to_line
+from alt.sudoku_.snapshot import COLOR_SLOTS, MASK_DIGITS, pack, to_mask, unpack
+from alt.sudoku_.solution_cache import SolutionCache, cacheable
+from alt.utils import BoundList, Constants
+
+
+# Alignments of the first four corner marks
+CORNERS = (
+    Qt.AlignTop | Qt.AlignLeft, Qt.AlignTop | Qt.AlignRight,
+    Qt.AlignBottom | Qt.AlignLeft, Qt.AlignBottom | Qt.AlignRight
+)
+
+
+def cell_rect(row: int, column: int, cell_size: int) -> QRect:
+    return QRect(column * cell_size + cell_size, row * cell_size + cell_size, cell_size, cell_size)
+
+
+def scaled_cell_rect(row: int, column: int, cell_size: int, factor: float) -> QRect:
+    shift_by = int(cell_size - (cell_size * factor)) // 2
+    return QRect(
+        column * cell_size + cell_size + shift_by,
+        row * cell_size + cell_size + shift_by,
+        int(cell_size * factor),
+        int(cell_size * factor)
+    )
+
+
+def color_polygons(rect: QRect, cell_size: int) -> Dict[int, List[QPolygon]]:
+    """
+
+    :return: Parts of a cell for 2 (diagonal halves), 3 and 4 (triangles to the center) colors
+    """
+    x, y, center = rect.x(), rect.y(), rect.center()
+    return {
+        2: [
+            QPolygon([
+                QPoint(x, y), QPoint(x + cell_size, y), QPoint(x + cell_size, y + cell_size)
+            ]),
+            QPolygon([
+                QPoint(x + cell_size, y + cell_size), QPoint(x, y + cell_size), QPoint(x, y)
+            ])
+        ],
+        3: [
+            QPolygon([
+                QPoint(x + cell_size // 3, y), center, QPoint(x, y + cell_size), QPoint(x, y)
+            ]),
+            QPolygon([
+                QPoint(x + cell_size // 3, y), QPoint(x + cell_size, y),
+                QPoint(x + cell_size, y + cell_size // 3 * 2), center
+            ]),
+            QPolygon([
+                QPoint(x + cell_size, y + cell_size // 3 * 2),
+                QPoint(x + cell_size, y + cell_size), QPoint(x, y + cell_size), center
+            ])
+        ],
+        4: [
+            QPolygon([QPoint(x, y), QPoint(x + cell_size, y), center]),
+            QPolygon([QPoint(x + cell_size, y), QPoint(x + cell_size, y + cell_size), center]),
+            QPolygon([QPoint(x + cell_size, y + cell_size), QPoint(x, y + cell_size), center]),
+            QPolygon([QPoint(x, y + cell_size), QPoint(x, y), center])
+        ]
+    }
+
+
+class CellGeometry:
+    """
+    Rects, scaled rects and color polygons of every cell at one cell size. The board builds it
+    in resizeEvent (Sudoku.geometry), so painting looks shapes up instead of creating them.
+    The shapes are shared, callers must not modify them.
+    """
+
+    # Factors of scaled_rect used by the digits and the components
+    FACTORS = (0.2, 0.75, 0.8)
+
+    def __init__(self, cell_size: int, size: int = 9):
+        self.cell_size = cell_size
+
+        positions = [(index // size, index % size) for index in range(size * size)]
+
+        self.rects = [cell_rect(row, column, cell_size) for row, column in positions]
+        self.scaled = {
+            factor: [scaled_cell_rect(row, column, cell_size, factor) for row, column in positions]
+            for factor in self.FACTORS
+        }
+        self.polygons = [color_polygons(rect, cell_size) for rect in self.rects]
 
 
 class Cell:
@@ -22,16 +109,21 @@ class Cell:
 
         self.valid_numbers = BoundList(max_length=9, sort_=True)
         self.corner = BoundList(max_length=4, sort_=True)
+        # Optional ConflictIndex that is told about every new value of the cell
+        self.conflict_index = None
         self.value = value
         self.colors = BoundList(max_length=4, sort_=True)
         self.candidates = {1, 2, 3, 4, 5, 6, 7, 8, 9}
 
-        self.edge_id = [0, 0, 0, 0]
-        self.edge_exists = [False, False, False, False]
-
     def __repr__(self):
         return f"Cell({self.index}, {self.value})"
 
+    def __setattr__(self, name: str, value):
+        # value stays a plain attribute, reading it is what the searches do most
+        object.__setattr__(self, name, value)
+        if name == "value" and self.conflict_index is not None:
+            self.conflict_index.set(self.index, value)
+
     def __lt__(self, other):
         return self.value < other.value
 
@@ -111,25 +203,16 @@ class Cell:
         return len(self.neighbours)
 
     def rect(self, cell_size: int):
-        return QRect(
-            self.column * cell_size + cell_size,
-            self.row * cell_size + cell_size,
-            cell_size,
-            cell_size
-        )
+        geometry = self.sudoku.geometry
+        if geometry is not None and geometry.cell_size == cell_size:
+            return geometry.rects[self.index]
+        return cell_rect(self.row, self.column, cell_size)
 
     def scaled_rect(self, cell_size: int, factor: float = 1) -> QRect:
-        shift_by = int(cell_size - (cell_size * factor)) // 2
-        return QRect(
-            self.column * cell_size + cell_size + shift_by,
-            self.row * cell_size + cell_size + shift_by,
-            int(cell_size * factor),
-            int(cell_size * factor)
-        )
-
-    def reset(self):
-        self.edge_id = [0, 0, 0, 0]
-        self.edge_exists = [False, False, False, False]
+        geometry = self.sudoku.geometry
+        if geometry is not None and geometry.cell_size == cell_size and factor in geometry.scaled:
+            return geometry.scaled[factor][self.index]
+        return scaled_cell_rect(self.row, self.column, cell_size, factor)
 
     def reset_values(self, skip_value: bool = False) -> None:
         """
@@ -183,132 +266,29 @@ class Cell:
 
     def draw_colors(self, painter: QPainter, cell_size: int):
         amount = len(self.colors)
-        rect = self.rect(cell_size)
-        center = rect.center()
         painter.setPen(Qt.NoPen)
 
-        match amount:
-            case 1:
-                painter.fillRect(self.rect(cell_size), self.colors[0])
-
-            case 2:
-                painter.setBrush(self.colors[0])
-                painter.drawPolygon(
-                    QPolygon(
-                        [
-                            QPoint(rect.x(), rect.y()),
-                            QPoint(rect.x() + cell_size, rect.y()),
-                            QPoint(rect.x() + cell_size, rect.y() + cell_size),
-                        ]
-                    )
-                )
-
-                painter.setBrush(self.colors[1])
-                painter.drawPolygon(
-                    QPolygon(
-                        [
-                            QPoint(rect.x() + cell_size, rect.y() + cell_size),
-                            QPoint(rect.x(), rect.y() + cell_size),
-                            QPoint(rect.x(), rect.y()),
-                        ]
-                    )
-                )
-
-            case 3:
-                painter.setPen(Qt.NoPen)
-                painter.setBrush(self.colors[0])
-                painter.drawPolygon(
-                    QPolygon(
-                        [
-                            QPoint(rect.x() + cell_size // 3, rect.y()),
-                            center,
-                            QPoint(rect.x(), rect.y() + cell_size),
-                            QPoint(rect.x(), rect.y())
-                        ]
-                    )
-                )
-
-                painter.setBrush(self.colors[1])
-                painter.drawPolygon(
-                    QPolygon(
-                        [
-                            QPoint(rect.x() + cell_size // 3, rect.y()),
-                            QPoint(rect.x() + cell_size, rect.y()),
-                            QPoint(rect.x() + cell_size, rect.y() + cell_size // 3 * 2),
-                            center
-                        ]
-                    )
-                )
-
-                painter.setBrush(self.colors[2])
-                painter.drawPolygon(
-                    QPolygon(
-                        [
-                            QPoint(rect.x() + cell_size, rect.y() + cell_size // 3 * 2),
-                            QPoint(rect.x() + cell_size, rect.y() + cell_size),
-                            QPoint(rect.x(), rect.y() + cell_size),
-                            center
-                        ]
-                    )
-                )
-
-            case 4:
-                painter.setBrush(self.colors[0])
-                painter.drawPolygon(
-                    QPolygon(
-                        [
-                            QPoint(rect.x(), rect.y()),
-                            QPoint(rect.x() + cell_size, rect.y()),
-                            center
-                        ]
-                    )
-                )
-
-                painter.setBrush(self.colors[1])
-                painter.drawPolygon(
-                    QPolygon(
-                        [
-                            QPoint(rect.x() + cell_size, rect.y()),
-                            QPoint(rect.x() + cell_size, rect.y() + cell_size),
-                            center
-                        ]
-                    )
-                )
-
-                painter.setBrush(self.colors[2])
-                painter.drawPolygon(
-                    QPolygon(
-                        [
-                            QPoint(rect.x() + cell_size, rect.y() + cell_size),
-                            QPoint(rect.x(), rect.y() + cell_size),
-                            center
-                        ]
-                    )
-                )
-
-                painter.setBrush(self.colors[3])
-                painter.drawPolygon(
-                    QPolygon(
-                        [
-                            QPoint(rect.x(), rect.y() + cell_size),
-                            QPoint(rect.x(), rect.y()),
-                            center
-                        ]
-                    )
-                )
+        if amount == 1:
+            painter.fillRect(self.rect(cell_size), self.colors[0])
+            return
+
+        for color, polygon in zip(self.colors, self.polygons(cell_size).get(amount, ())):
+            painter.setBrush(color)
+            painter.drawPolygon(polygon)
+
+    def polygons(self, cell_size: int) -> Dict[int, List[QPolygon]]:
+        """
+
+        :return: The parts of the cell for 2, 3 and 4 colors
+        """
+        geometry = self.sudoku.geometry
+        if geometry is not None and geometry.cell_size == cell_size:
+            return geometry.polygons[self.index]
+        return color_polygons(self.rect(cell_size), cell_size)
 
     def corners(self, number: int) -> Qt.Alignment:
-        match sorted(self.corner).index(number):
-            case 0:
-                return Qt.AlignTop | Qt.AlignLeft
-            case 1:
-                return Qt.AlignTop | Qt.AlignRight
-            case 2:
-                return Qt.AlignBottom | Qt.AlignLeft
-            case 3:
-                return Qt.AlignBottom | Qt.AlignRight
-            case _:
-                return Qt.AlignHCenter | Qt.AlignVCenter
+        position = sorted(self.corner).index(number)
+        return CORNERS[position] if position < len(CORNERS) else Qt.AlignHCenter | Qt.AlignVCenter
 
     def set_values(self, mode: int, value: int | QColor, COLORS: List[QColor]):
 
@@ -358,9 +338,17 @@ class Sudoku:
 
         self.size = size
         self.cells = [Cell(self, i) for i in range(size ** 2)]
+        # Conflicts of the cells, kept up to date with every value (not the givens)
+        self.conflict_index = ConflictIndex()
+        for cell in self.cells:
+            cell.conflict_index = self.conflict_index
+        # Depth of nested bulk_values blocks
+        self._bulk = 0
+        # Optional CellGeometry for the cell size the board paints with
+        self.geometry: CellGeometry | None = None
 
-        self.initial_state = copy.deepcopy(self.cells)
-        self.board_copy = copy.deepcopy(self.cells)
+        # Givens, only the values of these cells are used
+        self.initial_state = [Cell(self, i) for i in range(size ** 2)]
 
         self.solve_board = True
 
@@ -378,8 +366,8 @@ class Sudoku:
         self.cell_components = BoundList()
         self.region_components = BoundList()
         self.outside_components = BoundList()
-
-        self.brute_force_time = 60
+        # Components by the cells, edges, corners and outside places they occupy
+        self.hit_index = HitIndex()
 
         for kw, value in kwargs.items():
             if kw in self.constraints:
@@ -398,8 +386,8 @@ class Sudoku:
             return self.to_string() == other.to_string()
         return NotImplemented
 
-    def to_string(self) -> str:
-        return ''.join([str(c.value) for c in self.cells])
+    def to_string(self, blank: str = "0") -> str:
+        return to_line([cell.value for cell in self.cells], blank, Constants.EMPTY)
 
     def to_table(self) -> List[List[int]]:
         return [self.values(self.get_row(i)) for i in range(9)]
@@ -408,14 +396,60 @@ class Sudoku:
     def from_string(cls, board_str: str):
         """
 
-        :param board_str: A string containing information about values of cells
+        :param board_str: 81 digits, "." or "0" for empty cells, whitespace is ignored
         :return: Sudoku where cell i holds the value of the string at index i
         """
         new_sudoku = cls()
-        for i, value in enumerate(board_str):
-            new_sudoku.cells[i].value = int(value) if value != "0" else Constants.EMPTY
+        with new_sudoku.bulk_values():
+            for cell, value in zip(new_sudoku.cells, parse_grid(board_str, Constants.EMPTY)):
+                cell.value = value
         return new_sudoku
 
+    def snapshot(self, colors: bool = True) -> bytes:
+        """
+        Captures values, pencil marks and (optionally) colors of all cells as one blob, which
+        is a lot cheaper than a deep copy of the cells (those reference the whole Sudoku).
+
+        :param colors: Include the cell colors
+        :return: Blob for restore
+        """
+        slots = None
+        if colors:
+            slots = []
+            for cell in self.cells:
+                rgba = [color.rgba() for color in cell.colors]
+                slots.extend(rgba + [0] * (COLOR_SLOTS - len(rgba)))
+
+        return pack(
+            (cell.value for cell in self.cells),
+            (to_mask(cell.valid_numbers) for cell in self.cells),
+            (to_mask(cell.corner) for cell in self.cells),
+            slots, Constants.EMPTY
+        )
+
+    def restore(self, blob: bytes):
+        """
+        Puts the cells back into the state of a snapshot. The cell objects stay the same, so
+        references to them (selection, components) remain valid.
+
+        :param blob: Written by snapshot, colors are left alone if it has none
+        """
+        values, candidates, corners, colors = unpack(blob, Constants.EMPTY)
+
+        with self.bulk_values():
+            for cell, value in zip(self.cells, values):
+                cell.value = value
+
+        for i, cell in enumerate(self.cells):
+            cell.valid_numbers[:] = MASK_DIGITS[candidates[i]]
+            cell.corner[:] = MASK_DIGITS[corners[i]]
+
+            if colors is not None:
+                cell.colors[:] = [
+                    QColor.fromRgba(rgba)
+                    for rgba in colors[i * COLOR_SLOTS:(i + 1) * COLOR_SLOTS] if rgba
+                ]
+
     @classmethod
     def blank(cls, size: int = 9):
         """
@@ -636,47 +670,36 @@ class Sudoku:
         """
         return [cell.value for cell in cells]
 
-    def solve_in_thread(self, solver: QObject, random_pick: bool = False) -> bool:
+    def solve(self, random_pick: bool = False, job: Job = None, rng: random.Random = None,
+              cache: SolutionCache = None):
         """
-        Solve the sudoku using a thread to get updates for the GUI
+        Solve the Sudoku via backtracking.
 
-        :param solver: QObject that is connected to a thread and sends updates to the Application
         :param random_pick: Should a number be tested at random or in order
+        :param job: Limits the time of the search and allows cancelling it
+        :param rng: Source of the random order, pass a seeded one for reproducible runs
+        :param cache: Asked first for puzzles without components (and not for random picks)
         :return: If Sudoku is solved
         """
-        if self.brute_force_time == 0:
-            return False
+        with self.bulk_values():
+            return self._solve(random_pick, job, rng, cache)
 
-        self.calculate_valid_numbers()
-        cell = self.get_empty()
+    def _solve(self, random_pick: bool, job: Job | None, rng: random.Random | None,
+               cache: SolutionCache = None) -> bool:
+        if cache is not None and not random_pick and self.cacheable:
+            try:
+                solution = cache.solve(self.values(self.cells), self.constraints, job).solution
+            except JobStopped:
+                return False
 
-        solver.progressChanged.emit()
-        time.sleep(1 / solver.speed)
+            if solution is None:
+                return False
 
-        if cell is None:
+            for cell, value in zip(self.cells, solution):
+                cell.value = value
             return True
 
-        numbers = cell.valid_numbers
-        if random_pick:
-            random.shuffle(numbers)
-
-        for number in numbers:
-            cell.value = number
-
-            if self.solve_in_thread(solver, random_pick):
-                return True
-
-            cell.value = Constants.EMPTY
-        return False
-
-    def solve(self, random_pick: bool = False):
-        """
-        Solve the Sudoku via backtracking.
-
-        :param random_pick: Should a number be tested at random or in order
-        :return: If Sudoku is solved
-        """
-        if self.brute_force_time == 0:
+        if job is not None and not job.tick():
             return False
 
         self.calculate_valid_numbers()
@@ -687,12 +710,13 @@ class Sudoku:
 
         numbers = cell.valid_numbers
         if random_pick:
-            random.shuffle(numbers)
+            rng = rng if rng is not None else random.Random()
+            rng.shuffle(numbers)
 
         for number in numbers:
             cell.value = number
 
-            if self.solve(random_pick):
+            if self._solve(random_pick, job, rng):
                 return True
 
             cell.value = Constants.EMPTY
@@ -768,7 +792,7 @@ class Sudoku:
                 return False
 
         for cell_cmp in self.cell_components:
-            if index != cell_cmp.hovered_cell:
+            if index != cell_cmp.index:
                 continue
 
             if not cell_cmp.valid(index, number):
@@ -819,20 +843,20 @@ class Sudoku:
             "nonconsecutive": self.nonconsecutive
         }
 
-    def start_process(self):
-        thread = StoppableThread(target=self.brute_force_countdown)
-        thread.start()
+    @property
+    def cacheable(self) -> bool:
+        """
 
-    def brute_force_countdown(self):
-        while self.brute_force_time > 0:
-            self.brute_force_time -= 1
-            time.sleep(1)
+        :return: If the solution of the Sudoku can be stored in a SolutionCache
+        """
+        return next(iter(self.board_constraints), None) is None and cacheable(self.constraints)
 
-    def to_file(self):
-        import json
-        filename, ext = QFileDialog.getSaveFileName(dir=os.getcwd() + "/puzzles", filter="(*.json)")
+    def to_json(self) -> Dict:
+        """
 
-        data = {
+        :return: The Sudoku in the format to_file writes, a snapshot that can be saved elsewhere
+        """
+        return {
 
             "digits": ''.join(str(cell.value) for cell in self.cells),
             "constraints": {
@@ -857,28 +881,39 @@ class Sudoku:
 
         }
 
+    def to_file(self):
+        import json
+        filename, ext = QFileDialog.getSaveFileName(dir=os.getcwd() + "/puzzles", filter="(*.json)")
+
         with open(filename, "w") as file:
-            json.dump(data, file, indent=2)
+            json.dump(self.to_json(), file, indent=2)
 
     def from_file(self, file_path: str = None):
         import json
 
-        from alt.constraints import border_components, cell_components, outside_components, \
-            line_components, region_components
-
         if file_path is None:
             path, extension = QFileDialog.getOpenFileName(dir=os.getcwd(), filter="(*.json)")
         else:
             path = file_path
 
+        with open(path, "r") as file:
+            self.load_json(json.load(file))
+
+    def load_json(self, data: Dict):
+        """
+
+        :param data: Dictionary in the format to_json returns, replaces digits and components
+        """
+        from alt.constraints import border_components, cell_components, outside_components, \
+            line_components, region_components
+
         self.lines_components.clear()
         self.border_components.clear()
         self.cell_components.clear()
         self.region_components.clear()
         self.outside_components.clear()
 
-        with open(path, "r") as file:
-            data = json.load(file)
+        with self.bulk_values():
             for i in range(81):
                 self.initial_state[i].value = int(data["digits"][i])
                 self.cells[i].value = int(data["digits"][i])
@@ -886,112 +921,166 @@ class Sudoku:
                 self.cells[i].corner = BoundList(max_length=4, sort_=True)
                 self.cells[i].colors = BoundList(max_length=4, sort_=True)
 
-            for key, val in data["constraints"].items():
-                setattr(self, key, val)
+        for key, val in data["constraints"].items():
+            setattr(self, key, val)
+
+        for item in data["components"]["border"]:
+            match item["type"]:
 
-            for item in data["components"]["border"]:
-                match item["type"]:
+                case "XVSum":
+                    obj = border_components.XVSum(self, item["indices"], item["total"])
 
-                    case "XVSum":
-                        obj = border_components.XVSum(self, item["indices"], item["total"])
+                case "Difference":
+                    obj = border_components.Difference(self, item["indices"],
+                                                       item["difference"])
 
-                    case "Difference":
-                        obj = border_components.Difference(self, item["indices"],
-                                                           item["difference"])
+                case "Ratio":
+                    obj = border_components.Ratio(self, item["indices"], item["ratio"])
 
-                    case "Ratio":
-                        obj = border_components.Ratio(self, item["indices"], item["ratio"])
+                case "Quadruple":
+                    obj = border_components.Quadruple(self, item["indices"],
+                                                      BoundList(max_length=4))
+                    for val in item["numbers"]:
+                        obj.numbers.append(val)
 
-                    case "Quadruple":
-                        obj = border_components.Quadruple(self, item["indices"],
-                                                          BoundList(max_length=4))
-                        for val in item["numbers"]:
-                            obj.numbers.append(val)
+                case "LessGreater":
+                    obj = border_components.LessGreater(self, item["indices"], item["less"])
 
-                    case "LessGreater":
-                        obj = border_components.LessGreater(self, item["indices"], item["less"])
+            self.border_components.append(obj)
 
-                self.border_components.append(obj)
+        for item in data["components"]["cells"]:
+            match item["type"]:
 
-            for item in data["components"]["cells"]:
-                match item["type"]:
+                case "EvenDigit":
+                    obj = cell_components.EvenDigit(self, item["index"])
+                    self.cell_components.append(obj)
 
-                    case "EvenDigit":
-                        obj = cell_components.EvenDigit(self, item["index"])
-                        self.cell_components.append(obj)
+                case "OddDigit":
+                    obj = cell_components.OddDigit(self, item["index"])
+                    self.cell_components.append(obj)
 
-                    case "OddDigit":
-                        obj = cell_components.OddDigit(self, item["index"])
-                        self.cell_components.append(obj)
+        for item in data["components"]["lines"]:
+            match item["type"]:
 
-            for item in data["components"]["lines"]:
-                match item["type"]:
+                case "Arrow":
+                    obj = line_components.Arrow(self, BoundList())
+                    obj.setup(item["index"])
 
-                    case "Arrow":
-                        obj = line_components.Arrow(self, BoundList())
-                        obj.setup(item["index"])
+                    for branch in item["branches"]:
+                        obj.branches.append([self.cells[ix] for ix in branch])
 
-                        for branch in item["branches"]:
-                            obj.branches.append([self.cells[ix] for ix in branch])
+                    self.lines_components.append(obj)
 
-                        self.lines_components.append(obj)
+                case "Thermometer":
+                    obj = line_components.Thermometer(self, BoundList())
+                    obj.setup(item["index"])
 
-                    case "Thermometer":
-                        obj = line_components.Thermometer(self, BoundList())
-                        obj.setup(item["index"])
+                    for branch in item["branches"]:
+                        obj.branches.append([self.cells[ix] for ix in branch])
 
-                        for branch in item["branches"]:
-                            obj.branches.append([self.cells[ix] for ix in branch])
+                    self.lines_components.append(obj)
 
-                        self.lines_components.append(obj)
+                case "LockoutLine":
+                    obj = line_components.LockoutLine(self, BoundList())
+                    obj.setup(item["index"])
 
-                    case "LockoutLine":
-                        obj = line_components.LockoutLine(self, BoundList())
-                        obj.setup(item["index"])
+                    for branch in item["branches"]:
+                        obj.branches.append([self.cells[ix] for ix in branch])
 
-                        for branch in item["branches"]:
-                            obj.branches.append([self.cells[ix] for ix in branch])
+                    self.lines_components.append(obj)
 
-                        self.lines_components.append(obj)
+                case "BetweenLine":
+                    obj = line_components.BetweenLine(self, BoundList())
+                    obj.setup(item["index"])
 
-                    case "BetweenLine":
-                        obj = line_components.BetweenLine(self, BoundList())
-                        obj.setup(item["index"])
+                    for branch in item["branches"]:
+                        obj.branches.append([self.cells[ix] for ix in branch])
 
-                        for branch in item["branches"]:
-                            obj.branches.append([self.cells[ix] for ix in branch])
+                    self.lines_components.append(obj)
 
-                        self.lines_components.append(obj)
+                case "PalindromeLine":
+                    obj = line_components.PalindromeLine(self, BoundList(item["indices"]))
+                    self.lines_components.append(obj)
 
-                    case "PalindromeLine":
-                        obj = line_components.PalindromeLine(self, BoundList(item["indices"]))
-                        self.lines_components.append(obj)
+                case "GermanWhispersLine":
+                    obj = line_components.GermanWhispersLine(self, BoundList(item["indices"]))
+                    self.lines_components.append(obj)
 
-                    case "GermanWhispersLine":
-                        obj = line_components.GermanWhispersLine(self, BoundList(item["indices"]))
-                        self.lines_components.append(obj)
+        for item in data["components"]["outside"]:
+            match item["type"]:
+                case "Sandwich":
+                    obj = outside_components.Sandwich(self, item["col"], item["row"],
+                                                      item["total"])
+                    self.outside_components.append(obj)
 
-            for item in data["components"]["outside"]:
-                match item["type"]:
-                    case "Sandwich":
-                        obj = outside_components.Sandwich(self, item["col"], item["row"],
-                                                          item["total"])
-                        self.outside_components.append(obj)
+                case "XSumsClue":
+                    obj = outside_components.XSumsClue(self, item["col"], item["row"],
+                                                       item["total"])
+                    self.outside_components.append(obj)
 
-                    case "XSumsClue":
-                        obj = outside_components.XSumsClue(self, item["col"], item["row"],
-                                                           item["total"])
-                        self.outside_components.append(obj)
+                case "LittleKiller":
+                    obj = outside_components.LittleKiller(self, item["col"], item["row"],
+                                                          item["total"], item["direction"])
+                    self.outside_components.append(obj)
 
-                    case "LittleKiller":
-                        obj = outside_components.LittleKiller(self, item["col"], item["row"],
-                                                              item["total"], item["direction"])
-                        self.outside_components.append(obj)
+        for item in data["components"]["regions"]:
+            match item["type"]:
+                case "Cage":
+                    self.region_components.append(region_components.Cage.from_json(self, item))
 
-            for item in data["components"]["regions"]:
-                match item["type"]:
-                    case "Cage":
-                        self.region_components.append(region_components.Cage.from_json(self, item))
+        self.hit_index.rebuild(self.board_constraints)
+        self.refresh_rules()
+
+    def add_component(self, components: BoundList, component):
+        """
+        Appends a component to one of the component lists and the hit index. Like
+        BoundList.append an equal component that is already in the list is removed instead.
+        """
+        existing = next((other for other in components if other == component), None)
+        components.append(component)
+
+        if existing is not None:
+            self.hit_index.remove(existing)
+        else:
+            self.hit_index.add(component)
+
+    def remove_component(self, components: BoundList, component):
+        """Removes the component that is equal to component, if there is one"""
+        existing = next((other for other in components if other == component), None)
+        if existing is not None:
+            components.remove(existing)
+            self.hit_index.remove(existing)
+
+    @contextmanager
+    def bulk_values(self):
+        """
+        Values written inside the block are not reported to the conflict index one by one, it
+        is rebuilt once at the end. For searches and loads that write many values.
+        """
+        self._bulk += 1
+        if self._bulk == 1:
+            for cell in self.cells:
+                cell.conflict_index = None
+        try:
+            yield
+        finally:
+            self._bulk -= 1
+            if not self._bulk:
+                for cell in self.cells:
+                    cell.conflict_index = self.conflict_index
+                self.conflict_index.reset(cell.value for cell in self.cells)
+
+    def refresh_rules(self):
+        """
+        Hands the current components and constraints to the conflict index, has to be called
+        after they changed. Editing digits does not need it.
+        """
+        try:
+            rules = Puzzle.from_json(self.to_json()).rules
+        except ValueError:
+            # Unknown component type, conflicts are only checked against the constraints
+            rules = ()
+        self.conflict_index.set_rules(rules, **self.constraints)
 
     def look_for_pairs(self, cells: List[Cell]):
         nothing_found = False
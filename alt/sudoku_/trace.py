@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import json
+import struct
+from array import array
+from typing import Iterable, Iterator, List, Tuple
+
+from alt.sudoku_.mask_solver import ALL, EMPTY, bit
+
+ASSIGN = 1
+ELIMINATE = 2
+BACKTRACK = 3
+
+KINDS = {ASSIGN: "assign", ELIMINATE: "eliminate", BACKTRACK: "backtrack"}
+
+SEARCH = "search"
+
+# kind, cell index, digit, reason (index into Trace.reasons)
+EVENT = struct.Struct("<BBBB")
+
+# Events between two keyframes
+KEYFRAME_INTERVAL = 256
+
+MAGIC = b"SDKT"
+VERSION = 1
+# magic, version, keyframe interval, length of the reason table, number of events
+HEADER = struct.Struct("<4sBHHQ")
+
+
+class Trace:
+    """
+    Event log of a solve: assignments, eliminations (with the technique or constraint behind
+    them) and backtracks, 4 bytes per event. Every KEYFRAME_INTERVAL events the state (values and
+    candidate masks) is kept as a keyframe, so a Replay can jump to any event by applying at most
+    one interval of events.
+
+    The methods placed and removed make a trace usable as observer of a MaskSolver.
+    """
+
+    def __init__(self, grid: Iterable[int], keyframe_interval: int = KEYFRAME_INTERVAL):
+        """
+
+        :param grid: The grid before the first event, EMPTY for empty cells
+        """
+        self.start = bytes(grid)
+        self.keyframe_interval = keyframe_interval
+
+        self.events = bytearray()
+        self.reasons: List[str] = []
+        self._reason_ids = {}
+
+        self.values = bytearray(self.start)
+        self.masks = array("H", (bit(value) if value else ALL for value in self.start))
+
+        self.keyframes: List[bytes] = [self.state()]
+
+    def __len__(self):
+        return len(self.events) // EVENT.size
+
+    def __iter__(self) -> Iterator[Tuple[str, int, int, str]]:
+        for position in range(len(self)):
+            yield self.event(position)
+
+    def state(self) -> bytes:
+        """
+
+        :return: The current values (81 bytes) and candidate masks (81 unsigned shorts)
+        """
+        return bytes(self.values) + self.masks.tobytes()
+
+    def reason(self, name: str) -> int:
+        if name not in self._reason_ids:
+            if len(self.reasons) == 256:
+                raise ValueError("A trace can hold at most 256 different reasons")
+            self._reason_ids[name] = len(self.reasons)
+            self.reasons.append(name)
+        return self._reason_ids[name]
+
+    def _record(self, kind: int, index: int, number: int, reason: str):
+        self.events += EVENT.pack(kind, index, number, self.reason(reason))
+        if not len(self) % self.keyframe_interval:
+            self.keyframes.append(self.state())
+
+    def assign(self, index: int, number: int, reason: str = SEARCH):
+        self.values[index] = number
+        self._record(ASSIGN, index, number, reason)
+
+    def eliminate(self, index: int, number: int, reason: str):
+        self.masks[index] &= ~bit(number)
+        self._record(ELIMINATE, index, number, reason)
+
+    def backtrack(self, index: int, reason: str = SEARCH):
+        """Takes the digit of the cell back, the event keeps the digit so it can be explained"""
+        number = self.values[index]
+        self.values[index] = EMPTY
+        self._record(BACKTRACK, index, number, reason)
+
+    def placed(self, index: int, number: int):
+        self.assign(index, number)
+
+    def removed(self, index: int):
+        self.backtrack(index)
+
+    def event(self, position: int) -> Tuple[str, int, int, str]:
+        """
+
+        :return: Kind, cell index, digit and reason of an event
+        """
+        kind, index, number, reason = EVENT.unpack_from(self.events, position * EVENT.size)
+        return KINDS[kind], index, number, self.reasons[reason]
+
+    def count(self) -> dict:
+        """
+
+        :return: Number of events per kind and reason, e.g. {"eliminate": {"row": 12, ...}}
+        """
+        counts = {name: {} for name in KINDS.values()}
+        for kind, _, _, reason in self:
+            counts[kind][reason] = counts[kind].get(reason, 0) + 1
+        return counts
+
+    def to_bytes(self) -> bytes:
+        """Keyframes are not stored, they are rebuilt while loading"""
+        reasons = json.dumps(self.reasons).encode()
+        return (
+            HEADER.pack(MAGIC, VERSION, self.keyframe_interval, len(reasons), len(self))
+            + self.start + reasons + bytes(self.events)
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Trace:
+        magic, version, interval, reasons_size, length = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a solve trace")
+
+        offset = HEADER.size
+        trace = cls(data[offset:offset + 81], interval)
+        offset += 81
+
+        reasons = json.loads(data[offset:offset + reasons_size])
+        offset += reasons_size
+
+        replay = {ASSIGN: trace.assign, ELIMINATE: trace.eliminate}
+        for position in range(length):
+            kind, index, number, reason = EVENT.unpack_from(data, offset + position * EVENT.size)
+            if kind == BACKTRACK:
+                trace.backtrack(index, reasons[reason])
+            else:
+                replay[kind](index, number, reasons[reason])
+        return trace
+
+    def save(self, path: str):
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> Trace:
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+
+class Replay:
+    """
+    Plays a trace back at any speed and in both directions. Seeking starts from the closest
+    keyframe, so scrubbing through a long solve never replays it from the beginning. The trace
+    may still grow while a replay runs, the replay stops at the last recorded event.
+    """
+
+    def __init__(self, trace: Trace, end: int = None):
+        """
+
+        :param end: Stop after this event, e.g. SearchObserver.solved_at to skip the unwinding
+        """
+        self.trace = trace
+        self.end = end
+
+        self.position = 0
+        self.values = bytearray(trace.start)
+        self.masks = array("H")
+        self._load(trace.keyframes[0])
+
+    def __len__(self):
+        recorded = len(self.trace)
+        return min(recorded, self.end) if self.end is not None else recorded
+
+    @property
+    def at_end(self) -> bool:
+        return self.position >= len(self)
+
+    def _load(self, keyframe: bytes):
+        self.values[:] = keyframe[:81]
+        self.masks = array("H")
+        self.masks.frombytes(keyframe[81:])
+
+    def advance(self, steps: int = 1) -> int:
+        """
+
+        :return: Number of events actually applied
+        """
+        end = min(self.position + steps, len(self))
+        events, values, masks = self.trace.events, self.values, self.masks
+
+        for position in range(self.position, end):
+            kind, index, number, _ = EVENT.unpack_from(events, position * EVENT.size)
+            if kind == ASSIGN:
+                values[index] = number
+            elif kind == BACKTRACK:
+                values[index] = EMPTY
+            else:
+                masks[index] &= ~bit(number)
+
+        taken = end - self.position
+        self.position = end
+        return taken
+
+    def next_value(self) -> Tuple[str, int, int, str] | None:
+        """
+        Applies the eliminations up to and including the next assignment or backtrack.
+
+        :return: That event, None if the replay ended before one
+        """
+        while not self.at_end:
+            event = self.trace.event(self.position)
+            self.advance()
+            if event[0] != KINDS[ELIMINATE]:
+                return event
+        return None
+
+    def seek(self, position: int):
+        """Moves to the state after position events"""
+        position = max(0, min(position, len(self)))
+        interval = self.trace.keyframe_interval
+
+        if position < self.position or position - self.position > interval:
+            # A trace that is still recorded may be a moment ahead of its keyframes
+            keyframe = min(position // interval, len(self.trace.keyframes) - 1)
+            self._load(self.trace.keyframes[keyframe])
+            self.position = keyframe * interval
+
+        self.advance(position - self.position)
+
+    def back(self, steps: int = 1):
+        self.seek(self.position - steps)
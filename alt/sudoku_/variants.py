@@ -0,0 +1,781 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from alt.sudoku_.mask_solver import MaskSolver, ALL, DIGITS, POPCOUNT, EMPTY, bit
+
+EVEN = 0xAA  # 2, 4, 6, 8
+ODD = 0x155  # 1, 3, 5, 7, 9
+
+
+def digit_range(low: int, high: int) -> int:
+    """
+
+    :return: Bitmask of all digits from low to high (both included), clamped to 1 - 9
+    """
+    low, high = max(low, 1), min(high, 9)
+    if low > high:
+        return 0
+    return ((1 << high) - 1) & ~((1 << (low - 1)) - 1)
+
+
+def orthogonal(index: int) -> List[int]:
+    row, column = index // 9, index % 9
+    return [
+        (row + r) * 9 + column + c for r, c in ((-1, 0), (0, -1), (0, 1), (1, 0))
+        if 0 <= row + r <= 8 and 0 <= column + c <= 8
+    ]
+
+
+def diagonal(index: int) -> List[int]:
+    row, column = index // 9, index % 9
+    return [
+        (row + r) * 9 + column + c for r, c in ((-1, -1), (-1, 1), (1, -1), (1, 1))
+        if 0 <= row + r <= 8 and 0 <= column + c <= 8
+    ]
+
+
+def knight(index: int) -> List[int]:
+    row, column = index // 9, index % 9
+    return [
+        (row + r) * 9 + column + c
+        for r, c in ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+        if 0 <= row + r <= 8 and 0 <= column + c <= 8
+    ]
+
+
+ORTHOGONAL = [orthogonal(index) for index in range(81)]
+NEIGHBOURS = [sorted(orthogonal(index) + diagonal(index)) for index in range(81)]
+
+# Digits that are consecutive to a digit (index 0 is unused)
+CONSECUTIVE = [0] + [digit_range(d - 1, d - 1) | digit_range(d + 1, d + 1) for d in range(1, 10)]
+
+
+@lru_cache(maxsize=None)
+def cage_digits(free: int, total: int, size: int) -> int:
+    """
+
+    :param free: Bitmask of the digits not used by the cage yet
+    :param total: Sum the empty cells of the cage still have to reach
+    :param size: Number of empty cells in the cage
+    :return: Bitmask of the digits that appear in some combination of size free digits
+    """
+    if size == 0:
+        return ALL if total == 0 else 0
+
+    mask = 0
+    for number in DIGITS[free]:
+        if number > total:
+            break
+
+        # Combinations are built in increasing order, so each one is only found once
+        rest = cage_digits(free & ~((bit(number) << 1) - 1), total - number, size - 1)
+        if rest:
+            mask |= bit(number) | (rest if size > 1 else 0)
+    return mask
+
+
+class Rule:
+    """
+    Solver side counterpart of a component. Rules only know indices and numbers, so they can be
+    used without any of the painting code.
+    """
+
+    NAME = "Rule"
+    CATEGORY = None
+
+    def __init__(self, indices: Iterable[int]):
+        self.indices = list(indices)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.indices})"
+
+    def consistent(self, values: List[int]) -> bool:
+        """
+
+        :param values: Values of all 81 cells, 0 for empty cells
+        :return: False if the filled cells already break the rule
+        """
+        return True
+
+    def allowed(self, values: List[int], index: int) -> int:
+        """
+        Fallback that tries every digit, subclasses replace this with something cheaper.
+
+        :param values: Values of all 81 cells, 0 for empty cells
+        :param index: Index of an empty cell covered by the rule
+        :return: Bitmask of digits that can be placed in the cell without breaking the rule
+        """
+        mask = 0
+        for number in range(1, 10):
+            values[index] = number
+            if self.consistent(values):
+                mask |= bit(number)
+        values[index] = EMPTY
+        return mask
+
+    def to_json(self) -> Dict:
+        """Entry of the rule in a sudoku file, rules with more than their cells extend it"""
+        return {
+            "type": self.NAME,
+            "indices": self.indices
+        }
+
+
+class CageRule(Rule):
+    NAME = "Killer Cage"
+    CATEGORY = "regions"
+
+    def __init__(self, indices: Iterable[int], total: int = None):
+        super().__init__(indices)
+        self.total = total
+
+    def allowed(self, values: List[int], index: int) -> int:
+        used, filled, empties = 0, 0, 0
+        for i in self.indices:
+            if value := values[i]:
+                used |= bit(value)
+                filled += value
+            else:
+                empties += 1
+
+        free = ALL & ~used
+        if self.total is None:
+            return free
+
+        return cage_digits(free, self.total - filled, empties)
+
+    def to_json(self) -> Dict:
+        return {
+            "type": "Cage",
+            "indices": self.indices,
+            "total": self.total
+        }
+
+
+class ThermometerRule(Rule):
+    NAME = "Thermometer"
+    CATEGORY = "lines"
+
+    def __init__(self, bulb: int, branches: List[List[int]]):
+        super().__init__([bulb] + [index for branch in branches for index in branch])
+
+        self.bulb = bulb
+        self.branches = branches
+        self.paths = [[bulb] + branch for branch in branches]
+
+    def allowed(self, values: List[int], index: int) -> int:
+        mask = ALL
+        for path in self.paths:
+            if index not in path:
+                continue
+
+            position, length = path.index(index), len(path)
+            low, high = position + 1, 9 - (length - 1 - position)
+
+            for other, i in enumerate(path):
+                if not (value := values[i]):
+                    continue
+                if other < position:
+                    low = max(low, value + position - other)
+                elif other > position:
+                    high = min(high, value - (other - position))
+
+            mask &= digit_range(low, high)
+        return mask
+
+    def to_json(self) -> Dict:
+        return {
+            "type": "Thermometer",
+            "index": self.bulb,
+            "branches": self.branches
+        }
+
+
+class ArrowRule(Rule):
+    NAME = "Arrow"
+    CATEGORY = "lines"
+
+    def __init__(self, bulb: int, branches: List[List[int]]):
+        super().__init__([bulb] + [index for branch in branches for index in branch])
+
+        self.bulb = bulb
+        self.branches = branches
+
+    def allowed(self, values: List[int], index: int) -> int:
+        mask = ALL
+
+        if index == self.bulb:
+            for branch in self.branches:
+                filled = sum(values[i] for i in branch)
+                empties = sum(1 for i in branch if not values[i])
+                mask &= digit_range(filled + empties, filled + 9 * empties)
+            return mask
+
+        target = values[self.bulb]
+        for branch in self.branches:
+            if index not in branch:
+                continue
+
+            filled = sum(values[i] for i in branch)
+            empties = sum(1 for i in branch if not values[i]) - 1
+
+            if target:
+                mask &= digit_range(target - filled - 9 * empties, target - filled - empties)
+            else:
+                mask &= digit_range(1, 9 - filled - empties)
+        return mask
+
+    def to_json(self) -> Dict:
+        return {
+            "type": "Arrow",
+            "index": self.bulb,
+            "branches": self.branches
+        }
+
+
+class PalindromeRule(Rule):
+    NAME = "PalindromeLine"
+    CATEGORY = "lines"
+
+    def __init__(self, indices: Iterable[int]):
+        super().__init__(indices)
+        self.mirror = dict(zip(self.indices, reversed(self.indices)))
+
+    def allowed(self, values: List[int], index: int) -> int:
+        value = values[self.mirror[index]]
+        return bit(value) if value and self.mirror[index] != index else ALL
+
+
+class GermanWhispersRule(Rule):
+    NAME = "GermanWhispersLine"
+    CATEGORY = "lines"
+
+    # FAR[v] holds the digits that differ from v by at least 5
+    FAR = [ALL & ~bit(5)] + [
+        digit_range(1, v - 5) | digit_range(v + 5, 9) for v in range(1, 10)
+    ]
+
+    def __init__(self, indices: Iterable[int]):
+        super().__init__(indices)
+
+        self.adjacent = {index: [] for index in self.indices}
+        for first, second in zip(self.indices, self.indices[1:]):
+            self.adjacent[first].append(second)
+            self.adjacent[second].append(first)
+
+    def allowed(self, values: List[int], index: int) -> int:
+        mask = self.FAR[0]
+        for other in self.adjacent[index]:
+            mask &= self.FAR[values[other]]
+        return mask
+
+
+class CircleLineRule(Rule):
+    """Base of the lines with a circle at the start and at the end of every branch"""
+
+    CATEGORY = "lines"
+
+    def __init__(self, bulb: int, branches: List[List[int]]):
+        super().__init__([bulb] + [index for branch in branches for index in branch])
+
+        self.bulb = bulb
+        self.branches = branches
+
+    def consistent(self, values: List[int]) -> bool:
+        first = values[self.bulb]
+        for branch in self.branches:
+            last = values[branch[-1]]
+            if first and last and not self.fits(first, last, [values[i] for i in branch[:-1]]):
+                return False
+        return True
+
+    def fits(self, first: int, last: int, middle: List[int]) -> bool:
+        """
+
+        :return: True if the filled cells between the circles agree with the circles
+        """
+        return True
+
+    def to_json(self) -> Dict:
+        return {
+            "type": self.NAME,
+            "index": self.bulb,
+            "branches": self.branches
+        }
+
+
+class BetweenRule(CircleLineRule):
+    """Digits on the line lie strictly between the digits in the circles"""
+
+    NAME = "BetweenLine"
+
+    def fits(self, first: int, last: int, middle: List[int]) -> bool:
+        low, high = sorted((first, last))
+        return (high - low >= 2 or not middle) and all(low < v < high for v in middle if v)
+
+
+class LockoutRule(CircleLineRule):
+    """Circles differ by at least 4, digits on the line lie outside the range of the circles"""
+
+    NAME = "LockoutLine"
+
+    def fits(self, first: int, last: int, middle: List[int]) -> bool:
+        low, high = sorted((first, last))
+        return high - low >= 4 and not any(low <= v <= high for v in middle if v)
+
+
+class PairRule(Rule):
+    """A rule between the two cells on either side of a border"""
+
+    CATEGORY = "border"
+
+    def __init__(self, indices: Iterable[int]):
+        super().__init__(indices)
+
+        # matches[v] holds the digits allowed next to v, matches[0] the digits allowed at all
+        self.matches = [ALL] * 10
+
+    def allowed(self, values: List[int], index: int) -> int:
+        other = self.indices[1] if self.indices[0] == index else self.indices[0]
+        return self.matches[values[other]]
+
+
+class DifferenceRule(PairRule):
+    NAME = "Difference"
+
+    def __init__(self, indices: Iterable[int], difference: int = 1):
+        super().__init__(indices)
+        self.difference = difference
+
+        self.matches = [
+            digit_range(1, 9 - difference) | digit_range(1 + difference, 9)
+        ] + [
+            digit_range(v - difference, v - difference) | digit_range(v + difference, v + difference)
+            for v in range(1, 10)
+        ]
+
+    def to_json(self) -> Dict:
+        return {
+            "type": "Difference",
+            "indices": self.indices,
+            "difference": self.difference
+        }
+
+
+class RatioRule(PairRule):
+    NAME = "Ratio"
+
+    def __init__(self, indices: Iterable[int], ratio: int = 2):
+        super().__init__(indices)
+        self.ratio = ratio
+
+        def partners(v: int) -> int:
+            mask = digit_range(v * ratio, v * ratio)
+            if v % ratio == 0:
+                mask |= bit(v // ratio)
+            return mask
+
+        self.matches = [0] + [partners(v) for v in range(1, 10)]
+        for v in range(1, 10):
+            if self.matches[v]:
+                self.matches[0] |= bit(v)
+
+    def to_json(self) -> Dict:
+        return {
+            "type": "Ratio",
+            "indices": self.indices,
+            "ratio": self.ratio
+        }
+
+
+class XVRule(PairRule):
+    NAME = "XV Sum"
+
+    def __init__(self, indices: Iterable[int], total: int = 5):
+        super().__init__(indices)
+        self.total = total
+
+        self.matches = [0] + [
+            bit(total - v) if 1 <= total - v <= 9 and total - v != v else 0 for v in range(1, 10)
+        ]
+        for v in range(1, 10):
+            if self.matches[v]:
+                self.matches[0] |= bit(v)
+
+    def to_json(self) -> Dict:
+        return {
+            "type": "XVSum",
+            "indices": self.indices,
+            "total": self.total
+        }
+
+
+class LessGreaterRule(Rule):
+    NAME = "Less or Greater"
+    CATEGORY = "border"
+
+    def __init__(self, indices: Iterable[int], less: bool = True):
+        super().__init__(indices)
+        self.less = less
+
+    def allowed(self, values: List[int], index: int) -> int:
+        smaller = self.indices[0] if self.less else self.indices[1]
+        other = self.indices[1] if self.indices[0] == index else self.indices[0]
+        value = values[other]
+
+        if index == smaller:
+            return digit_range(1, value - 1 if value else 8)
+        return digit_range(value + 1 if value else 2, 9)
+
+    def to_json(self) -> Dict:
+        return {
+            "type": "LessGreater",
+            "indices": self.indices,
+            "less": self.less
+        }
+
+
+class QuadrupleRule(Rule):
+    """The numbers of the circle appear in the four cells around it"""
+
+    NAME = "Quadruple"
+    CATEGORY = "border"
+
+    def __init__(self, indices: Iterable[int], numbers: Iterable[int]):
+        super().__init__(indices)
+        self.numbers = list(numbers)
+
+    def allowed(self, values: List[int], index: int) -> int:
+        present = [values[i] for i in self.indices]
+        missing = [n for n in self.numbers if n not in present]
+        empties = present.count(EMPTY)
+
+        if len(missing) > empties:
+            return 0
+        if len(missing) == empties:
+            return sum(bit(n) for n in missing)
+        return ALL
+
+    def to_json(self) -> Dict:
+        return {
+            "type": self.NAME,
+            "indices": self.indices,
+            "numbers": self.numbers
+        }
+
+
+class ParityRule(Rule):
+    CATEGORY = "cells"
+
+    MASK = ALL
+
+    def __init__(self, index: int):
+        super().__init__([index])
+        self.index = index
+
+    def allowed(self, values: List[int], index: int) -> int:
+        return self.MASK
+
+    def to_json(self) -> Dict:
+        return {
+            "type": self.NAME,
+            "index": self.index
+        }
+
+
+class EvenRule(ParityRule):
+    NAME = "EvenDigit"
+    MASK = EVEN
+
+
+class OddRule(ParityRule):
+    NAME = "OddDigit"
+    MASK = ODD
+
+
+def outside_line(col: int, row: int) -> List[int]:
+    """
+
+    :return: Row or column next to an outside clue, ordered as seen from the clue
+    """
+    if col in (0, 10):
+        indices = list(range((row - 1) * 9, row * 9))
+    else:
+        indices = list(range((col - 1) % 9, 81, 9))
+    return indices[::-1] if 10 in (col, row) else indices
+
+
+class OutsideRule(Rule):
+    """A rule given by a clue outside the grid, col and row use the coordinates of the board"""
+
+    CATEGORY = "outside"
+
+    def __init__(self, indices: Iterable[int], col: int, row: int, total: int):
+        super().__init__(indices)
+
+        self.col = col
+        self.row = row
+        self.total = total
+
+    def to_json(self) -> Dict:
+        return {
+            "type": self.NAME,
+            "row": self.row,
+            "col": self.col,
+            "total": self.total
+        }
+
+
+class SandwichRule(OutsideRule):
+    NAME = "Sandwich"
+
+    @classmethod
+    def at(cls, col: int, row: int, total: int) -> SandwichRule:
+        return cls(outside_line(col, row), col, row, total)
+
+    def consistent(self, values: List[int]) -> bool:
+        line = [values[i] for i in self.indices]
+        if 1 not in line or 9 not in line:
+            return True
+
+        return self.fits(line, line.index(1), line.index(9))
+
+    def fits(self, line: List[int], one: int, nine: int) -> bool:
+        """
+
+        :param line: Values of the row or column
+        :param one: Position of the 1 in the line
+        :param nine: Position of the 9 in the line
+        :return: True if the cells between can still add up to the total
+        """
+        first, last = sorted((one, nine))
+        between = line[first + 1:last]
+
+        filled = sum(between)
+        empties = between.count(EMPTY)
+        return filled + 2 * empties <= self.total <= filled + 8 * empties
+
+    def allowed(self, values: List[int], index: int) -> int:
+        line = [values[i] for i in self.indices]
+        position = self.indices.index(index)
+
+        one = line.index(1) if 1 in line else -1
+        nine = line.index(9) if 9 in line else -1
+
+        if one == -1 and nine == -1:
+            return ALL
+
+        if one == -1 or nine == -1:
+            # Only the missing end of the sandwich can break the rule
+            if one == -1:
+                line[position], one = 1, position
+            else:
+                line[position], nine = 9, position
+            return ALL if self.fits(line, one, nine) else ALL & ~bit(line[position])
+
+        first, last = sorted((one, nine))
+        if not first < position < last:
+            return ALL
+
+        between = line[first + 1:last]
+        rest = self.total - sum(between)
+        others = between.count(EMPTY) - 1
+        return digit_range(rest - 8 * others, rest - 2 * others) & ~(bit(1) | bit(9))
+
+
+class XSumsRule(OutsideRule):
+    """The first X cells seen from the clue sum to the total, X is the digit in the first cell"""
+
+    NAME = "XSumsClue"
+
+    @classmethod
+    def at(cls, col: int, row: int, total: int) -> XSumsRule:
+        return cls(outside_line(col, row), col, row, total)
+
+    def consistent(self, values: List[int]) -> bool:
+        length = values[self.indices[0]]
+        if not length:
+            return True
+
+        used, filled, empties = 0, 0, 0
+        for i in self.indices[:length]:
+            if value := values[i]:
+                used |= bit(value)
+                filled += value
+            else:
+                empties += 1
+
+        if not empties:
+            return filled == self.total
+        return cage_digits(ALL & ~used, self.total - filled, empties) != 0
+
+
+class LittleKillerRule(OutsideRule):
+    NAME = "LittleKiller"
+
+    DOWN_RIGHT = 0
+    DOWN_LEFT = 1
+    TOP_RIGHT = 2
+    TOP_LEFT = 3
+
+    def __init__(self, indices: Iterable[int], col: int, row: int, total: int, direction: int):
+        super().__init__(indices, col, row, total)
+        self.direction = direction
+
+    @classmethod
+    def at(cls, col: int, row: int, total: int, direction: int) -> LittleKillerRule:
+        return cls(cls.diagonal(col, row, direction), col, row, total, direction)
+
+    @classmethod
+    def diagonal(cls, col: int, row: int, direction: int) -> List[int]:
+        """Same cells the Little Killer component of the board covers"""
+
+        if (row, col) in ((0, 0), (10, 10)):
+            return list(range(0, 81, 10))
+
+        if (row, col) in ((10, 0), (0, 10)):
+            # The anti-diagonal ends at the bottom left cell, 72
+            return list(range(8, 73, 8))
+
+        if row in (0, 10) and 0 < col < 10:
+            start_row, step_row = (0, 1) if row == 0 else (8, -1)
+            left = direction in (cls.DOWN_LEFT, cls.TOP_LEFT)
+            x, step_x = (col - 2, -1) if left else (col, 1)
+
+            cells = []
+            while 0 <= x <= 8:
+                cells.append(start_row * 9 + x)
+                x += step_x
+                start_row += step_row
+            return cells
+
+        if col in (0, 10) and 0 < row < 10:
+            start_col, step_col = (0, 1) if col == 0 else (8, -1)
+            up = direction in (cls.TOP_RIGHT, cls.TOP_LEFT)
+            x, step_x = (row - 2, -1) if up else (row, 1)
+
+            cells = []
+            while 0 <= x <= 8:
+                cells.append(x * 9 + start_col)
+                x += step_x
+                start_col += step_col
+            return cells
+
+        return []
+
+    def allowed(self, values: List[int], index: int) -> int:
+        filled = sum(values[i] for i in self.indices)
+        empties = sum(1 for i in self.indices if not values[i]) - 1
+        return digit_range(self.total - filled - 9 * empties, self.total - filled - empties)
+
+    def to_json(self) -> Dict:
+        return {
+            "type": self.NAME,
+            "row": self.row,
+            "col": self.col,
+            "total": self.total,
+            "direction": self.direction
+        }
+
+
+def extra_peers(
+    diagonal_positive: bool = False,
+    diagonal_negative: bool = False,
+    antiknight: bool = False,
+    antiking: bool = False,
+    disjoint_groups: bool = False,
+    **_
+) -> List[List[int]]:
+    """
+
+    :return: For every cell the cells outside its row, column and box that must not share its digit
+    """
+    positive = list(range(8, 73, 8))
+    negative = list(range(0, 81, 10))
+
+    peers = []
+    for index in range(81):
+        seen = set()
+
+        if diagonal_positive and index in positive:
+            seen.update(positive)
+
+        if diagonal_negative and index in negative:
+            seen.update(negative)
+
+        if antiknight:
+            seen.update(knight(index))
+
+        if antiking:
+            seen.update(NEIGHBOURS[index])
+
+        if disjoint_groups:
+            seen.update(i for i in range(81) if i % 9 % 3 == index % 9 % 3
+                        and i // 9 % 3 == index // 9 % 3)
+
+        row, column, box = index // 9, index % 9, (index // 27) * 3 + (index % 9) // 3
+        peers.append(sorted(
+            i for i in seen
+            if i // 9 != row and i % 9 != column and (i // 27) * 3 + (i % 9) // 3 != box
+        ))
+    return peers
+
+
+class VariantSolver(MaskSolver):
+    """
+    MaskSolver that also respects the base constraints (diagonals, antiknight, ...) and a list of
+    rules. Only cells covered by a rule pay for the extra checks.
+    """
+
+    def __init__(self, grid: Iterable[int], rules: Iterable[Rule] = (), **constraints):
+        self.rules = list(rules)
+        self.constraints = constraints
+
+        self.cell_rules: List[List[Rule]] = [[] for _ in range(81)]
+        for rule in self.rules:
+            for index in set(rule.indices):
+                self.cell_rules[index].append(rule)
+
+        self.peers = extra_peers(**constraints)
+        self.nonconsecutive = constraints.get("nonconsecutive", False)
+
+        super().__init__(grid)
+
+    def candidates(self, index: int) -> int:
+        mask = super().candidates(index)
+        values = self.values
+
+        for peer in self.peers[index]:
+            if value := values[peer]:
+                mask &= ~bit(value)
+
+        if self.nonconsecutive:
+            for neighbour in ORTHOGONAL[index]:
+                if value := values[neighbour]:
+                    mask &= ~CONSECUTIVE[value]
+
+        for rule in self.cell_rules[index]:
+            if not mask:
+                break
+            mask &= rule.allowed(values, index)
+
+        return mask
+
+    def _choose(self) -> Tuple[int, int]:
+        values, candidates = self.values, self.candidates
+
+        best, best_mask, best_size = -1, 0, 10
+        for index in range(81):
+            if values[index]:
+                continue
+
+            mask = candidates(index)
+            size = POPCOUNT[mask]
+            if size < best_size:
+                best, best_mask, best_size = index, mask, size
+                if size <= 1:
+                    break
+
+        return best, best_mask
@@ -1,4 +1,5 @@
 import datetime
+import os
 import time
 
 from PySide6.QtCore import Qt, QEvent
@@ -6,11 +7,12 @@ from PySide6.QtGui import QCursor, QMouseEvent, QIcon, QResizeEvent, QEnterEvent
     QPaintEvent, QPainter, QFont, QPen
 from PySide6.QtWidgets import QMainWindow, QVBoxLayout, QFrame, QHBoxLayout, QPushButton, \
     QWidget, QSizeGrip, QComboBox, QGridLayout, QMenu, QSizePolicy, QCheckBox, QApplication, \
-    QLabel, QTextEdit
+    QLabel, QTextEdit, QFileDialog, QSlider
 
 from board import SudokuBoard
+from export import Exporter
 from menus import ConstraintsMenu, ComponentMenu
-from sudoku_.sudoku import Sudoku
+from sudoku_.sudoku import CellGeometry, Sudoku
 from utils import monitor_size
 
 
@@ -56,6 +58,8 @@ class SudokuWindow(QMainWindow):
         self.adding_component = False
 
         self.sudoku = Sudoku()
+        self.exporter = Exporter(self)
+        self.exporter.failed.connect(lambda path, error: self.job_label.setText(error))
 
         # self.sudoku.from_file(file_path=r"C:\Users\Cedric\PycharmProjects\Sudoku\Files\puzzles\Thermodrome2.json")
 
@@ -95,6 +99,8 @@ class SudokuWindow(QMainWindow):
 
         self.rule_view = RuleView()
         self.generate_btn = QPushButton("Generate")
+        self.stop_btn = QPushButton("Stop")
+        self.job_label = QLabel(self)
 
         self.digit_frame = DigitFrame(self)
 
@@ -107,10 +113,11 @@ class SudokuWindow(QMainWindow):
         self.board = SudokuBoard(self, self.sudoku)
         self.solve_btn.clicked.connect(self.board.solve_board)
         self.clear_btn.clicked.connect(self.board.clear_grid)
-        self.save_btn.clicked.connect(self.sudoku.to_file)
+        self.save_btn.clicked.connect(self.save_sudoku)
         self.load_btn.clicked.connect(self.load_sudoku)
         self.step_btn.clicked.connect(self.board.next_step)
         self.generate_btn.clicked.connect(self.board.generate_sudoku)
+        self.stop_btn.clicked.connect(self.board.cancel_jobs)
 
         self.mode_switch.currentIndexChanged.connect(
             lambda: self.board.setFocus()
@@ -120,6 +127,19 @@ class SudokuWindow(QMainWindow):
         )
 
         self.step_by_step_solve = QCheckBox("Step by Step")
+        self.replay_box = QCheckBox("Replay steps")
+
+        # Steps per second of a replayed solve
+        self.speed_slider = QSlider(Qt.Horizontal)
+        self.speed_slider.setRange(10, 10000)
+        self.speed_slider.setValue(self.board.solver.speed)
+        self.speed_slider.valueChanged.connect(self.board.set_speed)
+
+        self.heatmap_box = QCheckBox("Clue heatmap")
+        self.heatmap_box.clicked.connect(self.board.show_heatmap)
+
+        self.candidates_box = QCheckBox("Auto candidates")
+        self.candidates_box.clicked.connect(self.board.request_candidates)
 
         self.content_layout = QHBoxLayout()
         self.content_layout.setContentsMargins(10, 10, 10, 10)
@@ -159,9 +179,15 @@ class SudokuWindow(QMainWindow):
         self.left_layout.addWidget(self.solve_btn, 2, 0, 1, 1)
         self.left_layout.addWidget(self.step_btn, 2, 1, 1, 1)
         self.left_layout.addWidget(self.clear_btn, 3, 0, 1, 2)
-        self.left_layout.addWidget(self.generate_btn, 4, 0, 1, 2)
-        self.left_layout.addWidget(self.mode_switch, 5, 0, 1, 2)
-        self.left_layout.addWidget(self.digit_frame, 6, 0, 2, 2)
+        self.left_layout.addWidget(self.generate_btn, 4, 0, 1, 1)
+        self.left_layout.addWidget(self.stop_btn, 4, 1, 1, 1)
+        self.left_layout.addWidget(self.job_label, 5, 0, 1, 2)
+        self.left_layout.addWidget(self.mode_switch, 6, 0, 1, 2)
+        self.left_layout.addWidget(self.digit_frame, 7, 0, 2, 2)
+        self.left_layout.addWidget(self.heatmap_box, 9, 0, 1, 2)
+        self.left_layout.addWidget(self.replay_box, 10, 0, 1, 1)
+        self.left_layout.addWidget(self.speed_slider, 10, 1, 1, 1)
+        self.left_layout.addWidget(self.candidates_box, 11, 0, 1, 2)
 
         self.right_layout.addWidget(self.rule_view, 0, 0, 2, 1)
         self.right_layout.addWidget(self.component_menu, 2, 0, 2, 1)
@@ -187,6 +213,22 @@ class SudokuWindow(QMainWindow):
 
         self.board.setFocus()
 
+    def show_progress(self, progress, status: str = None):
+        text = str(progress) if progress is not None else ""
+        self.job_label.setText(f"{text} ({status})" if status else text)
+
+    def save_sudoku(self):
+        filename, _ = QFileDialog.getSaveFileName(dir=os.getcwd() + "/puzzles", filter="(*.json)")
+        if filename:
+            self.exporter.save_json(self.sudoku, filename)
+
+    def export_image(self):
+        filename, _ = QFileDialog.getSaveFileName(
+            dir=os.getcwd() + "/puzzles", filter="Images (*.png *.svg)"
+        )
+        if filename:
+            self.exporter.save_board(self.sudoku, filename)
+
     def load_sudoku(self):
         self.sudoku.from_file()
         self.constraints_menu.update()
@@ -230,6 +272,7 @@ class SudokuWindow(QMainWindow):
 
     def create_new_sudoku(self):
         self.sudoku = Sudoku.blank()
+        self.sudoku.geometry = CellGeometry(self.board.cell_size, self.sudoku.size)
         self.board.sudoku = self.sudoku
         self.constraints_menu.reset()
         self.update()
@@ -323,6 +366,9 @@ class SudokuTitleBar(QFrame):
         self.new_grid = QAction("New Grid")
         self.new_grid.triggered.connect(self.window.create_new_sudoku)
         self.grid_menu.addAction(self.new_grid)
+        self.export_grid = QAction("Export Image")
+        self.export_grid.triggered.connect(self.window.export_image)
+        self.grid_menu.addAction(self.export_grid)
 
         self.screenshot_btn = QPushButton(self)
         self.screenshot_btn.setObjectName("screenshot_btn")
@@ -425,8 +471,8 @@ class SudokuTitleBar(QFrame):
                 self.maximize()
 
     def take_screenshot(self):
-        import datetime
-        self.parent().grab().save(
+        self.window.exporter.save_image(
+            self.parent().grab().toImage(),
             f"screenshots/{datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}_img.png")
 
     def update_time(self):
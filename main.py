@@ -3,6 +3,8 @@ import sys
 from PySide6.QtCore import QRect, QPoint, QSize, Qt
 from PySide6.QtGui import QPaintEvent, QPainter, QPen, QColor, QResizeEvent, QMouseEvent, QKeyEvent, QFont
 from PySide6.QtWidgets import QApplication, QWidget, QMainWindow, QSizePolicy
+
+from alt.glyphs import glyph_atlas
 from sudoku import Sudoku
 
 
@@ -100,30 +102,21 @@ class SudokuWidget(QWidget):
                 bounding_rect.bottom(),
             )
 
+        glyphs = glyph_atlas(
+            int(cell_size), QFont("Expressway", 36), QFont("Expressway", 14), self.devicePixelRatioF(), wrap=0
+        )
+
         for index, value in self.sudoku:
             row, column = index // 9, index % 9
+            position = QPoint(10 + column * cell_size, 10 + row * cell_size)
 
             if value == 0:
-                painter.setFont(QFont("Expressway", 14))
-                painter.setPen(QColor("#000000"))
-                rect = QRect(
-                    QPoint(
-                        10 + column * cell_size, 10 + row * cell_size
-                    ),
-                    QSize(cell_size, cell_size)
-                )
-                painter.drawText(rect, Qt.AlignCenter, ''.join(map(str, sorted(self.sudoku.get_options(index)))))
+                options = sum(1 << (option - 1) for option in self.sudoku.get_options(index))
+                painter.drawPixmap(position, glyphs.marks(options, 0, QColor("#000000")))
                 continue
 
-            painter.setFont(QFont("Expressway", 36))
-            painter.setPen(QColor("#000000") if self.sudoku.get_initial(index) != 0 else QColor("#0000ff"))
-            rect = QRect(
-                QPoint(
-                    10 + column * cell_size, 10 + row * cell_size
-                ),
-                QSize(cell_size, cell_size)
-            )
-            painter.drawText(rect, Qt.AlignCenter, str(value))
+            color = QColor("#000000") if self.sudoku.get_initial(index) != 0 else QColor("#0000ff")
+            painter.drawPixmap(position, glyphs.digit(value, color))
 
     def mouseMoveEvent(self, event: QMouseEvent) -> None:
         bounding_rect = self.bounding_rect()
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
 import itertools
-import time
 from collections import defaultdict
 from typing import Callable, Set, List
 
-from PySide6.QtWidgets import QWidget
-
 NUMBERS = {1, 2, 3, 4, 5, 6, 7, 8, 9}
 
+# Byte -> cell value for bytes.translate, "." and "0" become 0 and anything else INVALID
+INVALID = 0xFF
+VALUES = bytes(byte - 48 if 48 <= byte <= 57 else 0 if byte == 46 else INVALID for byte in range(256))
+WHITESPACE = b" \t\r\n"
+CHARS = "0123456789"
+
 
 #  0   1   2   3   4   5   6   7   8
 #  9  10  11  12  13  14  15  16  17
@@ -57,19 +60,30 @@ class Sudoku:
     def from_string(cls: Sudoku, sudoku_str: str):
         """
 
-        :param sudoku_str: A string containing information about values of cells
+        The whole string is checked and converted at once, the state is filled directly without
+        going through set_value, so no history entries are written and the options are only
+        calculated once they are asked for.
+
+        :param sudoku_str: 81 digits, "." or "0" for empty cells, whitespace is ignored
         :return: Filled Sudoku
         """
-        sudoku_from_string = Sudoku()
-        for index, number in enumerate(sudoku_str):
-            sudoku_from_string.set_value(index, int(number))
+        data = sudoku_str.encode("ascii", "replace").translate(None, WHITESPACE)
+        if len(data) != 81: raise ValueError(f"Expected 81 cells, got {len(data)}.")
+
+        values = data.translate(VALUES)
+        if INVALID in values:
+            raise ValueError(f"Invalid character {chr(data[values.index(INVALID)])!r} at cell {values.index(INVALID)}.")
+
+        sudoku_from_string = cls()
+        sudoku_from_string._current_state = list(values)
         sudoku_from_string._initial_state = sudoku_from_string._current_state.copy()
         sudoku_from_string._states = [sudoku_from_string._initial_state.copy()]
-        sudoku_from_string._state_index = 0
+        sudoku_from_string._options = None
         return sudoku_from_string
 
-    def to_string(self) -> str:
-        return ''.join(str(value) for _, value in self)
+    def to_string(self, blank: str = "0") -> str:
+        sudoku_str = ''.join(map(CHARS.__getitem__, self._current_state))
+        return sudoku_str if blank == "0" else sudoku_str.replace("0", blank)
 
     def rotated(self, angle: int) -> Sudoku:
         if angle < 0: angle += 360
@@ -261,6 +275,7 @@ class Sudoku:
         return base_options
 
     def get_options(self, index: int) -> set[int]:
+        if self._options is None: self.do_logic_step()
         return self._options.get(index, set())
 
     def do_logic_step(self) -> None:
@@ -282,18 +297,21 @@ class Sudoku:
         except IndexError:
             return -1
 
-    def brute_force(self, parent: QWidget = None) -> bool:
+    def brute_force(self, on_step: Callable[[int, int], None] = None) -> bool:
+        """
+        on_step is called with (index, number) for every placement and with (index, 0) when a
+        placement is taken back. It must not block, a viewer samples the state on its own timer.
+        """
         next_empty_index = self.get_next_empty_index()
         if next_empty_index == -1: return True
 
         for number in self.calculate_options(next_empty_index):
             self.set_value(next_empty_index, number)
-            if parent:
-                time.sleep(0.01)
-                parent.repaint()
+            if on_step: on_step(next_empty_index, number)
 
-            if self.brute_force(parent): return True
+            if self.brute_force(on_step): return True
             self.set_value(next_empty_index, 0)
+            if on_step: on_step(next_empty_index, 0)
         return False
 
     def find_hidden_singles(self) -> None: